@@ -1,4 +1,38 @@
-from .drawer import draw
-from .theme import ThemeManager
+import importlib
 
-__all__ = ["draw", "ThemeManager"]
+__version__ = "0.1.1"
+
+# Public name -> submodule, imported on first use (PEP 562) to keep startup fast
+_EXPORTS = {
+    "draw": "drawer",
+    "draw_many": "drawer",
+    "compute_layout": "drawer",
+    "unroll_program": "drawer",
+    "Layout": "layout",
+    "ThemeManager": "theme",
+    "compile_theme": "theme",
+    "RenderCache": "cache",
+    "draw_pages": "pages",
+    "export_html": "viewer",
+    "draw_overview": "overview",
+    "IncrementalDrawer": "incremental",
+    "Profile": "profiling",
+    "AsyncRenderer": "aio",
+    "draw_async": "aio",
+    "RenderServer": "server",
+    "Watcher": "watch",
+}
+
+__all__ = ["draw", "draw_many", "compute_layout", "unroll_program", "Layout", "ThemeManager", "compile_theme", "RenderCache", "draw_pages", "export_html", "draw_overview", "IncrementalDrawer", "Profile", "AsyncRenderer", "draw_async", "RenderServer", "Watcher"]
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
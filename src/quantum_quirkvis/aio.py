@@ -0,0 +1,156 @@
+import asyncio
+import os
+from .cache import render_key
+from .theme import compile_theme
+
+EXECUTORS = ("process", "thread")
+
+
+def render_job(job):
+    """One draw() on a worker thread or process."""
+    from .drawer import draw
+    program, theme, fold, symbols, compact, cache = job
+    return draw(program, theme=theme, fold=fold, symbols=symbols, cache=cache, compact=compact)
+
+
+class AsyncRenderer:
+    """Renders on an executor, so drawing doesn't block the event loop.
+
+    executor is "process" (default, renders run in parallel), "thread" or a
+    concurrent.futures.Executor, which close() then leaves open. At most
+    limit renders (default: max_workers) are handed to the executor at
+    once, the others wait in the event loop. timeout is the default limit
+    in seconds of each draw() call. Identical requests in flight (same
+    normalized QASM, theme and options) share a single render. cache is a
+    render cache directory shared by the workers.
+    """
+
+    def __init__(self, executor="process", max_workers=None, limit=None, timeout=None, cache=None):
+        if isinstance(executor, str) and executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r}, expected one of {', '.join(EXECUTORS)}")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.limit = limit or self.max_workers
+        self.timeout = timeout
+        self.cache = cache
+        self.executor = None if isinstance(executor, str) else executor
+        self._kind = executor if isinstance(executor, str) else None
+        self._inflight = {}
+        self._loop = None
+        self._slots = None
+        self.renders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    def key(self, program, theme=None, fold=False, symbols=False, compact=None):
+        # Only QASM source is coalesced, like the render cache
+        if not isinstance(program, str):
+            return None
+        return render_key(program, compile_theme(theme).digest, fold=fold, symbols=symbols, compact=compact)
+
+    async def draw(self, program, theme=None, fold=False, symbols=False, timeout=None, compact=None):
+        """SVG of a program or saved Layout, see draw().
+
+        Raises asyncio.TimeoutError after timeout seconds (default: the
+        renderer's). A render nobody waits for anymore, after timeouts or
+        cancellations, is cancelled if it hasn't started yet; a started one
+        runs to completion on its worker and its result is dropped.
+        """
+        key = None
+        if isinstance(program, str):
+            # Compiling the theme reads theme files, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            key = await loop.run_in_executor(None, self.key, program, theme, fold, symbols, compact)
+        entry = self._inflight.get(key) if key is not None else None
+        if entry is None:
+            entry = [asyncio.ensure_future(self._run((program, theme, fold, symbols, compact, self.cache))), 0]
+            entry[0].add_done_callback(lambda task: self._done(key, entry))
+            if key is not None:
+                self._inflight[key] = entry
+        else:
+            self.coalesced += 1
+        task = entry[0]
+        entry[1] += 1
+        try:
+            # shield(): one waiter giving up doesn't cancel the others' render
+            return await asyncio.wait_for(asyncio.shield(task), self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            entry[1] -= 1
+            if not entry[1] and not task.done():
+                self._forget(key, entry)
+                task.cancel()
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.limit)
+        slots = self._slots
+        await slots.acquire()
+        try:
+            future = self._get_executor().submit(render_job, job)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is freed when the worker is, a cancelled request can't stop a started render
+        future.add_done_callback(lambda _: loop.is_closed() or loop.call_soon_threadsafe(slots.release))
+        self.renders += 1
+        return await asyncio.wrap_future(future)
+
+    def _get_executor(self):
+        if self.executor is None:
+            if self._kind == "thread":
+                from concurrent.futures import ThreadPoolExecutor
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+            else:
+                from concurrent.futures import ProcessPoolExecutor
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def _done(self, key, entry):
+        self._forget(key, entry)
+        task = entry[0]
+        if not task.cancelled():
+            # Marks the error as seen when every waiter has given up
+            task.exception()
+
+    def _forget(self, key, entry):
+        if key is not None and self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    def stats(self):
+        return {
+            "renders": self.renders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+            "in_flight": len(self._inflight),
+        }
+
+    def close(self, wait=True):
+        # Executors passed in belong to the caller
+        if self._kind and self.executor is not None:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+_renderer = None
+
+async def draw_async(program, theme=None, fold=False, symbols=False, timeout=None, compact=None):
+    """draw() on a process pool shared by the whole program, see AsyncRenderer."""
+    global _renderer
+    if _renderer is None:
+        _renderer = AsyncRenderer()
+    return await _renderer.draw(program, theme, fold=fold, symbols=symbols, timeout=timeout, compact=compact)
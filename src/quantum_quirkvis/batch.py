@@ -0,0 +1,138 @@
+import glob
+import os
+import sys
+import time
+from .drawer import draw_many, theme_name
+
+GLOB_CHARS = "*?["
+
+
+def expand_inputs(patterns):
+    """Turn files, directories (searched recursively for *.qasm) and glob
+    patterns into a sorted, de-duplicated list of files. A file whose name
+    looks like a pattern, such as "ghz[3].qasm", is taken as it is."""
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*.qasm"), recursive=True)
+        elif not os.path.exists(pattern) and any(c in pattern for c in GLOB_CHARS):
+            matches = glob.glob(pattern, recursive=True)
+        else:
+            matches = [pattern]
+        files.extend(sorted(matches))
+    seen = set()
+    return [f for f in files if not (f in seen or seen.add(f))]
+
+
+def output_template(output, themes):
+    # Placeholders: {dir} and {name} of the input file, {theme}
+    if not output:
+        output = os.path.join("{dir}", "{name}.svg")
+    elif output.endswith(os.sep) or os.path.isdir(output):
+        output = os.path.join(output, "{name}.svg")
+    if len(themes) > 1 and "{theme}" not in output:
+        root, ext = os.path.splitext(output)
+        output = root + "_{theme}" + ext
+    return output
+
+
+def file_outputs(path, themes, template):
+    """Output paths of one input, in theme order."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    directory = os.path.dirname(path) or "."
+    return [template.format(dir=directory, name=name, theme=theme_name(theme, i)) for i, theme in enumerate(themes)]
+
+
+def output_paths(files, themes, template):
+    """Output paths of every input, checked before anything is drawn.
+
+    Raises ValueError when a template without {name} or {dir} is given
+    several inputs, or when two drawings would be written to the same file.
+    """
+    if len(files) > 1 and "{name}" not in template and "{dir}" not in template:
+        raise ValueError(f"Output {template} names a single file for {len(files)} inputs, "
+                         "give a directory or a template with {name}")
+    outputs = {}
+    owners = {}
+    for path in files:
+        outputs[path] = file_outputs(path, themes, template)
+        for out in outputs[path]:
+            key = os.path.normcase(os.path.abspath(out))
+            if key in owners:
+                raise ValueError(f"{owners[key]} and {path} would both be drawn to {out}")
+            owners[key] = path
+    return outputs
+
+
+def render_file(job):
+    """Render one input in every theme. Never raises: errors are reported
+    in the result so one bad file doesn't stop the batch."""
+    path, themes, template, fold, symbols, compact, cache = job
+    start = time.perf_counter()
+    outputs = file_outputs(path, themes, template)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            qasm_str = f.read()
+        for out in set(outputs):
+            if os.path.dirname(out):
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+        name = os.path.splitext(os.path.basename(path))[0]
+        directory = os.path.dirname(path) or "."
+        # A single template for all themes: draw_many fills the {theme} part in
+        draw_many(qasm_str, themes, filename=template.replace("{dir}", directory).replace("{name}", name),
+                  fold=fold, symbols=symbols, cache=cache, compact=compact)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return path, outputs, error, time.perf_counter() - start
+
+
+def render_batch(inputs, themes=None, output=None, jobs=None, fold=False, symbols=False,
+                 cache=None, progress=sys.stderr, compact=None):
+    """Render many QASM files on a process pool.
+
+    Progress is reported in input order on `progress`, followed by a
+    summary. `cache` is a render cache directory shared by the workers.
+    Returns a list of (path, outputs, error, seconds) tuples. Raises
+    ValueError, before drawing anything, when outputs would collide.
+    """
+    themes = themes or [None]
+    files = expand_inputs(inputs)
+    template = output_template(output, themes)
+    output_paths(files, themes, template)
+    work = [(path, themes, template, fold, symbols, compact, cache) for path in files]
+    jobs = jobs or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    results = []
+    if jobs == 1 or len(work) <= 1:
+        results_iter = map(render_file, work)
+        executor = None
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        chunksize = max(1, len(work) // (jobs * 8))
+        results_iter = executor.map(render_file, work, chunksize=chunksize)
+    try:
+        for i, result in enumerate(results_iter, 1):
+            path, outputs, error, seconds = result
+            results.append(result)
+            if progress:
+                status = f"FAILED {error}" if error else ", ".join(outputs)
+                progress.write(f"[{i}/{len(work)}] {path} -> {status} ({seconds:.2f}s)\n")
+                progress.flush()
+    finally:
+        if executor:
+            executor.shutdown()
+
+    if progress:
+        elapsed = time.perf_counter() - start
+        failed = [r for r in results if r[2]]
+        busy = sum(r[3] for r in results)
+        progress.write(
+            f"{len(results) - len(failed)} rendered, {len(failed)} failed in {elapsed:.2f}s "
+            f"({busy:.2f}s of render time on {jobs} worker{'s' if jobs > 1 else ''})\n"
+        )
+        for path, _, error, _ in failed:
+            progress.write(f"  {path}: {error}\n")
+    return results
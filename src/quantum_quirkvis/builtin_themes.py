@@ -0,0 +1,703 @@
+"""Built-in themes, generated from themes/*.json by `python -m quantum_quirkvis.theme`."""
+
+THEMES = {
+    'default': {
+        'name': 'default',
+        'dimensions': {
+            'gate_width': 40,
+            'gate_height': 40,
+            'gate_spacing': 20,
+            'line_spacing': 60,
+            'padding': 40,
+            'label_offset': 50,
+            'barrier_padding': 20,
+            'reverse_qubit_order': False,
+            'reverse_classical_order': False,
+        },
+        'styles': {
+            'background': '#fafafa',
+            'text': '#555555',
+            'label_font': {
+                'family': 'calibri',
+                'size': 17,
+            },
+            'qubit_wire': {
+                'style': 'straight',
+                'stroke': '#777777',
+                'stroke_width': 3,
+                'dasharray': '',
+            },
+            'connection_line': {
+                'style': 'wave',
+                'stroke': '#555555',
+                'stroke_width': 2,
+                'amplitude': 3,
+                'wavelength': 12,
+            },
+            'measurement_line': {
+                'style': 'straight',
+                'stroke': '#777777',
+                'stroke_width': 2,
+                'dasharray': '2,2',
+            },
+            'barrier': {
+                'style': 'straight',
+                'stroke': '#999999',
+                'stroke_width': 3,
+                'dasharray': '4,4',
+            },
+            'continuation': {
+                'style': 'straight',
+                'stroke': '#bbbbbb',
+                'stroke_width': 2,
+                'dasharray': '8,6',
+            },
+        },
+        'shapes': {
+            'gate': {
+                'type': 'circle',
+                'radius': 20,
+                'fill': '#d4b6e8',
+                'stroke': '#777777',
+                'stroke_width': 2,
+            },
+            'control_dot': {
+                'type': 'circle',
+                'radius': 4,
+                'fill': '#555555',
+                'stroke': 'none',
+            },
+            'target_plus': {
+                'type': 'plus_circle',
+                'radius': 12,
+                'fill': '#fafafa',
+                'stroke': '#555555',
+                'stroke_width': 2,
+            },
+            'measurement': {
+                'type': 'diamond',
+                'radius': 18,
+                'fill': '#A0A0A0',
+                'stroke': '#444444',
+                'stroke_width': 1,
+            },
+            'swap_x': {
+                'type': 'cross',
+                'size': 8,
+                'stroke': '#222222',
+                'stroke_width': 2,
+            },
+            'block': {
+                'type': 'rect',
+                'radius': 6,
+                'fill': '#eeeeee',
+                'stroke': '#777777',
+                'stroke_width': 2,
+                'annotation_offset': 10,
+            },
+        },
+        'gates': {
+            'h': {
+                'fill': '#e8b5ca',
+                'label': 'H',
+            },
+            'x': {
+                'fill': '#ffe0e0',
+                'label': 'X',
+            },
+            'y': {
+                'fill': '#e0ffe0',
+                'label': 'Y',
+            },
+            'z': {
+                'fill': '#ccccff',
+                'label': 'Z',
+            },
+            'rx': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#ff6666',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Rx',
+                'fill': '#ffe0e0',
+            },
+            'ry': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#5eba5e',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Ry',
+                'fill': '#e0ffe0',
+            },
+            'rz': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#5757fa',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Rz',
+                'fill': '#ccccff',
+            },
+            'sdg': {
+                'fill': '#e8dfb5',
+                'label': 'S†',
+            },
+            's': {
+                'fill': '#b5e8c0',
+                'label': 'S',
+            },
+            'tdg': {
+                'fill': '#b5e5e8',
+                'label': 'T†',
+            },
+            't': {
+                'fill': '#beb5e8',
+                'label': 'T',
+            },
+            'p': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#f1fa8c',
+                'arc_stroke_width': 3,
+                'arc_radius': 18,
+                'label': 'P',
+                'fill': '#fdfdfb',
+            },
+            'measurement': {
+                'type': 'diamond',
+                'fill': '#AFAFAF',
+                'label': 'M',
+            },
+            'cx': {
+                'target_shape': 'target_plus',
+            },
+            'ccx': {
+                'target_shape': 'target_plus',
+            },
+        },
+        'substitutions': {},
+    },
+    'emoji': {
+        'name': 'default',
+        'dimensions': {
+            'gate_width': 40,
+            'gate_height': 40,
+            'gate_spacing': 20,
+            'line_spacing': 60,
+            'padding': 40,
+            'label_offset': 50,
+            'barrier_padding': 20,
+            'reverse_qubit_order': False,
+            'reverse_classical_order': False,
+        },
+        'styles': {
+            'background': '#fafafa',
+            'text': '#555555',
+            'label_font': {
+                'family': 'calibri',
+                'size': 17,
+            },
+            'qubit_wire': {
+                'style': 'straight',
+                'stroke': '#777777',
+                'stroke_width': 3,
+                'dasharray': '',
+            },
+            'connection_line': {
+                'style': 'wave',
+                'stroke': '#555555',
+                'stroke_width': 2,
+                'amplitude': 3,
+                'wavelength': 12,
+            },
+            'measurement_line': {
+                'style': 'straight',
+                'stroke': '#777777',
+                'stroke_width': 2,
+                'dasharray': '2,2',
+            },
+            'barrier': {
+                'style': 'straight',
+                'stroke': '#999999',
+                'stroke_width': 3,
+                'dasharray': '4,4',
+            },
+            'continuation': {
+                'style': 'straight',
+                'stroke': '#bbbbbb',
+                'stroke_width': 2,
+                'dasharray': '8,6',
+            },
+        },
+        'shapes': {
+            'gate': {
+                'type': 'emoji',
+                'value': '🔮',
+                'label': '',
+            },
+            'control_dot': {
+                'type': 'emoji',
+                'value': '🔸',
+                'radius': 4,
+                'fill': '#555555',
+                'stroke': 'none',
+            },
+            'target_plus': {
+                'type': 'emoji',
+                'value': '🙃',
+                'radius': 12,
+                'fill': '#fafafa',
+                'stroke': '#555555',
+                'stroke_width': 2,
+            },
+            'measurement': {
+                'type': 'diamond',
+                'radius': 18,
+                'fill': '#A0A0A0',
+                'stroke': '#444444',
+                'stroke_width': 1,
+            },
+            'swap_x': {
+                'type': 'emoji',
+                'value': '💥',
+                'size': 8,
+                'stroke': '#222222',
+                'stroke_width': 2,
+            },
+        },
+        'gates': {
+            'h': {
+                'fill': '#e8b5ca',
+                'value': '🐱',
+                'label': '',
+            },
+            'x': {
+                'fill': '#ffe0e0',
+                'value': '🙃',
+                'label': '',
+            },
+            'y': {
+                'fill': '#e0ffe0',
+                'value': '🙂\u200d↔️',
+                'label': '',
+            },
+            'z': {
+                'fill': '#ccccff',
+                'value': '🙂\u200d↕️',
+                'label': '',
+            },
+            'rx': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#ff6666',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'value': '🌀',
+                'label': '',
+                'fill': '#ffe0e0',
+            },
+            'ry': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#5eba5e',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'value': '❄️',
+                'label': '',
+                'fill': '#e0ffe0',
+            },
+            'rz': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#5757fa',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'value': '🌒',
+                'label': '',
+                'fill': '#ccccff',
+            },
+            'sdg': {
+                'fill': '#e8dfb5',
+                'label': '',
+                'value': '⚽',
+            },
+            's': {
+                'fill': '#b5e8c0',
+                'label': '',
+                'value': '🏀',
+            },
+            'tdg': {
+                'fill': '#b5e5e8',
+                'value': '🪩',
+                'label': '',
+            },
+            't': {
+                'fill': '#beb5e8',
+                'value': '💎',
+                'label': '',
+            },
+            'p': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#f1fa8c',
+                'arc_stroke_width': 3,
+                'arc_radius': 18,
+                'label': 'P',
+                'fill': '#fdfdfb',
+            },
+            'measurement': {
+                'fill': '#AFAFAF',
+                'type': 'emoji',
+                'label': '',
+                'value': '📸',
+            },
+            'cx': {
+                'target_shape': 'target_plus',
+            },
+            'ccx': {
+                'target_shape': 'target_plus',
+            },
+        },
+        'substitutions': {},
+    },
+    'matrix': {
+        'name': 'matrix',
+        'dimensions': {
+            'gate_width': 40,
+            'gate_height': 40,
+            'gate_spacing': 20,
+            'line_spacing': 60,
+            'padding': 40,
+            'label_offset': 50,
+            'barrier_padding': 20,
+            'reverse_qubit_order': False,
+            'reverse_classical_order': False,
+        },
+        'styles': {
+            'background': '#010b01',
+            'text': '#00ff41',
+            'label_font': {
+                'family': 'Courier New',
+                'size': 17,
+            },
+            'qubit_wire': {
+                'style': 'straight',
+                'stroke': '#00531a',
+                'stroke_width': 3,
+                'dasharray': '2,1',
+            },
+            'connection_line': {
+                'style': 'wave',
+                'stroke': '#00b330',
+                'stroke_width': 2,
+                'amplitude': 3,
+                'wavelength': 12,
+            },
+            'measurement_line': {
+                'style': 'straight',
+                'stroke': '#006620',
+                'stroke_width': 2,
+                'dasharray': '2,2',
+            },
+            'barrier': {
+                'style': 'straight',
+                'stroke': '#007a25',
+                'stroke_width': 3,
+                'dasharray': '4,4',
+            },
+            'continuation': {
+                'style': 'straight',
+                'stroke': '#00cc33',
+                'stroke_width': 2,
+                'dasharray': '8,6',
+            },
+        },
+        'shapes': {
+            'gate': {
+                'type': 'circle',
+                'radius': 20,
+                'fill': '#020f02',
+                'stroke': '#00cc33',
+                'stroke_width': 2,
+            },
+            'control_dot': {
+                'type': 'circle',
+                'radius': 4,
+                'fill': '#00ff41',
+                'stroke': 'none',
+            },
+            'target_plus': {
+                'type': 'plus_circle',
+                'radius': 12,
+                'fill': '#010b01',
+                'stroke': '#00ff41',
+                'stroke_width': 2,
+            },
+            'measurement': {
+                'type': 'diamond',
+                'radius': 18,
+                'fill': '#031203',
+                'stroke': '#00cc33',
+                'stroke_width': 1,
+            },
+            'swap_x': {
+                'type': 'cross',
+                'size': 8,
+                'stroke': '#00ff41',
+                'stroke_width': 2,
+            },
+            'block': {
+                'type': 'rect',
+                'radius': 6,
+                'fill': '#020f02',
+                'stroke': '#00cc33',
+                'stroke_width': 2,
+            },
+        },
+        'gates': {
+            'h': {
+                'fill': '#021a08',
+                'label': 'H',
+            },
+            'x': {
+                'fill': '#021a08',
+                'label': 'X',
+            },
+            'y': {
+                'fill': '#021a08',
+                'label': 'Y',
+            },
+            'z': {
+                'fill': '#021a08',
+                'label': 'Z',
+            },
+            'rx': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#00ff41',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Rx',
+                'fill': '#021a08',
+            },
+            'ry': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#39ff14',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Ry',
+                'fill': '#021a08',
+            },
+            'rz': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#00e676',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Rz',
+                'fill': '#021a08',
+            },
+            'sdg': {
+                'fill': '#021a08',
+                'label': 'S†',
+            },
+            's': {
+                'fill': '#021a08',
+                'label': 'S',
+            },
+            'tdg': {
+                'fill': '#021a08',
+                'label': 'T†',
+            },
+            't': {
+                'fill': '#021a08',
+                'label': 'T',
+            },
+            'p': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#ccff00',
+                'arc_stroke_width': 3,
+                'arc_radius': 18,
+                'label': 'P',
+                'fill': '#021a08',
+            },
+            'measurement': {
+                'type': 'diamond',
+                'fill': '#031203',
+                'label': 'M',
+            },
+            'cx': {
+                'target_shape': 'target_plus',
+            },
+            'ccx': {
+                'target_shape': 'target_plus',
+            },
+        },
+        'substitutions': {},
+    },
+    'night': {
+        'name': 'night',
+        'dimensions': {
+            'gate_width': 40,
+            'gate_height': 40,
+            'gate_spacing': 20,
+            'line_spacing': 60,
+            'padding': 40,
+            'label_offset': 50,
+            'barrier_padding': 20,
+            'reverse_qubit_order': False,
+            'reverse_classical_order': False,
+        },
+        'styles': {
+            'background': '#0e0e14',
+            'text': '#c8c8d8',
+            'label_font': {
+                'family': 'calibri',
+                'size': 17,
+            },
+            'qubit_wire': {
+                'style': 'straight',
+                'stroke': '#3a3a52',
+                'stroke_width': 3,
+                'dasharray': '',
+            },
+            'connection_line': {
+                'style': 'wave',
+                'stroke': '#8888aa',
+                'stroke_width': 2,
+                'amplitude': 3,
+                'wavelength': 12,
+            },
+            'measurement_line': {
+                'style': 'straight',
+                'stroke': '#4a4a62',
+                'stroke_width': 2,
+                'dasharray': '2,2',
+            },
+            'barrier': {
+                'style': 'straight',
+                'stroke': '#444466',
+                'stroke_width': 3,
+                'dasharray': '4,4',
+            },
+            'continuation': {
+                'style': 'straight',
+                'stroke': '#6655aa',
+                'stroke_width': 2,
+                'dasharray': '8,6',
+            },
+        },
+        'shapes': {
+            'gate': {
+                'type': 'circle',
+                'radius': 20,
+                'fill': '#2a1f3d',
+                'stroke': '#6655aa',
+                'stroke_width': 2,
+            },
+            'control_dot': {
+                'type': 'circle',
+                'radius': 4,
+                'fill': '#aaaacc',
+                'stroke': 'none',
+            },
+            'target_plus': {
+                'type': 'plus_circle',
+                'radius': 12,
+                'fill': '#0e0e14',
+                'stroke': '#aaaacc',
+                'stroke_width': 2,
+            },
+            'measurement': {
+                'type': 'diamond',
+                'radius': 18,
+                'fill': '#2a2a3a',
+                'stroke': '#6666aa',
+                'stroke_width': 1,
+            },
+            'swap_x': {
+                'type': 'cross',
+                'size': 8,
+                'stroke': '#ccccee',
+                'stroke_width': 2,
+            },
+            'block': {
+                'type': 'rect',
+                'radius': 6,
+                'fill': '#1c1c2a',
+                'stroke': '#6655aa',
+                'stroke_width': 2,
+            },
+        },
+        'gates': {
+            'h': {
+                'fill': '#3d1f2e',
+                'label': 'H',
+            },
+            'x': {
+                'fill': '#3d1f1f',
+                'label': 'X',
+            },
+            'y': {
+                'fill': '#1f3d1f',
+                'label': 'Y',
+            },
+            'z': {
+                'fill': '#1f1f3d',
+                'label': 'Z',
+            },
+            'rx': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#ff8888',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Rx',
+                'fill': '#3d1f1f',
+            },
+            'ry': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#66dd66',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Ry',
+                'fill': '#1f3d1f',
+            },
+            'rz': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#7777ff',
+                'arc_stroke_width': 4,
+                'arc_radius': 17,
+                'label': 'Rz',
+                'fill': '#1f1f3d',
+            },
+            'sdg': {
+                'fill': '#2e2a1a',
+                'label': 'S†',
+            },
+            's': {
+                'fill': '#1a2e1f',
+                'label': 'S',
+            },
+            'tdg': {
+                'fill': '#1a2e2f',
+                'label': 'T†',
+            },
+            't': {
+                'fill': '#1e1a2e',
+                'label': 'T',
+            },
+            'p': {
+                'parametric_mode': 'arc',
+                'arc_stroke': '#e8e06a',
+                'arc_stroke_width': 3,
+                'arc_radius': 18,
+                'label': 'P',
+                'fill': '#1e1e12',
+            },
+            'measurement': {
+                'type': 'diamond',
+                'fill': '#252535',
+                'label': 'M',
+            },
+            'cx': {
+                'target_shape': 'target_plus',
+            },
+            'ccx': {
+                'target_shape': 'target_plus',
+            },
+        },
+        'substitutions': {},
+    },
+}
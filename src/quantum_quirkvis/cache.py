@@ -0,0 +1,226 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MEMORY_BYTES = 64 * 1024 * 1024
+
+# One RenderCache per directory and process, so statistics add up
+_caches = {}
+
+def package_version():
+    # Not importlib.metadata, which takes longer to import than a cache hit
+    from . import __version__
+    return __version__
+
+def normalize_qasm(program):
+    # Line endings and trailing whitespace don't change the drawing
+    lines = program.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+def render_key(program, theme_digest, **options):
+    """Hash of the normalized QASM, the merged theme, the render options and the package version."""
+    return _hash_program(program, theme_digest, options)
+
+def program_key(program, **options):
+    """Hash of the normalized QASM, the options and the package version, for results
+    that don't depend on the theme, such as layouts."""
+    return _hash_program(program, "program", options)
+
+def _hash_program(program, tag, options):
+    h = hashlib.sha256()
+    h.update(package_version().encode())
+    h.update(b"\0")
+    h.update(tag.encode())
+    h.update(b"\0")
+    h.update(json.dumps(options, sort_keys=True).encode())
+    h.update(b"\0")
+    h.update(normalize_qasm(program).encode())
+    return h.hexdigest()
+
+def get_cache(cache, max_bytes=None):
+    """Return a RenderCache for a RenderCache, a directory path or None."""
+    if cache is None or isinstance(cache, RenderCache):
+        return cache
+    directory = os.path.abspath(cache)
+    if directory not in _caches:
+        _caches[directory] = RenderCache(directory, max_bytes or DEFAULT_MAX_BYTES)
+    elif max_bytes:
+        _caches[directory].max_bytes = max_bytes
+    return _caches[directory]
+
+
+class RenderCache:
+    """Content-addressed store of rendered SVGs with LRU eviction.
+
+    Entries are keyed by a hash of the normalized QASM, the fully merged
+    theme, the render options and the package version. Files are written
+    atomically and their mtime is refreshed on every hit, the least
+    recently used ones are removed when the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(size for _, _, size in self._entries())
+
+    def key(self, program, theme_digest, **options):
+        return render_key(program, theme_digest, **options)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                svg = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return svg
+
+    def put(self, key, svg):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = svg.encode("utf-8")
+        try:
+            old = os.path.getsize(path)
+        except OSError:
+            old = 0
+        # Write next to the target and rename, readers never see partial files
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            os.remove(tmp)
+            raise
+        self.writes += 1
+        # An overwritten entry no longer counts
+        self.size += len(data) - old
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # Rescan: other processes may share the directory
+        entries = sorted(self._entries())
+        self.size = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self.size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size -= size
+            self.evictions += 1
+
+    def clear(self):
+        for _, path, _ in self._entries():
+            os.remove(path)
+        self.size = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "directory": self.directory,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".svg")
+
+    def _entries(self):
+        # (mtime, path, size) of every cached file
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".svg"):
+                    try:
+                        st = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield st.st_mtime_ns, entry.path, st.st_size
+
+
+class MemoryCache:
+    """In-memory LRU store, bounded by the total size of its values.
+
+    sizeof(value) gives the size counted against max_bytes (len by
+    default). Safe to share between threads.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMORY_BYTES, sizeof=len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        # Values larger than the whole cache are not kept
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+        }
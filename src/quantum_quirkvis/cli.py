@@ -1,28 +1,192 @@
 #!/usr/bin/env python3
 import argparse
+import json
+import os
 import sys
-from quantum_quirkvis import draw
+from quantum_quirkvis.overview import METRICS
+
+# Inputs with these extensions are layouts saved by --save-layout
+LAYOUT_EXTENSIONS = (".qvl", ".json")
 
 
 def main():
     p = argparse.ArgumentParser(description="Render QASM to SVG using quantum_quirkvis")
-    p.add_argument("input", nargs="?", help="Input QASM file (default: stdin)")
-    p.add_argument("-t", "--theme", help="Theme name or JSON file", default=None)
-    p.add_argument("-o", "--output", help="Output SVG file (default: stdout)")
+    p.add_argument("input", nargs="*", help="Input QASM file (default: stdin), or several files, directories and globs, or a layout saved with --save-layout (.qvl, .json)")
+    p.add_argument("-t", "--theme", action="append", help="Theme name or JSON file, repeat to render several themes at once")
+    p.add_argument("-o", "--output", help="Output SVG file (default: stdout), may contain {theme}")
+    p.add_argument("--fold", action="store_true", help="Draw loops and user-defined gates as blocks instead of unrolling them")
+    p.add_argument("--symbols", action="store_true", help="Smaller output: reuse shapes through <defs>/<use> and CSS classes")
+    p.add_argument("--compact", action="store_true", help="Smaller output: rounded coordinates, no empty or default attributes (outputs ending in .svgz are also gzipped)")
+    p.add_argument("--precision", type=int, default=2, metavar="DECIMALS", help="Decimals of the coordinates with --compact (default: 2)")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes for several inputs (default: all cores)")
+    p.add_argument("--cache", metavar="DIR", help="Reuse SVGs rendered earlier from this cache directory")
+    p.add_argument("--cache-size", type=int, metavar="MB", help="Cache size limit in MB (default: 256)")
+    p.add_argument("--cache-stats", action="store_true", help="Print cache statistics as JSON to stderr")
+    p.add_argument("--page-width", type=int, metavar="MOMENTS", help="Split wide circuits into numbered pages of this many moments, -o may contain {page}")
+    p.add_argument("--index", metavar="HTML", help="With --page-width, also write an HTML page showing all the pages")
+    p.add_argument("--overview", choices=METRICS, help="Draw a density map of the circuit (gate counts, two-qubit gates, measurements or gate mix) instead of every gate")
+    p.add_argument("--html", metavar="DIR", help="Write a scrollable HTML viewer loading the circuit in tiles (DIR/index.html) instead of an SVG")
+    p.add_argument("--save-layout", metavar="FILE", help="Only parse and schedule the circuit and save its layout (JSON for .json, compact binary otherwise) for rendering later")
+    p.add_argument("--profile", action="store_true", help="Print phase timings and counters (statements, moments, elements, bytes) as JSON to stderr")
+    p.add_argument("--cprofile", metavar="FILE", help="Also run under cProfile and save the stats to FILE (for pstats or snakeviz)")
+    p.add_argument("--watch", action="store_true", help="Keep running and draw the inputs again when they, the files they include or the theme files change (-o as for several inputs)")
+    p.add_argument("--serve", action="store_true", help="Run a render server with warm workers (-j) and an in-memory cache of --cache-size MB, later runs render through it")
+    p.add_argument("--server", metavar="ADDRESS", help="Address of the render server: a Unix socket path or host:port (default: $QUIRKVIS_SERVER or a socket of the current user)")
+    p.add_argument("--no-server", action="store_true", help="Render in this process even when a render server is running")
+    p.add_argument("--allow-remote", action="store_true", help="Let --serve listen on a TCP address other than loopback: anyone reaching it can render and read theme files")
     args = p.parse_args()
 
+    if args.serve:
+        serve(p, args)
+        return
+
+    # Imported once the arguments are known, --help and usage errors stay fast
+    from quantum_quirkvis.cache import get_cache
+    from quantum_quirkvis.profiling import Profile
+
+    cache = None
+    if args.cache:
+        max_bytes = args.cache_size * 1024 * 1024 if args.cache_size else None
+        cache = get_cache(args.cache, max_bytes=max_bytes)
+    profile = Profile(cprofile=True) if args.cprofile else Profile() if args.profile else None
+    try:
+        run(p, args, cache, profile)
+    finally:
+        if cache and args.cache_stats:
+            sys.stderr.write(json.dumps(cache.stats()) + "\n")
+        if profile and profile.counters.get('draws'):
+            if args.profile:
+                sys.stderr.write(json.dumps(profile.to_dict()) + "\n")
+            if args.cprofile:
+                profile.dump_stats(args.cprofile)
+
+
+def serve(p, args):
+    import signal
+    from quantum_quirkvis.server import RenderServer
+    kwargs = {"max_bytes": args.cache_size * 1024 * 1024} if args.cache_size else {}
+    try:
+        server = RenderServer(args.server, workers=args.jobs, allow_remote=args.allow_remote, **kwargs)
+    except ValueError as e:
+        p.error(f"{e}, pass --allow-remote to listen on it anyway")
+    # A plain kill shuts down cleanly too, removing the socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    server.start()
+    sys.stderr.write(f"Render server listening on {server.stats()['address']} with {server.workers} workers\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def render_remote(qasm_str, theme, args, compact):
+    """SVG drawn by a running render server, None when there is none, it failed
+    or it runs another version of the package."""
+    from quantum_quirkvis import client
+    address = args.server or client.default_address()
+    target = client.parse_address(address)
+    if isinstance(target, str) and not os.path.exists(target):
+        return None
+    try:
+        return client.render(qasm_str, theme=theme, fold=args.fold, symbols=args.symbols, compact=compact, address=address)
+    except (OSError, client.ServerError):
+        # Rendered here instead, errors are then reported as without a server, and a
+        # socket of another user or a server of another version is left alone
+        return None
+
+
+def run(p, args, cache, profile=None):
+    from quantum_quirkvis import Layout
+    from quantum_quirkvis.batch import GLOB_CHARS, render_batch
+
+    themes = args.theme or [None]
+    compact = args.precision if args.compact else None
+    # With --page-width or --html, -j sets the workers rendering the pieces
+    batch = len(args.input) > 1 or (args.jobs is not None and not (args.page_width or args.html)) or any(
+        os.path.isdir(i) or (not os.path.exists(i) and any(c in i for c in GLOB_CHARS)) for i in args.input
+    )
+    if args.watch:
+        if not args.input or any(i == "-" or i.endswith(LAYOUT_EXTENSIONS) for i in args.input):
+            p.error("--watch needs QASM files, directories or globs")
+        if args.page_width or args.html or args.overview or args.save_layout or profile:
+            p.error("--watch only draws whole circuits")
+        # Outputs are named as for several inputs, next to each input by default
+        from quantum_quirkvis.watch import Watcher
+        try:
+            Watcher(args.input, themes, output=args.output, fold=args.fold, symbols=args.symbols, compact=compact).run()
+        except ValueError as e:
+            p.error(str(e))
+        return
+    if (args.page_width or args.html or args.overview or args.save_layout) and (batch or len(themes) > 1):
+        p.error("--page-width, --html, --overview and --save-layout take a single input in a single theme")
+    if profile and (batch or args.page_width or args.html or args.overview or args.save_layout):
+        p.error("--profile and --cprofile measure drawing a single input")
+    if batch:
+        # Output is a template with {dir}, {name} and {theme}, or a directory
+        # Workers open the same directory, their hits aren't counted in --cache-stats
+        try:
+            results = render_batch(args.input, themes, output=args.output, jobs=args.jobs,
+                                   fold=args.fold, symbols=args.symbols, cache=cache and cache.directory,
+                                   compact=compact)
+        except ValueError as e:
+            p.error(str(e))
+        sys.exit(1 if any(r[2] for r in results) else 0)
+
     # Read QASM from file or stdin
-    if args.input and args.input != "-":
-        with open(args.input, "r", encoding="utf-8") as f:
+    input_file = args.input[0] if args.input else None
+    if input_file and input_file.endswith(LAYOUT_EXTENSIONS):
+        # Already scheduled, rendered without parsing
+        qasm_str = Layout.load(input_file)
+    elif input_file and input_file != "-":
+        with open(input_file, "r", encoding="utf-8") as f:
             qasm_str = f.read()
     else:
         qasm_str = sys.stdin.read()
 
-    # If output file specified, let library write it
-    if args.output:
-        draw(qasm_str, theme=args.theme, filename=args.output)
+    # A render server only draws single SVGs of QASM source
+    remote = isinstance(qasm_str, str) and len(themes) == 1 and not (
+        args.no_server or cache or profile or args.save_layout or args.overview or args.html or args.page_width)
+    svg = render_remote(qasm_str, themes[0], args, compact) if remote else None
+    if svg is not None:
+        if args.output:
+            from quantum_quirkvis.drawer import _render_to_file
+            _render_to_file(args.output, lambda f: f.write(svg))
+        else:
+            sys.stdout.write(svg)
+        return
+
+    from quantum_quirkvis import draw, draw_many, draw_pages, export_html, draw_overview, compute_layout
+    if args.save_layout:
+        compute_layout(qasm_str, theme=themes[0], fold=args.fold).save(args.save_layout)
+    elif args.overview:
+        svg = draw_overview(qasm_str, theme=themes[0], filename=args.output, metric=args.overview, fold=args.fold)
+        if svg is not None:
+            sys.stdout.write(svg)
+    elif args.html:
+        export_html(qasm_str, args.html, theme=themes[0], jobs=args.jobs, fold=args.fold)
+    elif args.page_width:
+        # Pages are rendered in parallel, one file each
+        if not args.output:
+            p.error("--page-width needs an output file (-o), e.g. -o 'circuit_{page}.svg'")
+        draw_pages(qasm_str, theme=themes[0], filename=args.output, moments_per_page=args.page_width,
+                   jobs=args.jobs, fold=args.fold, symbols=args.symbols, index=args.index, compact=compact)
+    elif len(themes) > 1:
+        # One parse and layout for all the themes
+        if not args.output:
+            p.error("several themes need an output file (-o), e.g. -o 'circuit_{theme}.svg'")
+        output = args.output
+        if "{theme}" not in output:
+            root, ext = os.path.splitext(output)
+            output = root + "_{theme}" + ext
+        draw_many(qasm_str, themes, filename=output, fold=args.fold, symbols=args.symbols, cache=cache, profile=profile,
+                  compact=compact)
+    # If output file specified, let library stream it there
+    elif args.output:
+        draw(qasm_str, theme=themes[0], filename=args.output, fold=args.fold, symbols=args.symbols, cache=cache,
+             profile=profile, compact=compact, return_svg=False)
     else:
-        svg = draw(qasm_str, theme=args.theme)
+        svg = draw(qasm_str, theme=themes[0], fold=args.fold, symbols=args.symbols, cache=cache, profile=profile,
+                   compact=compact)
         sys.stdout.write(svg)
 
 
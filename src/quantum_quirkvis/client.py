@@ -0,0 +1,138 @@
+import json
+import os
+import socket
+import stat
+
+DEFAULT_PORT = 8765
+# Read by clients and --serve when no address is given
+ADDRESS_ENV = "QUIRKVIS_SERVER"
+# A local server accepts at once, a longer wait means nothing is listening
+CONNECT_TIMEOUT = 1.0
+# Response header with the package version of the server
+VERSION_HEADER = "X-Quirkvis-Version"
+
+
+class ServerError(Exception):
+    """The server couldn't render a request, status is the HTTP status."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def default_address():
+    """$QUIRKVIS_SERVER, else a per-user Unix socket (a localhost port where there are none)."""
+    address = os.environ.get(ADDRESS_ENV)
+    if address:
+        return address
+    if hasattr(socket, "AF_UNIX"):
+        directory = os.environ.get("XDG_RUNTIME_DIR") or "/tmp"
+        return os.path.join(directory, f"quirkvis-{os.getuid()}.sock")
+    return f"127.0.0.1:{DEFAULT_PORT}"
+
+
+def check_socket(path):
+    """Raise PermissionError unless path is a socket only the current user can use.
+
+    Anyone may create a file in /tmp, a socket there could belong to another
+    user's server, reading the programs and answering with any SVG.
+    """
+    st = os.stat(path)
+    if not stat.S_ISSOCK(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise PermissionError(f"{path} is not a socket private to the current user")
+
+
+def is_loopback(host):
+    """Whether host is a loopback address, which only local clients reach."""
+    import ipaddress
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_address(address):
+    """A Unix socket path for "unix:PATH" or a path, (host, port) for "host:port" or "http://host:port"."""
+    if address.startswith("unix:"):
+        return address[5:]
+    if address.startswith("http://"):
+        address = address[7:].rstrip("/")
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.sep not in address:
+        return host.strip("[]") or "127.0.0.1", int(port)
+    return address
+
+
+def request(method, path, body=b"", address=None, timeout=None):
+    """Send one HTTP/1.0 request to the server and return (status, headers, body).
+
+    headers maps lowercase names to values. Raises OSError when no server
+    is listening, or a Unix socket isn't private, see check_socket(). A raw
+    socket rather than http.client, which takes longer to import than a
+    cached render.
+    """
+    target = parse_address(address or default_address())
+    if isinstance(target, str):
+        check_socket(target)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(target)
+        except BaseException:
+            sock.close()
+            raise
+    else:
+        sock = socket.create_connection(target, CONNECT_TIMEOUT)
+    with sock:
+        sock.settimeout(timeout)
+        head = f"{method} {path} HTTP/1.0\r\nHost: quirkvis\r\nContent-Length: {len(body)}\r\n\r\n"
+        sock.sendall(head.encode("ascii") + body)
+        chunks = []
+        while True:
+            chunk = sock.recv(1 << 16)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    head, _, payload = b"".join(chunks).partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        status = int(lines[0].split(None, 2)[1])
+    except (IndexError, ValueError):
+        raise ConnectionError(f"Malformed response from {address or default_address()}") from None
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, headers, payload
+
+
+def render(program, theme=None, fold=False, symbols=False, compact=None, address=None, timeout=None):
+    """SVG of a QASM program drawn by a running server, see draw().
+
+    Raises OSError when no server is listening and ServerError when it
+    couldn't draw the program or runs another version of the package,
+    whose drawing could differ from draw().
+    """
+    from . import __version__
+    from .theme import is_builtin_theme, resolve_theme_path
+    if isinstance(theme, str) and not is_builtin_theme(theme):
+        # Found here as draw() would, the server has its own working directory
+        theme = os.path.abspath(resolve_theme_path(theme))
+    body = json.dumps({"program": program, "theme": theme, "fold": fold, "symbols": symbols, "compact": compact})
+    status, headers, payload = request("POST", "/render", body.encode("utf-8"), address, timeout)
+    version = headers.get(VERSION_HEADER.lower())
+    if version != __version__:
+        raise ServerError(status, f"Server runs version {version} of quirkvis, this is {__version__}")
+    if status != 200:
+        raise ServerError(status, payload.decode("utf-8", "replace"))
+    return payload.decode("utf-8")
+
+
+def server_stats(address=None):
+    """Counters of a running server, see RenderServer.stats()."""
+    status, _, payload = request("GET", "/stats", address=address, timeout=CONNECT_TIMEOUT)
+    if status != 200:
+        raise ServerError(status, payload.decode("utf-8", "replace"))
+    return json.loads(payload)
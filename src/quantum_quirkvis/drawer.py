@@ -1,48 +1,303 @@
-import xml.etree.ElementTree as ET
-from pyqasm.entrypoint import loads
-from openqasm3 import ast
+import io
+import os
 from .theme import ThemeManager
+from .scheduler import DepthFrontier
+from .flat import FlatModule, parse_flat
+from .writer import CompactWriter, StreamWriter, SymbolWriter, TreeWriter
+from .layout import Layout, Op
+from .cache import MemoryCache, get_cache, program_key
+from .geometry import DEFAULT_PRECISION, wave_path
+from .profiling import NO_PROFILE, CountingOut, CountingWriter
+from .lazy import LazyModule
+
+ast = LazyModule('openqasm3.ast')
+
+# Files with this extension are written gzipped
+SVGZ_EXTENSION = ".svgz"
+# zlib's default level, 9 is ~7% smaller but ~2.5x slower on large drawings
+SVGZ_LEVEL = 6
+LAYOUT_CACHE_BYTES = 64 * 1024 * 1024
+# Measured memory of a layout per operation, with its Op record and moment
+OP_BYTES = 230
+
+def layout_size(layout):
+    return OP_BYTES * (sum(len(moment) for moment in layout.moments) + 1)
+
+# Layouts of the QASM programs drawn last, shared by every drawer of the process.
+# layout_cache=None turns it off for a drawer, max_bytes = 0 for the process
+LAYOUT_CACHE = MemoryCache(LAYOUT_CACHE_BYTES, sizeof=layout_size)
 
 class SVGDrawer:
-    def __init__(self, theme=None):
+    def __init__(self, theme=None, fold=False, symbols=False, cache=None, fast_parse=True, profile=None, compact=None,
+                 layout_cache=LAYOUT_CACHE):
         self.theme_manager = ThemeManager(theme)
+        self.fold = fold
+        self.symbols = symbols
+        # Decimals of the coordinates in compact output (True: the default), None for full output
+        self.compact = DEFAULT_PRECISION if compact is True else None if compact is False else compact
+        self.fast_parse = fast_parse
+        self.cache = get_cache(cache)
+        # A profiling.Profile collecting phase timings and counters
+        self.profile = profile or NO_PROFILE
+        # A MemoryCache of layouts, None to parse and schedule every program
+        self.layout_cache = layout_cache
+        self.blocks = {}
+
+    def draw(self, program_str, out=None):
+        self.profile.start()
+        try:
+            return self._draw(program_str, out)
+        finally:
+            self.profile.finish()
 
-    def draw(self, program_str):
+    def _draw(self, program_str, out):
+        key = self.cache_key(program_str)
+        if key is None:
+            return self.render(self._shared_layout(program_str), out=out)
+
+        # Cache hits skip parsing and layout entirely
+        svg = self.cache.get(key)
+        if svg is None:
+            self.profile.count('cache_misses')
+            svg = self.render(self._shared_layout(program_str))
+            self.cache.put(key, svg)
+        else:
+            self.profile.count('cache_hits')
+        if out is not None:
+            out.write(svg)
+            return None
+        return svg
+
+    def cache_key(self, program_str):
+        # Only QASM source can be cached, parsed modules have no stable content hash
+        if self.cache is None or not isinstance(program_str, str):
+            return None
+        return self.cache.key(program_str, self.theme_manager.compiled.digest,
+                              fold=self.fold, symbols=self.symbols, compact=self.compact)
+
+    def parse(self, program_str):
+        if isinstance(program_str, FlatModule):
+            # Parsed and unrolled already, see unroll_program()
+            return program_str, program_str.blocks
         if isinstance(program_str, str):
-            module = loads(program_str)
+            with self.profile.phase('parse'):
+                # Flat gate lists have no loops or user gates, nothing to fold
+                module = parse_flat(program_str) if self.fast_parse else None
+                if module is not None:
+                    return module, {}
+                from pyqasm.entrypoint import loads
+                module = loads(program_str)
+        elif program_str._unrolled_ast.statements:
+            # The caller's module was unrolled already, read it as it is
+            return FlatModule.snapshot(program_str), {}
         else:
-            module = program_str
+            # unroll() rewrites the statements it visits, the caller's module stays intact
+            with self.profile.phase('parse'):
+                module = program_str.copy()
 
-        module.unroll()
-        module.remove_includes()
+        with self.profile.phase('unroll'):
+            if self.fold:
+                # Keep loops and user gates as opaque blocks instead of expanding them
+                from .folding import fold_module
+                module, blocks = fold_module(module)
+                module.unroll(external_gates=list(blocks))
+            else:
+                blocks = {}
+                module.unroll()
+            module.remove_includes()
+        return module, blocks
 
+    def get_layout(self, program, parse=None):
+        """Layout of a program, from the layout cache when one was computed
+        with the same line ordering before, otherwise parsed with parse
+        (default: self.parse) and scheduled.
+
+        The cache keeps its own layout, the one returned is a copy callers
+        may change."""
+        layout = self._shared_layout(program, parse)
+        return layout.copy() if self.layout_cache_key(program) else layout
+
+    def _shared_layout(self, program, parse=None):
+        # get_layout() without the copy, for renders that only read the layout
+        # Saved layouts are rendered as they are
+        if isinstance(program, Layout):
+            return program
+        key = self.layout_cache_key(program)
+        layout = self.layout_cache.get(key) if key else None
+        if key:
+            self.profile.count('layout_cache_hits' if layout is not None else 'layout_cache_misses')
+        if layout is None:
+            layout = self.layout(*(parse or self.parse)(program))
+            if key:
+                self.layout_cache.put(key, layout)
+        return layout
+
+    def layout_key(self):
+        # The only theme settings that change line assignment and scheduling
+        return self._line_order()
+
+    def layout_cache_key(self, program):
+        # Sizes and spacing are applied when rendering, layouts don't depend on them
+        if self.layout_cache is None or not isinstance(program, str):
+            return None
+        return program_key(program, fold=self.fold, line_order=self.layout_key())
+
+    def layout(self, module, blocks=None):
+        line_nums, quantum_registers, classical_registers, ops = self._prepare(module, blocks)
+        with self.profile.phase('scheduling'):
+            moments, depths = self._compute_moments(ops, line_nums)
+        self.profile.count('moments', len(moments))
+        return Layout(line_nums, moments, quantum_registers, classical_registers, blocks)
+
+    def _prepare(self, module, blocks=None):
+        # Line assignment and Op records, everything layout() does before scheduling
         quantum_registers = list(module._qubit_registers.keys()) if module._qubit_registers else []
         classical_registers = list(module._classical_registers.keys()) if module._classical_registers else []
-        line_nums, sizes = self._compute_line_nums(module)
-        statements = list(module._statements)
-        # Collapse barriers into one:
-        result = []
-        for stmt in statements:
-            if not (result and isinstance(stmt, ast.QuantumBarrier) and isinstance(result[-1], ast.QuantumBarrier)):
-                result.append(stmt)
-        statements = result
-        moments, depths = self._compute_moments(statements, line_nums)
-        
-        n_lines = max(line_nums.values()) + 1 if line_nums else 0
-        print("lines", n_lines)
-        n_moments = len(moments)
+        with self.profile.phase('line_assignment'):
+            line_nums, sizes = self._compute_line_nums(module)
+        with self.profile.phase('resolve'):
+            statements = list(module._statements)
+            # Collapse barriers into one:
+            result = []
+            for stmt in statements:
+                if not (result and isinstance(stmt, ast.QuantumBarrier) and isinstance(result[-1], ast.QuantumBarrier)):
+                    result.append(stmt)
+            statements = result
+            ops = self._resolve(statements, line_nums, quantum_registers, blocks)
+        self.profile.count('statements', len(module._statements))
+        self.profile.count('ops', len(ops))
+        self.profile.count('lines', max(line_nums.values()) + 1 if line_nums else 0)
+        return line_nums, quantum_registers, classical_registers, ops
+
+    def render(self, layout, out=None):
+        self.theme = self.theme_manager.compiled
+        self.blocks = layout.blocks
+        line_nums = layout.line_nums
+        moments = layout.moments
+
+        n_lines = layout.n_lines
+        n_moments = layout.n_moments
+        profile = self.profile
         
         # No fallbacks allowed, these will raise KeyError if missing in theme
+        padding = self.theme_manager.get_dimension('padding')
+        label_offset = self.theme_manager.get_dimension('label_offset')
+        width, height = self._canvas_size(n_lines, n_moments)
+        
+        if profile is not NO_PROFILE and out is not None:
+            out = CountingOut(out, profile)
+        buffer = None
+        if self.compact is not None:
+            # Compact output is always streamed, for its shorter empty tags
+            if out is None:
+                out = buffer = io.StringIO()
+            svg = StreamWriter(out, empty_tag="/>")
+        else:
+            svg = StreamWriter(out) if out is not None else TreeWriter()
+        if profile is not NO_PROFILE:
+            svg = CountingWriter(svg, profile)
+        if self.compact is not None:
+            svg = CompactWriter(svg, self.compact)
+        if self.symbols:
+            svg = SymbolWriter(svg)
+        with profile.phase('canvas'):
+            self._draw_canvas(svg, width, height)
+            
+            # Draw labels
+            self._draw_labels(svg, line_nums)
+
+            # Draw wires (Stave)
+            self._draw_wires(svg, line_nums, width)
+
+            # Pages of a longer circuit: mark the cut edges
+            before, after = layout.continued
+            if before:
+                self._draw_continuation(svg, padding + label_offset, n_lines)
+            if after:
+                self._draw_continuation(svg, width - padding, n_lines)
+
+        self._draw_moments(svg, moments)
+
+        with profile.phase('serialization'):
+            svg.end()
+            result = svg.getvalue() if buffer is None else buffer.getvalue()
+        if result is not None:
+            profile.count('bytes', len(result.encode('utf-8')))
+        return result
+
+    def render_labels(self, layout, out=None):
+        """Render only the register labels, as wide as the margin left of the wires."""
+        self.theme = self.theme_manager.compiled
+        padding = self.theme_manager.get_dimension('padding')
+        line_spacing = self.theme_manager.get_dimension('line_spacing')
+        label_offset = self.theme_manager.get_dimension('label_offset')
+        width = padding + label_offset
+        height = (0.5 * padding) + (layout.n_lines * line_spacing)
+
+        svg = StreamWriter(out) if out is not None else TreeWriter()
+        svg.start('svg', {
+            'xmlns': 'http://www.w3.org/2000/svg',
+            'width': str(width),
+            'height': str(height),
+            'viewBox': f'0 0 {width} {height}'
+        })
+        self._draw_labels(svg, layout.line_nums)
+        svg.end()
+        return svg.getvalue()
+
+    def render_tile(self, layout, lo, hi, out=None):
+        """Render lines lo..hi of a page layout as a tile of a larger view.
+
+        The viewBox is cut to the page's moments and to those lines, so
+        tiles placed side by side join up; only the operations reaching
+        into the tile are drawn, and background and labels are left out.
+        """
+        self.theme = self.theme_manager.compiled
+        self.blocks = layout.blocks
+        padding = self.theme_manager.get_dimension('padding')
+        line_spacing = self.theme_manager.get_dimension('line_spacing')
+        label_offset = self.theme_manager.get_dimension('label_offset')
+        stride = self.theme_manager.get_dimension('gate_width') + self.theme_manager.get_dimension('gate_spacing')
+
+        x0 = padding + label_offset
+        y0 = padding + lo * line_spacing - line_spacing / 2
+        width = layout.n_moments * stride
+        height = (hi - lo + 1) * line_spacing
+
+        svg = StreamWriter(out) if out is not None else TreeWriter()
+        svg.start('svg', {
+            'xmlns': 'http://www.w3.org/2000/svg',
+            'width': str(width),
+            'height': str(height),
+            'viewBox': f'{x0} {y0} {width} {height}'
+        })
+        wire_config = self.theme_manager.get_style('qubit_wire')
+        for q, line_idx in layout.line_nums.items():
+            if lo <= line_idx <= hi:
+                y = padding + line_idx * line_spacing
+                self._draw_line(svg, x0, y, x0 + width, y, wire_config)
+
+        def visible(op):
+            lines = op.lines if op.target is None else op.lines + (op.target,)
+            return bool(lines) and min(lines) <= hi and max(lines) >= lo
+        self._draw_moments(svg, layout.moments, visible)
+
+        svg.end()
+        return svg.getvalue()
+
+    def _canvas_size(self, n_lines, n_moments):
         gate_width = self.theme_manager.get_dimension('gate_width')
         gate_spacing = self.theme_manager.get_dimension('gate_spacing')
         line_spacing = self.theme_manager.get_dimension('line_spacing')
         padding = self.theme_manager.get_dimension('padding')
         label_offset = self.theme_manager.get_dimension('label_offset')
-        
         width = (padding * 2) + (n_moments * (gate_width + gate_spacing)) + (label_offset * 1.5)
         height = (0.5 * padding) + (n_lines * line_spacing)
-        
-        svg = ET.Element('svg', {
+        return width, height
+
+    def _draw_canvas(self, svg, width, height):
+        # Opens the document, the caller closes it
+        svg.start('svg', {
             'xmlns': 'http://www.w3.org/2000/svg',
             'width': str(width),
             'height': str(height),
@@ -50,13 +305,25 @@ class SVGDrawer:
         })
         
         bg_color = self.theme_manager.get_style('background')
-        ET.SubElement(svg, 'rect', {
+        svg.element('rect', {
             'width': '100%',
             'height': '100%',
             'fill': bg_color
         })
-        
-        # Draw labels
+
+    def _draw_wires(self, svg, line_nums, width):
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
+        label_offset = self.theme_manager.get_dimension('label_offset')
+        wire_config = self.theme_manager.get_style('qubit_wire')
+        for q, line_idx in line_nums.items():
+            y = padding + line_idx * line_spacing
+            self._draw_line(svg, padding + label_offset, y, width - padding, y, wire_config)
+
+    def _draw_labels(self, svg, line_nums):
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
+        label_offset = self.theme_manager.get_dimension('label_offset')
         text_color = self.theme_manager.get_style('text')
         label_font = self.theme_manager.get_style('label_font')
         drawn_lines = set()
@@ -67,7 +334,7 @@ class SVGDrawer:
             
             y = padding + line_idx * line_spacing
             label = f"{reg_name}[{reg_idx}]" if reg_idx != -1 else reg_name
-            text = ET.SubElement(svg, 'text', {
+            svg.element('text', {
                 'x': str(padding + label_offset - 10),
                 'y': str(y),
                 'fill': text_color,
@@ -75,48 +342,47 @@ class SVGDrawer:
                 'font-size': str(label_font['size']),
                 'text-anchor': 'end',
                 'dominant-baseline': 'middle'
-            })
-            text.text = label
-
-        # Draw wires (Stave)
-        wire_config = self.theme_manager.get_style('qubit_wire')
-        for q, line_idx in line_nums.items():
-            y = padding + line_idx * line_spacing
-            self._draw_line(svg, padding + label_offset, y, width - padding, y, wire_config)
+            }, label)
 
-        # Draw moments Phase 1: Vertical Lines
+    def _draw_moments(self, svg, moments, visible=None):
         gate_width = self.theme_manager.get_dimension('gate_width')
         gate_spacing = self.theme_manager.get_dimension('gate_spacing')
+        padding = self.theme.padding
+        label_offset = self.theme_manager.get_dimension('label_offset')
         x_start = padding + label_offset + gate_width/2
-        
-        x = x_start
-        for moment in moments:
-            for stmt in moment:
-                self._draw_statement(svg, stmt, x, line_nums, phase='lines', qbits=quantum_registers, classical=classical_registers)
-            x += gate_width + gate_spacing
-
-        # Draw moments Phase 2: Shapes/Gates
-        x = x_start
-        for moment in moments:
-            for stmt in moment:
-                self._draw_statement(svg, stmt, x, line_nums, phase='shapes', qbits=quantum_registers, classical=classical_registers)
-            x += gate_width + gate_spacing
-
-        return ET.tostring(svg, encoding='unicode')
-
-    def _draw_statement(self, svg, stmt, x, line_nums, phase='shapes', qbits=[], classical=[]):
-        if isinstance(stmt, ast.QuantumGate):
-            self._draw_gate(svg, stmt, x, line_nums, phase)
-        elif isinstance(stmt, ast.QuantumMeasurementStatement):
-            self._draw_measurement(svg, stmt, x, line_nums, phase)
-        elif isinstance(stmt, ast.QuantumBarrier):
+
+        # Phase 1: Vertical Lines, Phase 2: Shapes/Gates
+        for phase in ('lines', 'shapes'):
+            with self.profile.phase(phase + '_pass'):
+                x = x_start
+                for moment in moments:
+                    for op in moment:
+                        if visible is None or visible(op):
+                            self._draw_statement(svg, op, x, phase=phase)
+                    x += gate_width + gate_spacing
+
+    def _draw_continuation(self, svg, x, n_lines):
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
+        config = self.theme_manager.get_style('continuation')
+        y_min = padding - line_spacing / 2
+        y_max = padding + (n_lines - 1) * line_spacing + line_spacing / 2
+        self._draw_line(svg, x, y_min, x, y_max, config)
+
+    def _draw_statement(self, svg, op, x, phase='shapes'):
+        if op.kind == Op.BLOCK:
+            self._draw_block(svg, op, x, phase)
+        elif op.kind == Op.GATE:
+            self._draw_gate(svg, op, x, phase)
+        elif op.kind == Op.MEASURE:
+            self._draw_measurement(svg, op, x, phase)
+        elif op.kind == Op.BARRIER:
             if phase == 'lines': # Barrier is a line
-                self._draw_barrier(svg, stmt, x, line_nums, qbits)
+                self._draw_barrier(svg, op, x)
 
-    def _draw_gate(self, svg, gate, x, line_nums, phase='shapes'):
-        name = gate.name.name.lower()
-        qubits = [self._identifier_to_key(q) for q in gate.qubits]
-        lines = [line_nums[q] for q in qubits]
+    def _draw_gate(self, svg, op, x, phase='shapes'):
+        name = op.name.lower()
+        lines = op.lines
         
         sub = self.theme_manager.get_substitution(name)
         config = self.theme_manager.get_gate_config(name)
@@ -130,34 +396,24 @@ class SVGDrawer:
         if name in ['ccx', 'ccz']: is_controlled = True
 
         if is_controlled and len(lines) > 1:
-            self._draw_controlled_gate(svg, name, lines, x, phase, gate)
+            self._draw_controlled_gate(svg, name, lines, x, phase, op.params)
             return
 
         if phase == 'lines':
             if len(lines) > 1:
                 # Generic multi-qubit vertical connection
-                padding = self.theme_manager.get_dimension('padding')
-                line_spacing = self.theme_manager.get_dimension('line_spacing')
+                padding = self.theme.padding
+                line_spacing = self.theme.line_spacing
                 y_min = padding + min(lines) * line_spacing
                 y_max = padding + max(lines) * line_spacing
-                conn_config = self.theme_manager.get_style('connection_line')
+                conn_config = self.theme.connection_line
                 self._draw_line(svg, x, y_min, x, y_max, conn_config)
             return
 
-        padding = self.theme_manager.get_dimension('padding')
-        line_spacing = self.theme_manager.get_dimension('line_spacing')
-
-        # Evaluate parameters if any
-        params = []
-        if hasattr(gate, 'arguments') and gate.arguments:
-            from pyqasm.expressions import Qasm3ExprEvaluator
-            for arg in gate.arguments:
-                try:
-                    val = Qasm3ExprEvaluator.evaluate_expression(arg)[0]
-                    params.append(val)
-                except:
-                    pass
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
 
+        params = op.params
         for line_idx in lines:
             y = padding + line_idx * line_spacing
             
@@ -171,28 +427,72 @@ class SVGDrawer:
             else:
                 self._draw_shape(svg, x, y, config, label=gate_label, params=params)
 
-    def _draw_controlled_gate(self, svg, name, lines, x, phase, gate):
+    def _draw_block(self, svg, op, x, phase='shapes'):
+        if phase == 'lines':
+            return
+
+        label, annotation = self.blocks[op.name]
+        lines = op.lines
+
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
+        gate_height = self.theme_manager.get_dimension('gate_height')
+        config = self.theme_manager.get_shape_config('block')
+
+        # One box over the whole span of lines the block touches
+        y_min = padding + min(lines) * line_spacing - gate_height / 2
+        y_max = padding + max(lines) * line_spacing + gate_height / 2
+        w = config.get('width', self.theme_manager.get_dimension('gate_width'))
+        svg.element('rect', {
+            'x': str(x - w/2), 'y': str(y_min),
+            'width': str(w), 'height': str(y_max - y_min), 'rx': str(config.get('radius', 0)),
+            'fill': config.svg['fill'],
+            'stroke': config.svg['stroke'],
+            'stroke-width': config.svg['stroke-width']
+        })
+
+        text_color = self.theme.text
+        svg.element('text', {
+            'x': str(x), 'y': str((y_min + y_max) / 2),
+            'fill': text_color,
+            'font-family': 'sans-serif',
+            'font-size': '12',
+            'text-anchor': 'middle',
+            'dominant-baseline': 'middle',
+        }, label)
+
+        if annotation:
+            svg.element('text', {
+                'x': str(x), 'y': str(y_max + config.get('annotation_offset', 10)),
+                'fill': text_color,
+                'font-family': 'sans-serif',
+                'font-size': '10',
+                'text-anchor': 'middle',
+                'dominant-baseline': 'middle',
+            }, annotation)
+
+    def _draw_controlled_gate(self, svg, name, lines, x, phase, params):
         # By convention, the last qubit is the target, others are controls
         ctrl_lines = lines[:-1]
         target_line = lines[-1]
         
         if phase == 'lines':
-            padding = self.theme_manager.get_dimension('padding')
-            line_spacing = self.theme_manager.get_dimension('line_spacing')
+            padding = self.theme.padding
+            line_spacing = self.theme.line_spacing
             y_min = padding + min(lines) * line_spacing
             y_max = padding + max(lines) * line_spacing
-            conn_config = self.theme_manager.get_style('connection_line')
+            conn_config = self.theme.connection_line
             self._draw_line(svg, x, y_min, x, y_max, conn_config)
             return
 
         # Draw controls
         ctrl_config = self.theme_manager.get_shape_config('control_dot')
-        padding = self.theme_manager.get_dimension('padding')
-        line_spacing = self.theme_manager.get_dimension('line_spacing')
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
         for cl in ctrl_lines:
             y = padding + cl * line_spacing
             # Theme override for control dot per gate
-            gate_config = self.theme_manager.theme.get('gates', {}).get(name, {})
+            gate_config = self.theme.gate_overrides.get(name, {})
             specific_ctrl = gate_config.get('control_shape', ctrl_config)
             if isinstance(specific_ctrl, str): # if it's just a shape name reference
                 specific_ctrl = self.theme_manager.get_shape_config(specific_ctrl)
@@ -212,13 +512,6 @@ class SVGDrawer:
             
             target_config = self.theme_manager.get_gate_config(base_name)
             
-            # Evaluate parameters for target gate
-            params = []
-            if hasattr(gate, 'arguments') and gate.arguments:
-                from pyqasm.expressions import Qasm3ExprEvaluator
-                for arg in gate.arguments:
-                    params.append(Qasm3ExprEvaluator.evaluate_expression(arg)[0])
-            
             gate_label = target_config.get('label', base_name.upper())
             if 'text' in target_config: gate_label = target_config['text']
             
@@ -230,14 +523,14 @@ class SVGDrawer:
         pass 
 
     def _draw_swap(self, svg, line1, line2, x, phase='shapes'):
-        padding = self.theme_manager.get_dimension('padding')
-        line_spacing = self.theme_manager.get_dimension('line_spacing')
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
         
         y1 = padding + line1 * line_spacing
         y2 = padding + line2 * line_spacing
         
         if phase == 'lines':
-            conn_config = self.theme_manager.get_style('connection_line')
+            conn_config = self.theme.connection_line
             self._draw_line(svg, x, y1, x, y2, conn_config)
             return
         
@@ -245,29 +538,16 @@ class SVGDrawer:
         for y in [y1, y2]:
             self._draw_shape(svg, x, y, cross_config)
 
-    def _draw_measurement(self, svg, stmt, x, line_nums, phase='shapes'):
-        padding = self.theme_manager.get_dimension('padding')
-        line_spacing = self.theme_manager.get_dimension('line_spacing')
-        qubit = self._identifier_to_key(stmt.measure.qubit)
-        line_idx = line_nums[qubit]
-        y = padding + line_idx * line_spacing
-        
-        target_key = None
-        if stmt.target:
-            target_key = self._identifier_to_key(stmt.target)
-        else:
-            # Strictly assume classical registry named 'c', index 0
-            if ('c', 0) in line_nums:
-                target_key = ('c', 0)
-            elif ('c', -1) in line_nums:
-                target_key = ('c', -1)
+    def _draw_measurement(self, svg, op, x, phase='shapes'):
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
+        y = padding + op.lines[0] * line_spacing
 
         if phase == 'lines':
             # Draw connection to classical target
-            if target_key and target_key in line_nums:
-                target_idx = line_nums[target_key]
-                y_target = padding + target_idx * line_spacing
-                conn_config = self.theme_manager.get_style('measurement_line')
+            if op.target is not None:
+                y_target = padding + op.target * line_spacing
+                conn_config = self.theme.measurement_line
                 self._draw_line(svg, x, y, x, y_target, conn_config)
             return
 
@@ -279,13 +559,13 @@ class SVGDrawer:
             
         self._draw_shape(svg, x, y, config, label=gate_label)
 
-    def _draw_barrier(self, svg, stmt, x, line_nums, qbits):
-        padding = self.theme_manager.get_dimension('padding')
-        line_spacing = self.theme_manager.get_dimension('line_spacing')
+    def _draw_barrier(self, svg, op, x):
+        padding = self.theme.padding
+        line_spacing = self.theme.line_spacing
         barrier_config = self.theme_manager.get_style('barrier')
         barrier_padding = self.theme_manager.get_dimension('barrier_padding')
         
-        lines = [v for k, v in line_nums.items() if k[0] in qbits]
+        lines = op.lines
         if not lines: return
         
         y_min = padding + min(lines) * line_spacing - barrier_padding
@@ -295,61 +575,54 @@ class SVGDrawer:
 
     def _draw_line(self, svg, x1, y1, x2, y2, config):
         style = config['style']
-        stroke = config['stroke']
-        width = config['stroke_width']
-        dash = config.get('dasharray', '')
+        stroke = config.svg['stroke']
+        width = config.svg['stroke-width']
+        dash = config.svg['stroke-dasharray']
         
-        if style == 'wave':
+        if style == 'wave' and isinstance(svg, SymbolWriter):
+            # Same wave between the same relative endpoints: draw it once
+            dx, dy = x2 - x1, y2 - y1
+            key = ('wave', dx, dy, config.key)
+            svg.use(key, x1, y1, lambda defs: self._draw_line(defs, 0, 0, dx, dy, config))
+        elif style == 'wave':
             amp = config['amplitude']
             wl = config['wavelength']
-            path_data = self._wave_path(x1, y1, x2, y2, amp, wl)
-            ET.SubElement(svg, 'path', {
+            precision = config.get('precision', DEFAULT_PRECISION)
+            if self.compact is not None:
+                precision = min(precision, self.compact)
+            path_data = wave_path(x1, y1, x2, y2, amp, wl, precision)
+            svg.element('path', {
                 'd': path_data,
                 'stroke': stroke,
-                'stroke-width': str(width),
+                'stroke-width': width,
                 'fill': 'none',
                 'stroke-dasharray': dash
             })
         else:
-            ET.SubElement(svg, 'line', {
+            svg.element('line', {
                 'x1': str(x1), 'y1': str(y1), 'x2': str(x2), 'y2': str(y2),
-                'stroke': stroke, 'stroke-width': str(width),
+                'stroke': stroke, 'stroke-width': width,
                 'stroke-dasharray': dash
             })
 
-    def _wave_path(self, x1, y1, x2, y2, amplitude, wavelength):
-        import math
-        dist = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-        angle = math.atan2(y2 - y1, x2 - x1)
-        
-        # For simplicity and precision, we generate points and join with L
-        res = 10 # points per wavelength
-        num_points = int(dist / wavelength * res)
-        d_points = []
-        for i in range(num_points + 1):
-            t = i / num_points
-            curr_dist = t * dist
-            
-            # Local wave offset
-            wave_y = amplitude * math.sin(2 * math.pi * curr_dist / wavelength)
-            
-            # Rotate and translate
-            gx = x1 + curr_dist * math.cos(angle) - wave_y * math.sin(angle)
-            gy = y1 + curr_dist * math.sin(angle) + wave_y * math.cos(angle)
-            d_points.append(f"{gx} {gy}")
-            
-        return "M " + " L ".join(d_points)
-
     def _draw_shape(self, svg, x, y, config, label=None, params=None):
         shape_type = config['type']
         
+        if isinstance(svg, SymbolWriter):
+            # The shape and its label become one symbol, only the parametric arc varies
+            key = ('shape', config.key, label)
+            svg.use(key, x, y, lambda defs: self._draw_shape(defs, 0, 0, config, label=label))
+            if shape_type == 'circle' and params and config.get('parametric_mode') == 'arc':
+                self._draw_parametric_arc(svg, x, y, config['radius'], params[0], config)
+            return
+
         if shape_type == 'circle':
             radius = config['radius']
-            ET.SubElement(svg, 'circle', {
+            svg.element('circle', {
                 'cx': str(x), 'cy': str(y), 'r': str(radius),
-                'fill': config.get('fill', 'none'),
-                'stroke': config.get('stroke', 'none'),
-                'stroke-width': str(config.get('stroke_width', 1))
+                'fill': config.svg['fill'],
+                'stroke': config.svg['stroke'],
+                'stroke-width': config.svg['stroke-width']
             })
             # Draw parametric arc if requested
             if params and config.get('parametric_mode') == 'arc':
@@ -359,82 +632,73 @@ class SVGDrawer:
             w = config['width']
             h = config['height']
             r = config.get('radius', 0)
-            ET.SubElement(svg, 'rect', {
+            svg.element('rect', {
                 'x': str(x - w/2), 'y': str(y - h/2),
                 'width': str(w), 'height': str(h), 'rx': str(r),
-                'fill': config.get('fill', 'none'),
-                'stroke': config.get('stroke', 'none'),
-                'stroke-width': str(config.get('stroke_width', 1))
+                'fill': config.svg['fill'],
+                'stroke': config.svg['stroke'],
+                'stroke-width': config.svg['stroke-width']
             })
         elif shape_type == 'diamond':
             size = config.get('radius', config.get('size', 20))
             points = f"{x},{y-size} {x+size},{y} {x},{y+size} {x-size},{y}"
-            ET.SubElement(svg, 'polygon', {
+            svg.element('polygon', {
                 'points': points,
-                'fill': config.get('fill', 'none'),
-                'stroke': config.get('stroke', 'none'),
-                'stroke-width': str(config.get('stroke_width', 1))
+                'fill': config.svg['fill'],
+                'stroke': config.svg['stroke'],
+                'stroke-width': config.svg['stroke-width']
             })
         elif shape_type == 'emoji':
             font_size = config.get('font_size', 24)
-            text = ET.SubElement(svg, 'text', {
+            svg.element('text', {
                 'x': str(x), 'y': str(y),
                 'font-size': str(font_size),
                 'text-anchor': 'middle', 
                 'dominant-baseline': 'middle'
-            })
-            text.text = config['value']
+            }, config['value'])
         elif shape_type == 'image':
             w = self.theme_manager.get_dimension('gate_width')
             h = self.theme_manager.get_dimension('gate_height')
-            ET.SubElement(svg, 'image', {
+            svg.element('image', {
                 'href': config['value'],
                 'x': str(x - w/2), 'y': str(y - h/2),
                 'width': str(w), 'height': str(h)
             })
         elif shape_type == 'cross':
             size = config['size']
-            line_config = {
-                'style': config.get('style', 'straight'),
-                'stroke': config['stroke'],
-                'stroke_width': config['stroke_width'],
-                'dasharray': config.get('dasharray', ''),
-                'amplitude': config.get('amplitude', 2),
-                'wavelength': config.get('wavelength', 4)
-            }
+            line_config = config.line
             self._draw_line(svg, x - size, y - size, x + size, y + size, line_config)
             self._draw_line(svg, x - size, y + size, x + size, y - size, line_config)
         elif shape_type == 'plus_circle':
             radius = config['radius']
             stroke = config['stroke']
-            sw = config['stroke_width']
-            fill = config.get('fill', 'none')
-            ET.SubElement(svg, 'circle', {
+            sw = config.svg['stroke-width']
+            fill = config.svg['fill']
+            svg.element('circle', {
                 'cx': str(x), 'cy': str(y), 'r': str(radius),
-                'fill': fill, 'stroke': stroke, 'stroke-width': str(sw)
+                'fill': fill, 'stroke': stroke, 'stroke-width': sw
             })
-            ET.SubElement(svg, 'line', {
+            svg.element('line', {
                 'x1': str(x - radius), 'y1': str(y), 'x2': str(x + radius), 'y2': str(y),
-                'stroke': stroke, 'stroke-width': str(sw)
+                'stroke': stroke, 'stroke-width': sw
             })
-            ET.SubElement(svg, 'line', {
+            svg.element('line', {
                 'x1': str(x), 'y1': str(y - radius), 'x2': str(x), 'y2': str(y + radius),
-                'stroke': stroke, 'stroke-width': str(sw)
+                'stroke': stroke, 'stroke-width': sw
             })
         elif shape_type == 'svg':
              pass
 
         if label:
-            text_color = self.theme_manager.get_style('text')
-            txt = ET.SubElement(svg, 'text', {
+            text_color = self.theme.text
+            svg.element('text', {
                 'x': str(x), 'y': str(y),
                 'fill': text_color, 
                 'font-family': 'sans-serif', 
                 'font-size': '12',
                 'text-anchor': 'middle', 
                 'dominant-baseline': 'middle',
-            })
-            txt.text = label
+            }, label)
 
     def _draw_parametric_arc(self, svg, x, y, base_radius, theta, config):
         import math
@@ -464,13 +728,13 @@ class SVGDrawer:
         
         if abs(theta) >= 2 * math.pi:
             # Full circle doesn't work well with arc command, draw a circle instead
-            ET.SubElement(svg, 'circle', {
+            svg.element('circle', {
                 'cx': str(x), 'cy': str(y), 'r': str(radius),
                 'fill': 'none', 'stroke': arc_stroke, 'stroke-width': str(arc_stroke_width)
             })
         else:
             d = f"M {x1} {y1} A {radius} {radius} 0 {large_arc_flag} {sweep_flag} {x2} {y2}"
-            ET.SubElement(svg, 'path', {
+            svg.element('path', {
                 'd': d,
                 'fill': 'none',
                 'stroke': arc_stroke,
@@ -478,83 +742,119 @@ class SVGDrawer:
                 'stroke-linecap': 'round'
             })
 
-    def _compute_moments(self, statements, line_nums):
-        # Full implementation of moment computation
-        depths = {k: -1 for k in line_nums}
-        moments = []
-        
-        for statement in statements:
-            # Filter non-quantum statements
-            if isinstance(statement, (ast.CalibrationGrammarDeclaration, ast.ClassicalDeclaration, 
-                                     ast.ConstantDeclaration, ast.ExternDeclaration, 
-                                     ast.IODeclaration, ast.QubitDeclaration)):
-                continue
+    def _resolve(self, statements, line_nums, quantum_registers, blocks=None):
+        """Turn the drawable statements into Op records.
 
-            if isinstance(statement, ast.QuantumGate):
-                qubits = [self._identifier_to_key(q) for q in statement.qubits]
-                lines = [line_nums[q] for q in qubits]
-                
-                # Clearance behavior: occupy all lines in the vertical span
-                min_l, max_l = min(lines), max(lines)
-                keys_in_span = [k for k, v in line_nums.items() if min_l <= v <= max_l]
-                
-                depth = 1 + max(depths[key] for key in keys_in_span)
-                for key in keys_in_span:
-                    depths[key] = depth
-                    
-            elif isinstance(statement, ast.QuantumMeasurementStatement):
-                key = self._identifier_to_key(statement.measure.qubit)
-                target_key = None
-                if statement.target:
-                    target_key = self._identifier_to_key(statement.target)
+        Every operand and gate argument is evaluated here once, scheduling
+        and both drawing passes only read the records.
+        """
+        keys = {}
+        def line(identifier):
+            # Operand nodes are often shared, resolve each one once
+            key = keys.get(id(identifier))
+            if key is None:
+                key = keys[id(identifier)] = (identifier, self._identifier_to_key(identifier))
+            return line_nums[key[1]]
+
+        # Barriers span every quantum line whatever their operands
+        barrier_lines = tuple(v for k, v in line_nums.items() if k[0] in quantum_registers)
+        if ('c', 0) in line_nums:
+            default_target = ('c', 0)
+        elif ('c', -1) in line_nums:
+            default_target = ('c', -1)
+        else:
+            default_target = None
+
+        blocks = blocks or {}
+        ops = []
+        for stmt in statements:
+            if isinstance(stmt, ast.QuantumGate):
+                name = stmt.name.name
+                lines = tuple(line(q) for q in stmt.qubits)
+                if name in blocks:
+                    ops.append(Op(Op.BLOCK, name, lines))
                 else:
-                    # Strictly target 'c[0]' or 'c'
-                    if ('c', 0) in line_nums: target_key = ('c', 0)
-                    elif ('c', -1) in line_nums: target_key = ('c', -1)
-
-                keys_in_span = [k for k, v in line_nums.items()]
-                depth = 1 + max(depths[k] for k in keys_in_span)
-                for k in keys_in_span:
-                    depths[k] = depth
-            elif isinstance(statement, ast.QuantumBarrier):
-                qubits = [self._identifier_to_key(q) for q in statement.qubits]
-                lines = [line_nums[q] for q in qubits]
-                
+                    params = self._evaluate_arguments(stmt.arguments, strict=self._labels_target(name, lines))
+                    ops.append(Op(Op.GATE, name, lines, params))
+            elif isinstance(stmt, ast.QuantumMeasurementStatement):
+                # Strictly assume classical registry named 'c', index 0 without a target
+                target_key = self._identifier_to_key(stmt.target) if stmt.target else default_target
+                target = line_nums.get(target_key) if target_key else None
+                ops.append(Op(Op.MEASURE, 'measure', (line(stmt.measure.qubit),), target=target))
+            elif isinstance(stmt, ast.QuantumBarrier):
+                ops.append(Op(Op.BARRIER, 'barrier', barrier_lines))
+            # Declarations and other statements aren't drawn
+        return ops
+
+    def _evaluate_arguments(self, arguments, strict=False):
+        # Arguments that can't be evaluated are left out, or raise when strict
+        params = []
+        for arg in arguments:
+            if isinstance(arg, (ast.FloatLiteral, ast.IntegerLiteral)):
+                params.append(arg.value)
+                continue
+            from pyqasm.expressions import Qasm3ExprEvaluator
+            try:
+                params.append(Qasm3ExprEvaluator.evaluate_expression(arg)[0])
+            except:
+                if strict:
+                    raise
+        return params
+
+    def _labels_target(self, name, lines):
+        # Controlled gates whose target is a labelled gate, see _draw_controlled_gate
+        name = name.lower()
+        return (len(lines) > 1 and name.startswith('c') and name != 'curry'
+                and name not in ('cx', 'ccx'))
+
+    def _compute_moments(self, ops, line_nums):
+        n_lines = max(line_nums.values()) + 1 if line_nums else 0
+        frontier = DepthFrontier(n_lines)
+        moments = []
+        self._schedule(ops, frontier, moments)
+        depths = {k: frontier.depth(v) for k, v in line_nums.items()}
+        return moments, depths
+
+    def _schedule(self, ops, frontier, moments):
+        """Place ops after everything frontier already holds, growing moments.
+
+        Returns the moment of every op, so scheduling can continue where an
+        earlier call stopped.
+        """
+        n_lines = frontier.n_lines
+        placed = []
+        for op in ops:
+            if op.kind == Op.GATE or op.kind == Op.BLOCK:
                 # Clearance behavior: occupy all lines in the vertical span
-                keys_in_span = [k for k, v in line_nums.items()]
-                depth = 1 + max(depths[key] for key in keys_in_span)
-                for key in keys_in_span:
-                    depths[key] = depth
+                depth = frontier.occupy(min(op.lines), max(op.lines))
             else:
-                # Skip other statements for now
-                continue
+                # Measurements and barriers occupy every line
+                depth = frontier.occupy(0, n_lines - 1)
 
             if depth >= len(moments):
                 for _ in range(depth - len(moments) + 1):
                     moments.append([])
             
-            moments[depth].append(statement)
-            
-        return moments, depths
+            moments[depth].append(op)
+            placed.append(depth)
+        return placed
 
     def _identifier_to_key(self, identifier):
-        from pyqasm.expressions import Qasm3ExprEvaluator
         if isinstance(identifier, ast.Identifier):
             return identifier.name, -1
 
         indices = identifier.indices
         if len(indices) >= 1 and isinstance(indices[0], list) and len(indices[0]) >= 1:
+            if isinstance(indices[0][0], ast.IntegerLiteral):
+                return identifier.name.name, indices[0][0].value
+            from pyqasm.expressions import Qasm3ExprEvaluator
             return (
                 identifier.name.name,
                 Qasm3ExprEvaluator.evaluate_expression(indices[0][0])[0],
             )
         raise ValueError(f"Unsupported identifier: {identifier}")
 
-    def _compute_line_nums(self, module):
-        line_nums = {}
-        sizes = {}
-        line_num = 0
-        
+    def _line_order(self):
         # Get ordering preferences from theme (dimensions or layout)
         try:
             rev_q = self.theme_manager.get_dimension('reverse_qubit_order')
@@ -565,6 +865,14 @@ class SVGDrawer:
             rev_c = self.theme_manager.get_dimension('reverse_classical_order')
         except:
             rev_c = False
+        return rev_q, rev_c
+
+    def _compute_line_nums(self, module):
+        line_nums = {}
+        sizes = {}
+        line_num = 0
+        
+        rev_q, rev_c = self._line_order()
 
         # Qubit registers first (at the top)
         for qubit_reg in module._qubit_registers:
@@ -580,10 +888,12 @@ class SVGDrawer:
         # Any measures on statements??:
         any_measures = any(isinstance(s, ast.QuantumMeasurementStatement) for s in module._statements)
 
-        if any_measures and not module._classical_registers:
-            module._classical_registers = {"c": 1}
-        for k in module._classical_registers:
-            size = module._classical_registers[k]
+        classical_registers = module._classical_registers
+        if any_measures and not classical_registers:
+            # Measurements without classical registers go to a single 'c' line
+            classical_registers = {"c": 1}
+        for k in classical_registers:
+            size = classical_registers[k]
             indices = list(range(size))
             if rev_c:
                 indices.reverse()
@@ -601,10 +911,131 @@ class SVGDrawer:
             
         return line_nums, sizes
 
-def draw(program, theme=None, filename=None):
-    drawer = SVGDrawer(theme)
-    svg_content = drawer.draw(program)
+def draw(program, theme=None, filename=None, fold=False, symbols=False, cache=None, profile=None, compact=None,
+         return_svg=True):
+    drawer = SVGDrawer(theme, fold=fold, symbols=symbols, cache=cache, profile=profile, compact=compact)
+    if filename and not return_svg:
+        # Streamed straight to the file, the document is never held in memory
+        _render_to_file(filename, lambda f: drawer.draw(program, out=f))
+        return None
+    svg = drawer.draw(program)
     if filename:
-        with open(filename, 'w') as f:
-            f.write(svg_content)
-    return svg_content
+        _render_to_file(filename, lambda f: f.write(svg))
+    return svg
+
+def compute_layout(program, theme=None, fold=False):
+    """Parse and schedule a program without rendering it.
+
+    The theme only matters through its line ordering flags. The returned
+    Layout can be saved, loaded and passed to draw() and friends instead of
+    the program.
+    """
+    return SVGDrawer(theme, fold=fold).get_layout(program)
+
+def unroll_program(program, fold=False):
+    """Parse and unroll a program once, to draw it many times.
+
+    Takes QASM source or a pyqasm module, which is never modified; a module
+    unrolled beforehand isn't unrolled again (nor folded). The snapshot can
+    be passed to draw(), draw_many(), compute_layout() and friends in place
+    of the program, any number of times.
+    """
+    module, blocks = SVGDrawer(fold=fold).parse(program)
+    if isinstance(module, FlatModule):
+        return module
+    return FlatModule.snapshot(module, blocks)
+
+def draw_many(program, themes, filename=None, fold=False, symbols=False, cache=None, profile=None, compact=None):
+    """Render one program in several themes, parsing and scheduling it once.
+
+    Themes sharing the same line ordering flags also share the layout, and
+    nothing is parsed when every theme is found in the cache.
+    Returns the SVG strings in theme order or, when filename is a template
+    such as "out/ghz_{theme}.svg", writes each one and returns the paths.
+    profile, a profiling.Profile, sees all the themes as one draw.
+    """
+    profile = profile or NO_PROFILE
+    drawers = [SVGDrawer(theme, fold=fold, symbols=symbols, cache=cache, profile=profile, compact=compact)
+               for theme in themes]
+    parsed = []
+    def parse_once(program):
+        if not parsed:
+            parsed.append(drawers[0].parse(program))
+        return parsed[0]
+    layouts = {}
+    results = []
+    profile.start()
+    try:
+        for i, (theme, drawer) in enumerate(zip(themes, drawers)):
+            cache_key = drawer.cache_key(program)
+            svg = drawer.cache.get(cache_key) if cache_key else None
+            if cache_key:
+                profile.count('cache_hits' if svg is not None else 'cache_misses')
+
+            if svg is None:
+                if isinstance(program, Layout):
+                    layout = program
+                else:
+                    key = drawer.layout_key()
+                    if key not in layouts:
+                        layouts[key] = drawer._shared_layout(program, parse_once)
+                    layout = layouts[key]
+                if cache_key:
+                    svg = drawer.render(layout)
+                    drawer.cache.put(cache_key, svg)
+
+            if filename:
+                path = filename.format(theme=theme_name(theme, i))
+                if svg is not None:
+                    _render_to_file(path, lambda f: f.write(svg))
+                else:
+                    _render_to_file(path, lambda f: drawer.render(layout, out=f))
+                results.append(path)
+            else:
+                results.append(svg if svg is not None else drawer.render(layout))
+    finally:
+        profile.finish()
+    return results
+
+def theme_name(theme, index=0):
+    if isinstance(theme, dict):
+        return theme.get('name', f"theme{index}")
+    if theme and os.path.isfile(theme):
+        return os.path.splitext(os.path.basename(theme))[0]
+    return theme or 'default'
+
+def _render_to_file(filename, render):
+    # Stream into a file next to the target and rename it over the target once
+    # complete: a failed render leaves the previous drawing in place
+    import tempfile
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+    try:
+        if filename.endswith(SVGZ_EXTENSION):
+            with os.fdopen(fd, 'wb') as raw, _open_svgz(filename, raw) as f:
+                render(f)
+        else:
+            with os.fdopen(fd, 'w') as f:
+                render(f)
+        # mkstemp creates it private, give it the permissions a plain open() would
+        os.chmod(tmp, 0o666 & ~_umask())
+        os.replace(tmp, filename)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def _umask():
+    global _UMASK
+    if _UMASK is None:
+        # Only readable by setting it, once rather than around every write
+        _UMASK = os.umask(0o022)
+        os.umask(_UMASK)
+    return _UMASK
+
+_UMASK = None
+
+def _open_svgz(filename, raw):
+    # Same bytes for the same drawing: no timestamp in the gzip header, which
+    # names filename rather than the temporary file raw writes to
+    import gzip
+    gz = gzip.GzipFile(filename, 'wb', compresslevel=SVGZ_LEVEL, fileobj=raw, mtime=0)
+    return io.TextIOWrapper(gz, encoding='utf-8')
@@ -0,0 +1,296 @@
+import math
+import re
+from .lazy import LazyModule
+
+ast = LazyModule('openqasm3.ast')
+
+# Gates pyqasm's unroll() leaves untouched: name -> (parameters, qubits)
+FLAT_GATES = {
+    'id': (0, 1), 'x': (0, 1), 'y': (0, 1), 'z': (0, 1), 'h': (0, 1),
+    's': (0, 1), 'sdg': (0, 1), 't': (0, 1), 'tdg': (0, 1), 'sx': (0, 1),
+    'rx': (1, 1), 'ry': (1, 1), 'rz': (1, 1),
+    'cx': (0, 2), 'cz': (0, 2), 'swap': (0, 2), 'ccx': (0, 3),
+}
+# Aliases the unroller renames
+GATE_ALIASES = {'CX': 'cx', 'cnot': 'cx', 'toffoli': 'ccx'}
+CONSTANTS = {'pi': math.pi, 'π': math.pi, 'tau': math.tau, 'τ': math.tau}
+# Names pyqasm refuses for registers: the language keywords and its constants
+RESERVED = frozenset({
+    'OPENQASM', 'angle', 'array', 'barrier', 'bit', 'bool', 'box', 'break', 'cal', 'case', 'complex',
+    'const', 'continue', 'creg', 'ctrl', 'def', 'default', 'defcal', 'defcalgrammar', 'delay',
+    'duration', 'durationof', 'else', 'end', 'extern', 'false', 'float', 'for', 'gate', 'gphase',
+    'if', 'im', 'in', 'include', 'input', 'int', 'inv', 'let', 'measure', 'mutable', 'negctrl',
+    'output', 'pow', 'qreg', 'qubit', 'readonly', 'reset', 'return', 'stretch', 'switch', 'true',
+    'uint', 'void', 'while', 'euler', *CONSTANTS,
+})
+
+_COMMENTS = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+_NAME = r"[A-Za-z_]\w*"
+_OPERAND = re.compile(rf"\s*({_NAME})\s*(?:\[\s*(\d+)\s*\])?\s*$")
+_VERSION = re.compile(r"OPENQASM\s+3(\.0)?$")
+_INCLUDE = re.compile(r'include\s+"stdgates\.inc"$')
+_QUBIT = re.compile(rf"qubit(?:\s*\[\s*(\d+)\s*\]\s*|\s+)({_NAME})$")
+_BIT = re.compile(rf"bit(?:\s*\[\s*(\d+)\s*\]\s*|\s+)({_NAME})$")
+_QREG = re.compile(rf"qreg\s+({_NAME})\s*\[\s*(\d+)\s*\]$")
+_CREG = re.compile(rf"creg\s+({_NAME})\s*\[\s*(\d+)\s*\]$")
+_MEASURE = re.compile(r"measure\s+([^-]+?)\s*(?:->\s*(.+))?$")
+_MEASURE_ASSIGN = re.compile(r"([^=]+?)\s*=\s*measure\s+(.+)$")
+_BARRIER = re.compile(r"barrier(?:\s+(.*))?$")
+_GATE = re.compile(rf"({_NAME})\s*(?:\((.*)\)\s*|\s+)(.+)$")
+_TOKEN = re.compile(r"\s*(?:(\d+\.\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?|\d+[eE][-+]?\d+)|(\d+)|(\w+)|(\S))")
+
+
+class Unsupported(Exception):
+    """The program is outside the flat subset, pyqasm has to handle it."""
+
+
+class FlatModule:
+    """The parts of an unrolled pyqasm module the drawer reads.
+
+    Also the snapshot returned by unroll_program(), blocks then holds the
+    folded blocks. The drawer never modifies it.
+    """
+
+    def __init__(self, statements, qubit_registers, classical_registers, blocks=None):
+        self._statements = statements
+        self._qubit_registers = qubit_registers
+        self._classical_registers = classical_registers
+        self.blocks = blocks or {}
+
+    @classmethod
+    def snapshot(cls, module, blocks=None):
+        # Includes are dropped, as remove_includes() does after unroll()
+        statements = module._unrolled_ast.statements if hasattr(module, '_unrolled_ast') else module._statements
+        return cls([s for s in statements if not isinstance(s, ast.Include)],
+                   dict(module._qubit_registers or {}), dict(module._classical_registers or {}), blocks)
+
+
+def parse_flat(program):
+    """Parse a flat gate list straight into unrolled form.
+
+    Covers register declarations, the gates in FLAT_GATES with constant
+    angle expressions, measure and barrier, and produces the same
+    statements pyqasm's unroll() would. Returns None for anything else,
+    including invalid programs, so pyqasm reports the error.
+    """
+    try:
+        return _FlatParser().parse(program)
+    except Unsupported:
+        return None
+
+
+def parse_flat_statements(source, qubits, bits):
+    """Parse statements following a program whose registers are declared.
+
+    qubits and bits map register names to sizes. Returns the unrolled
+    statements, or None when source is outside the flat subset or
+    declares registers of its own.
+    """
+    parser = _FlatParser()
+    # The program before source may include stdgates.inc already
+    parser.included = True
+    parser.qubits.update(qubits)
+    parser.bits.update(bits)
+    try:
+        parser.parse_statements(source)
+    except Unsupported:
+        return None
+    if len(parser.qubits) != len(qubits) or len(parser.bits) != len(bits):
+        return None
+    return parser.statements
+
+
+class _FlatParser:
+    def __init__(self):
+        self.qubits = {}
+        self.bits = {}
+        self.statements = []
+        self.included = False
+        # Operand nodes are shared between statements, the drawer only reads them
+        self._nodes = {}
+
+    def parse(self, program):
+        chunks = self.split(program)
+        # pyqasm insists on the version statement
+        if not _VERSION.match(" ".join(chunks[0].split())):
+            raise Unsupported(chunks[0])
+        for chunk in chunks[1:-1]:
+            self.statement(" ".join(chunk.split()))
+        return FlatModule(self.statements, self.qubits, self.bits)
+
+    def parse_statements(self, source):
+        for chunk in self.split(source)[:-1]:
+            self.statement(" ".join(chunk.split()))
+
+    def split(self, source):
+        chunks = _COMMENTS.sub(" ", source).split(";")
+        if chunks[-1].strip():
+            raise Unsupported(chunks[-1])
+        return chunks
+
+    def statement(self, stmt):
+        m = _INCLUDE.match(stmt)
+        if m:
+            if self.included:
+                raise Unsupported(f"repeated {stmt}")
+            self.included = True
+            return
+        m = _QUBIT.match(stmt) or _QREG.match(stmt)
+        if m:
+            name, size = (m.group(2), m.group(1)) if stmt.startswith("qubit") else m.groups()
+            self.declare(self.qubits, name, size)
+            self.statements.append(ast.QubitDeclaration(ast.Identifier(name), ast.IntegerLiteral(self.qubits[name])))
+            return
+        m = _BIT.match(stmt) or _CREG.match(stmt)
+        if m:
+            name, size = (m.group(2), m.group(1)) if stmt.startswith("bit") else m.groups()
+            self.declare(self.bits, name, size)
+            bit_type = ast.BitType(ast.IntegerLiteral(self.bits[name]))
+            self.statements.append(ast.ClassicalDeclaration(bit_type, ast.Identifier(name), None))
+            return
+        m = _MEASURE.match(stmt)
+        if m:
+            return self.measure(m.group(1), m.group(2))
+        m = _MEASURE_ASSIGN.match(stmt)
+        if m:
+            return self.measure(m.group(2), m.group(1))
+        m = _BARRIER.match(stmt)
+        if m:
+            qubits = [q for operand in (m.group(1) or "").split(",") if operand.strip()
+                      for q in self.operand(operand, self.qubits)]
+            self.statements.append(ast.QuantumBarrier([self.node(q) for q in qubits]))
+            return
+        m = _GATE.match(stmt)
+        if m:
+            return self.gate(*m.groups())
+        raise Unsupported(stmt)
+
+    def declare(self, registers, name, size):
+        if name in RESERVED:
+            raise Unsupported(f"reserved name {name}")
+        if name in self.qubits or name in self.bits:
+            raise Unsupported(f"redeclared {name}")
+        registers[name] = int(size) if size is not None else 1
+        if registers[name] < 1:
+            raise Unsupported(f"empty register {name}")
+
+    def operand(self, text, registers):
+        # Every (register, index) an operand refers to
+        m = _OPERAND.match(text)
+        if not m or m.group(1) not in registers:
+            raise Unsupported(text)
+        name, index = m.groups()
+        size = registers[name]
+        if index is None:
+            return [(name, i) for i in range(size)]
+        if int(index) >= size:
+            raise Unsupported(text)
+        return [(name, int(index))]
+
+    def gate(self, name, args, operands):
+        name = GATE_ALIASES.get(name, name)
+        if name not in FLAT_GATES:
+            raise Unsupported(name)
+        n_params, n_qubits = FLAT_GATES[name]
+        params = [_evaluate(arg) for arg in args.split(",")] if args is not None else []
+        if len(params) != n_params:
+            raise Unsupported(name)
+        arguments = [ast.FloatLiteral(p) for p in params]
+
+        operands = [self.operand(o, self.qubits) for o in operands.split(",")]
+        if len(operands) != n_qubits:
+            raise Unsupported(name)
+        # Whole registers only broadcast one-qubit gates here: pyqasm chunks
+        # the qubits of multi-qubit gates its own way
+        if n_qubits > 1 and any(len(o) > 1 for o in operands):
+            raise Unsupported(name)
+        width = len(operands[0])
+        for i in range(width):
+            qubits = [o[i] for o in operands]
+            if len(set(qubits)) != len(qubits):
+                raise Unsupported(name)
+            self.statements.append(ast.QuantumGate(
+                [], ast.Identifier(name), list(arguments), [self.node(q) for q in qubits]))
+
+    def measure(self, source, target):
+        qubits = self.operand(source, self.qubits)
+        if target is None:
+            for q in qubits:
+                self.statements.append(ast.QuantumMeasurementStatement(ast.QuantumMeasurement(self.node(q)), None))
+            return
+        bits = self.operand(target, self.bits)
+        if len(bits) != len(qubits):
+            raise Unsupported(f"{source} -> {target}")
+        for q, b in zip(qubits, bits):
+            self.statements.append(ast.QuantumMeasurementStatement(
+                ast.QuantumMeasurement(self.node(q)), self.node(b)))
+
+    def node(self, key):
+        node = self._nodes.get(key)
+        if node is None:
+            name, index = key
+            node = self._nodes[key] = ast.IndexedIdentifier(ast.Identifier(name), [[ast.IntegerLiteral(index)]])
+        return node
+
+
+def _evaluate(text):
+    # Constant arithmetic on numbers and pi/tau, same rounding as pyqasm
+    tokens = []
+    for m in _TOKEN.finditer(text):
+        flt, integer, word, op = m.groups()
+        if flt:
+            tokens.append(float(flt))
+        elif integer:
+            tokens.append(int(integer))
+        elif word:
+            if word not in CONSTANTS:
+                raise Unsupported(word)
+            tokens.append(CONSTANTS[word])
+        else:
+            tokens.append(op)
+    if not tokens:
+        raise Unsupported(text)
+    value, pos = _sum(tokens, 0)
+    if pos != len(tokens):
+        raise Unsupported(text)
+    return value
+
+
+def _sum(tokens, pos):
+    value, pos = _product(tokens, pos)
+    while pos < len(tokens) and tokens[pos] in ('+', '-'):
+        op = tokens[pos]
+        rhs, pos = _product(tokens, pos + 1)
+        value = value + rhs if op == '+' else value - rhs
+    return value, pos
+
+
+def _product(tokens, pos):
+    value, pos = _unary(tokens, pos)
+    while pos < len(tokens) and tokens[pos] in ('*', '/'):
+        op = tokens[pos]
+        rhs, pos = _unary(tokens, pos + 1)
+        if op == '*':
+            value = value * rhs
+        elif rhs == 0:
+            raise Unsupported("division by zero")
+        else:
+            value = value / rhs
+    return value, pos
+
+
+def _unary(tokens, pos):
+    if pos >= len(tokens):
+        raise Unsupported("truncated expression")
+    token = tokens[pos]
+    if token == '-':
+        value, pos = _unary(tokens, pos + 1)
+        return -value, pos
+    if token == '(':
+        value, pos = _sum(tokens, pos + 1)
+        if pos >= len(tokens) or tokens[pos] != ')':
+            raise Unsupported("unbalanced parenthesis")
+        return value, pos + 1
+    if isinstance(token, str):
+        raise Unsupported(token)
+    return token, pos + 1
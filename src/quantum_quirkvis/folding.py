@@ -0,0 +1,131 @@
+from openqasm3 import ast, dumps
+from openqasm3.visitor import QASMVisitor
+from pyqasm.entrypoint import loads
+
+FOLD_PREFIX = "__fold"
+
+# Statements needed to resolve register sizes without unrolling anything else
+DECLARATIONS = (ast.Include, ast.QubitDeclaration, ast.ClassicalDeclaration, ast.ConstantDeclaration)
+
+
+class _OperandCollector(QASMVisitor):
+    def __init__(self):
+        self.operands = []
+
+    def visit_QuantumGate(self, node, context=None):
+        self.operands.extend(node.qubits)
+
+    def visit_QuantumPhase(self, node, context=None):
+        self.operands.extend(node.qubits)
+
+    def visit_QuantumMeasurement(self, node, context=None):
+        self.operands.append(node.qubit)
+
+    def visit_QuantumBarrier(self, node, context=None):
+        self.operands.extend(node.qubits)
+
+    def visit_QuantumReset(self, node, context=None):
+        self.operands.append(node.qubits)
+
+
+def fold_module(module):
+    """Replace loops and user-defined gate calls with opaque marker gates.
+
+    Returns a fresh module to be unrolled with the marker names as external
+    gates, and a dict mapping each marker name to its (label, annotation).
+    Loop bodies are never expanded, so the cost follows the source size.
+    """
+    statements = list(module._statements)
+    version = module.original_program.version
+
+    declarations = loads(ast.Program(statements=[s for s in statements if isinstance(s, DECLARATIONS)], version=version))
+    declarations.unroll()
+    registers = dict(declarations._qubit_registers)
+
+    user_gates = {s.name.name for s in statements if isinstance(s, ast.QuantumGateDefinition)}
+    aliases = {s.target.name for s in statements if isinstance(s, ast.AliasStatement)}
+
+    blocks = {}
+    folded = []
+    for stmt in statements:
+        if isinstance(stmt, ast.ForInLoop):
+            block = ("for", _loop_annotation(stmt.set_declaration))
+        elif isinstance(stmt, ast.WhileLoop):
+            block = ("while", _source(stmt.while_condition))
+        elif isinstance(stmt, ast.QuantumGate) and stmt.name.name in user_gates:
+            block = (stmt.name.name, None)
+        else:
+            folded.append(stmt)
+            continue
+
+        qubits = _touched_qubits(stmt, registers, aliases)
+        if qubits is None:
+            # Operands on undeclared registers: unrolled, so pyqasm reports them as without folding
+            folded.append(stmt)
+            continue
+        if not qubits:
+            # Purely classical block, nothing to draw
+            continue
+
+        name = ast.Identifier(f"{FOLD_PREFIX}{len(blocks)}")
+        blocks[name.name] = block
+        folded.append(ast.QuantumGateDefinition(name, [], [ast.Identifier(f"a{i}") for i in range(len(qubits))], []))
+        folded.append(ast.QuantumGate([], name, [], [
+            ast.IndexedIdentifier(ast.Identifier(reg), [[ast.IntegerLiteral(idx)]]) for reg, idx in qubits
+        ]))
+
+    return loads(ast.Program(statements=folded, version=version)), blocks
+
+
+def _touched_qubits(stmt, registers, aliases=()):
+    # None when an operand is neither a declared register nor an alias
+    collector = _OperandCollector()
+    collector.visit(stmt)
+
+    touched = set()
+    for operand in collector.operands:
+        if isinstance(operand, ast.Identifier) and operand.name in registers:
+            touched.update((operand.name, i) for i in range(registers[operand.name]))
+        elif (isinstance(operand, ast.IndexedIdentifier) and operand.name.name in registers
+              and len(operand.indices) == 1 and isinstance(operand.indices[0], list)
+              and len(operand.indices[0]) == 1 and isinstance(operand.indices[0][0], ast.IntegerLiteral)):
+            touched.add((operand.name.name, operand.indices[0][0].value))
+        elif isinstance(operand, ast.IndexedIdentifier) and operand.name.name in registers:
+            # Index depends on the loop variable or a constant: take the whole register
+            name = operand.name.name
+            touched.update((name, i) for i in range(registers[name]))
+        elif _operand_name(operand) in aliases:
+            # Aliases can't be resolved without unrolling
+            return [(reg, i) for reg, size in registers.items() for i in range(size)]
+        else:
+            return None
+
+    order = {reg: n for n, reg in enumerate(registers)}
+    return sorted(touched, key=lambda q: (order[q[0]], q[1]))
+
+
+def _operand_name(operand):
+    if isinstance(operand, ast.IndexedIdentifier):
+        return operand.name.name
+    return getattr(operand, 'name', None)
+
+
+def _loop_annotation(set_declaration):
+    if isinstance(set_declaration, ast.RangeDefinition):
+        bounds = [set_declaration.start, set_declaration.end, set_declaration.step or ast.IntegerLiteral(1)]
+        if all(isinstance(b, ast.IntegerLiteral) for b in bounds):
+            start, end, step = (b.value for b in bounds)
+            # OpenQASM ranges are inclusive of the end value
+            return f"×{len(range(start, end + (1 if step > 0 else -1), step))}"
+        source = _source(set_declaration)
+        return f"[{source}]" if source else None
+    if isinstance(set_declaration, ast.DiscreteSet):
+        return f"×{len(set_declaration.values)}"
+    return _source(set_declaration)
+
+
+def _source(node):
+    try:
+        return dumps(node).strip().rstrip(';')
+    except Exception:
+        return None
@@ -0,0 +1,41 @@
+import math
+from functools import lru_cache
+from .lazy import LazyModule
+
+np = LazyModule('numpy')
+
+# Decimals of wave coordinates, a wave style can set its own "precision"
+DEFAULT_PRECISION = 2
+# Points per wavelength
+WAVE_RESOLUTION = 10
+
+
+def wave_path(x1, y1, x2, y2, amplitude, wavelength, precision=DEFAULT_PRECISION):
+    """SVG path data of a sine wave from (x1, y1) to (x2, y2).
+
+    Only the moveto depends on the position, the points follow as relative
+    linetos, so the rest of the path is computed once per distinct
+    (dx, dy, amplitude, wavelength, precision): wires, connections and
+    crosses of the same size share it.
+    """
+    return f"M{x1:.{precision}f} {y1:.{precision}f}" + _wave_steps(
+        x2 - x1, y2 - y1, amplitude, wavelength, precision)
+
+
+@lru_cache(maxsize=4096)
+def _wave_steps(dx, dy, amplitude, wavelength, precision):
+    dist = math.hypot(dx, dy)
+    n = int(dist / wavelength * WAVE_RESOLUTION)
+    if n == 0:
+        return f"l{dx:.{precision}f} {dy:.{precision}f}"
+    angle = math.atan2(dy, dx)
+    along = np.linspace(0.0, dist, n + 1)
+    offset = amplitude * np.sin(2 * math.pi / wavelength * along)
+    points = np.empty((n + 1, 2))
+    points[:, 0] = along * math.cos(angle) - offset * math.sin(angle)
+    points[:, 1] = along * math.sin(angle) + offset * math.cos(angle)
+
+    # Steps between the rounded points, so rounding errors don't add up
+    scale = 10 ** precision
+    steps = np.diff(np.rint(points * scale).astype(np.int64), axis=0) / scale
+    return "l" + " ".join(f"{v:.{precision}f}" for v in steps.ravel().tolist())
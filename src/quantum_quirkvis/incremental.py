@@ -0,0 +1,147 @@
+import io
+from .drawer import SVGDrawer
+from .flat import parse_flat_statements
+from .layout import Layout
+from .scheduler import DepthFrontier
+from .writer import StreamWriter
+from .lazy import LazyModule
+
+ast = LazyModule('openqasm3.ast')
+
+
+class Update:
+    """What append() changed in the document.
+
+    width is the canvas width afterwards. wires holds the redrawn wires when
+    the canvas grew (they span its whole width), None otherwise. lines and
+    shapes hold the markup of the new operations: lines goes after the
+    connection lines drawn so far, shapes at the end of the document.
+    full is set when the whole circuit had to be drawn again, call svg().
+    """
+
+    __slots__ = ('width', 'wires', 'lines', 'shapes', 'full')
+
+    def __init__(self, width, wires=None, lines="", shapes="", full=False):
+        self.width = width
+        self.wires = wires
+        self.lines = lines
+        self.shapes = shapes
+        self.full = full
+
+
+class IncrementalDrawer:
+    """A drawing kept up to date while statements are appended to a program.
+
+    The scheduler's depth frontier and the markup of every operation drawn
+    so far are kept, so append() only parses, schedules and draws the new
+    statements. That covers flat statements (see parse_flat_statements) on
+    the registers already declared; anything else, such as new registers or
+    loops, parses the whole program again. svg() matches draw(source).
+    """
+
+    def __init__(self, program, theme=None, fold=False):
+        self.drawer = SVGDrawer(theme, fold=fold)
+        self._rebuild([program])
+
+    @property
+    def source(self):
+        return "\n".join(self._sources)
+
+    def append(self, statements):
+        new = parse_flat_statements(statements, self._qubits, self._bits)
+        if new is None or (not self._can_measure and any(
+                isinstance(s, ast.QuantumMeasurementStatement) for s in new)):
+            # A first measurement without classical registers adds a line
+            self._rebuild(self._sources + [statements])
+            return Update(self._width, full=True)
+        self._sources.append(statements)
+
+        drawable = []
+        for stmt in new:
+            # Consecutive barriers are collapsed, as in SVGDrawer.layout()
+            barrier = isinstance(stmt, ast.QuantumBarrier)
+            if not (barrier and self._last_barrier):
+                drawable.append(stmt)
+            self._last_barrier = barrier
+
+        layout = self.layout
+        ops = self.drawer._resolve(drawable, layout.line_nums, layout.quantum_registers, layout.blocks)
+        n_moments = len(layout.moments)
+        depths = self.drawer._schedule(ops, self._frontier, layout.moments)
+        grew = len(layout.moments) > n_moments
+        if grew:
+            self._grow()
+
+        lines, shapes = [], []
+        for op, depth in zip(ops, depths):
+            self._draw(op, depth, lines, shapes)
+
+        wires = None
+        if grew:
+            self._width = self.drawer._canvas_size(layout.n_lines, layout.n_moments)[0]
+            wires = self._wires = self._markup(lambda svg: self.drawer._draw_wires(svg, layout.line_nums, self._width))
+        return Update(self._width, wires, "".join(lines), "".join(shapes))
+
+    def svg(self):
+        width, height = self.drawer._canvas_size(self.layout.n_lines, self.layout.n_moments)
+        head = self._markup(lambda svg: self.drawer._draw_canvas(svg, width, height))
+        # The start tag is left open by the writer until its first child
+        parts = [head, self._labels, self._wires]
+        parts.extend(s for moment in self._lines for s in moment)
+        parts.extend(s for moment in self._shapes for s in moment)
+        parts.append("</svg>")
+        return "".join(parts)
+
+    def _rebuild(self, sources):
+        drawer = self.drawer
+        module, blocks = drawer.parse("\n".join(sources))
+        # Registers as declared
+        qubits = dict(module._qubit_registers or {})
+        bits = dict(module._classical_registers or {})
+        line_nums, quantum_registers, classical_registers, ops = drawer._prepare(module, blocks)
+        statements = module._statements
+
+        drawer.theme = drawer.theme_manager.compiled
+        drawer.blocks = blocks
+        self._sources = sources
+        self._qubits = qubits
+        self._bits = bits
+        self._can_measure = bool(bits) or ('c', -1) in line_nums
+        self._last_barrier = bool(statements) and isinstance(statements[-1], ast.QuantumBarrier)
+        self.layout = Layout(line_nums, [], quantum_registers, classical_registers, blocks)
+        self._frontier = DepthFrontier(self.layout.n_lines)
+        self._xs, self._lines, self._shapes = [], [], []
+
+        depths = drawer._schedule(ops, self._frontier, self.layout.moments)
+        self._grow()
+        for op, depth in zip(ops, depths):
+            self._draw(op, depth, [], [])
+        self._width = drawer._canvas_size(self.layout.n_lines, self.layout.n_moments)[0]
+        self._labels = self._markup(lambda svg: drawer._draw_labels(svg, line_nums))
+        self._wires = self._markup(lambda svg: drawer._draw_wires(svg, line_nums, self._width))
+
+    def _grow(self):
+        # x positions are summed up the same way SVGDrawer._draw_moments() does
+        layout = self.layout
+        theme = self.drawer.theme
+        stride = theme.gate_width + theme.gate_spacing
+        x = self._xs[-1] + stride if self._xs else theme.padding + theme.label_offset + theme.gate_width / 2
+        while len(self._xs) < len(layout.moments):
+            self._xs.append(x)
+            self._lines.append([])
+            self._shapes.append([])
+            x += stride
+        layout.n_moments = layout.total_moments = len(layout.moments)
+
+    def _draw(self, op, depth, lines, shapes):
+        x = self._xs[depth]
+        for phase, store, new in (('lines', self._lines, lines), ('shapes', self._shapes, shapes)):
+            markup = self._markup(lambda svg: self.drawer._draw_statement(svg, op, x, phase))
+            if markup:
+                store[depth].append(markup)
+                new.append(markup)
+
+    def _markup(self, draw):
+        out = io.StringIO()
+        draw(StreamWriter(out))
+        return out.getvalue()
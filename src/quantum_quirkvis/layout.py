@@ -0,0 +1,228 @@
+import json
+import struct
+import sys
+import zlib
+from array import array
+
+FORMAT_VERSION = 1
+# Binary layouts: MAGIC, then a zlib stream of the JSON header and the columns
+MAGIC = b"QVLAYOUT"
+# Column arrays of a serialized layout, in file order, with their typecodes
+COLUMNS = (
+    ('moment_start', 'I'),
+    ('kind', 'B'),
+    ('name', 'I'),
+    ('line_start', 'I'),
+    ('lines', 'I'),
+    ('param_start', 'I'),
+    ('params', 'd'),
+    ('target', 'i'),
+)
+
+
+class Layout:
+    """Theme independent result of line assignment and scheduling.
+
+    Only the qubit/classical ordering flags of a theme change it, see
+    SVGDrawer.layout_key(), so one layout can be rendered in many themes.
+
+    moments holds Op records, the parsed program isn't referenced anymore,
+    so a layout can be saved (save(), to_dict(), to_bytes()), loaded later
+    and rendered by SVGDrawer.render() or any other backend.
+    """
+
+    def __init__(self, line_nums, moments, quantum_registers, classical_registers, blocks=None,
+                 first_moment=0, total_moments=None):
+        self.line_nums = line_nums
+        self.moments = moments
+        self.quantum_registers = quantum_registers
+        self.classical_registers = classical_registers
+        self.blocks = blocks or {}
+        self.n_lines = max(line_nums.values()) + 1 if line_nums else 0
+        self.n_moments = len(moments)
+        # Position of these moments in the whole circuit, see page()
+        self.first_moment = first_moment
+        self.total_moments = len(moments) if total_moments is None else total_moments
+
+    @property
+    def continued(self):
+        # (continues from an earlier page, continues on a later one)
+        return self.first_moment > 0, self.first_moment + self.n_moments < self.total_moments
+
+    def page(self, start, stop):
+        """The moments start:stop as a layout of their own, rendered with
+        the same lines and continuation markers at the cut edges."""
+        return Layout(self.line_nums, self.moments[start:stop], self.quantum_registers,
+                      self.classical_registers, self.blocks,
+                      first_moment=self.first_moment + start, total_moments=self.total_moments)
+
+    def copy(self):
+        """A copy sharing nothing mutable with this layout, Op records included."""
+        moments = [[Op(op.kind, op.name, op.lines[:], op.params[:], op.target) for op in moment]
+                   for moment in self.moments]
+        return Layout(dict(self.line_nums), moments, list(self.quantum_registers),
+                      list(self.classical_registers), dict(self.blocks),
+                      first_moment=self.first_moment, total_moments=self.total_moments)
+
+    def pages(self, moments_per_page):
+        return [self.page(start, start + moments_per_page)
+                for start in range(0, max(self.n_moments, 1), moments_per_page)]
+
+    def boxes(self):
+        """(moment, top line, bottom line, op) for every op, in grid units.
+
+        The span includes the classical line a measurement writes to; ops
+        spanning more than one line are the ones drawn with a connection.
+        A backend maps moment and line to its own coordinates.
+        """
+        for m, moment in enumerate(self.moments):
+            for op in moment:
+                lines = op.lines if op.target is None else op.lines + (op.target,)
+                if lines:
+                    yield m, min(lines), max(lines), op
+
+    def to_dict(self):
+        """The layout as plain JSON types, see from_dict().
+
+        Ops are stored column-wise, moment after moment: moment_start holds
+        the index of the first op of each moment, kind and name index KINDS
+        and names, and the lines and params of op i are
+        lines[line_start[i]:line_start[i + 1]] (and the same for params).
+        target is -1 for measurements without a drawn target.
+        """
+        header, columns = self._columns()
+        header.update((name, column.tolist()) for name, column in columns.items())
+        return header
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls._from_columns(data, {name: array(code, data[name]) for name, code in COLUMNS})
+
+    def to_bytes(self):
+        """Compact binary form: the to_dict() header plus packed columns."""
+        header, columns = self._columns()
+        header['byteorder'] = sys.byteorder
+        encoded = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        body = [struct.pack('<I', len(encoded)), encoded]
+        for name, code in COLUMNS:
+            body.append(struct.pack('<I', len(columns[name])))
+            body.append(columns[name].tobytes())
+        return MAGIC + zlib.compress(b"".join(body))
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data.startswith(MAGIC):
+            raise ValueError("Not a quantum_quirkvis layout")
+        body = memoryview(zlib.decompress(data[len(MAGIC):]))
+        size, = struct.unpack_from('<I', body)
+        header = json.loads(bytes(body[4:4 + size]).decode('utf-8'))
+        pos = 4 + size
+        columns = {}
+        for name, code in COLUMNS:
+            count, = struct.unpack_from('<I', body, pos)
+            column = array(code)
+            column.frombytes(body[pos + 4:pos + 4 + count * column.itemsize])
+            if header['byteorder'] != sys.byteorder:
+                column.byteswap()
+            columns[name] = column
+            pos += 4 + count * column.itemsize
+        return cls._from_columns(header, columns)
+
+    def save(self, path):
+        """Write the layout to path, as JSON for .json files and binary otherwise."""
+        if path.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, separators=(',', ':'))
+        else:
+            with open(path, 'wb') as f:
+                f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith('.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls.from_dict(json.load(f))
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def _columns(self):
+        names = {}
+        columns = {name: array(code) for name, code in COLUMNS}
+        moment_start, kind, name, line_start, lines, param_start, params, target = (
+            columns[name] for name, _ in COLUMNS)
+        kinds = {k: i for i, k in enumerate(KINDS)}
+        line_start.append(0)
+        param_start.append(0)
+        for moment in self.moments:
+            moment_start.append(len(kind))
+            for op in moment:
+                kind.append(kinds[op.kind])
+                name.append(names.setdefault(op.name, len(names)))
+                lines.extend(op.lines)
+                line_start.append(len(lines))
+                params.extend(op.params)
+                param_start.append(len(params))
+                target.append(-1 if op.target is None else op.target)
+        moment_start.append(len(kind))
+
+        header = {
+            'version': FORMAT_VERSION,
+            'line_nums': [[reg, idx, line] for (reg, idx), line in self.line_nums.items()],
+            'quantum_registers': list(self.quantum_registers),
+            'classical_registers': list(self.classical_registers),
+            'blocks': [[name, label, annotation] for name, (label, annotation) in self.blocks.items()],
+            'first_moment': self.first_moment,
+            'total_moments': self.total_moments,
+            'names': list(names),
+        }
+        return header, columns
+
+    @classmethod
+    def _from_columns(cls, header, columns):
+        if header.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported layout version {header.get('version')!r}")
+        moment_start, kind, name, line_start, lines, param_start, params, target = (
+            columns[name] for name, _ in COLUMNS)
+        names = header['names']
+        moments = []
+        for m in range(len(moment_start) - 1):
+            moment = []
+            for i in range(moment_start[m], moment_start[m + 1]):
+                moment.append(Op(KINDS[kind[i]], names[name[i]],
+                                 tuple(lines[line_start[i]:line_start[i + 1]]),
+                                 params[param_start[i]:param_start[i + 1]].tolist(),
+                                 None if target[i] < 0 else target[i]))
+            moments.append(moment)
+        return cls({(reg, idx): line for reg, idx, line in header['line_nums']}, moments,
+                   header['quantum_registers'], header['classical_registers'],
+                   {name: (label, annotation) for name, label, annotation in header['blocks']},
+                   first_moment=header['first_moment'], total_moments=header['total_moments'])
+
+
+class Op:
+    """A drawable statement with its operands resolved to line numbers.
+
+    kind is one of GATE, BLOCK, MEASURE or BARRIER. params holds the
+    evaluated gate arguments and target the classical line a measurement
+    writes to (None when it isn't drawn).
+    """
+
+    __slots__ = ('kind', 'name', 'lines', 'params', 'target')
+
+    GATE = 'gate'
+    BLOCK = 'block'
+    MEASURE = 'measure'
+    BARRIER = 'barrier'
+
+    def __init__(self, kind, name, lines, params=(), target=None):
+        self.kind = kind
+        self.name = name
+        self.lines = lines
+        self.params = params
+        self.target = target
+
+    def __repr__(self):
+        return f"Op({self.kind!r}, {self.name!r}, {self.lines!r}, {self.params!r}, {self.target!r})"
+
+
+KINDS = (Op.GATE, Op.BLOCK, Op.MEASURE, Op.BARRIER)
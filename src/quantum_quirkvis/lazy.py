@@ -0,0 +1,22 @@
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module, imported on first attribute access.
+
+    pyqasm, openqasm3 and numpy take most of the import time of the package,
+    and runs that never parse (--help, cache hits, saved layouts) don't need
+    them. Once imported, the module's names are copied in, so later lookups
+    don't go through __getattr__.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._lazy_name)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._lazy_name!r}>"
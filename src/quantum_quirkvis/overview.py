@@ -0,0 +1,139 @@
+from .layout import Op
+from .writer import StreamWriter, TreeWriter
+
+METRICS = ('gates', 'two_qubit', 'measurements', 'mix')
+# Categories of the 'mix' metric, the most frequent one colors the cell
+CATEGORIES = ('single', 'multi', 'measure', 'block')
+DEFAULT_COLUMNS = 512
+DEFAULT_ROWS = 256
+# Opacity steps, cells on the same step share one <path>
+LEVELS = 8
+
+
+def density_grid(layout, columns, rows, metric='gates'):
+    """Count operations per cell of a rows x columns grid over moments x lines.
+
+    Every line an operation touches is counted. Returns one grid (list of
+    rows) per category for 'mix', a single grid in a 1-tuple otherwise.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {', '.join(METRICS)}")
+    n_moments = max(layout.n_moments, 1)
+    n_lines = max(layout.n_lines, 1)
+    grids = tuple([[0] * columns for _ in range(rows)] for _ in (CATEGORIES if metric == 'mix' else (metric,)))
+
+    row_of = [line * rows // n_lines for line in range(n_lines)]
+    for m, moment in enumerate(layout.moments):
+        col = m * columns // n_moments
+        for op in moment:
+            if op.kind == Op.BARRIER:
+                continue
+            if op.kind == Op.MEASURE:
+                category = 2
+            elif op.kind == Op.BLOCK:
+                category = 3
+            else:
+                category = 1 if len(op.lines) > 1 else 0
+            if metric == 'mix':
+                grid = grids[category]
+            elif (metric == 'two_qubit' and category != 1) or (metric == 'measurements' and category != 2):
+                continue
+            else:
+                grid = grids[0]
+            for line in op.lines:
+                grid[row_of[line]][col] += 1
+    return grids
+
+
+def render_overview(layout, theme=None, metric='gates', columns=None, rows=None, cell=3, out=None):
+    """Render a density map of a scheduled layout.
+
+    Output size and time depend on the grid, not on the number of gates.
+    Colors come from the theme: gate fill, connection line, measurement
+    and block fills, over the theme background.
+    """
+    from .drawer import SVGDrawer
+    drawer = theme if isinstance(theme, SVGDrawer) else SVGDrawer(theme)
+    compiled = drawer.theme_manager.compiled
+    columns = max(1, min(columns or DEFAULT_COLUMNS, layout.n_moments))
+    rows = max(1, min(rows or DEFAULT_ROWS, layout.n_lines))
+    grids = density_grid(layout, columns, rows, metric)
+
+    # Emoji and image shapes have no fill, fall back to the theme text color
+    def fill(config):
+        color = config.svg['fill'] if config is not None else 'none'
+        return compiled.text if color == 'none' else color
+    colors = {
+        'single': fill(compiled.gate('h')),
+        'multi': compiled.connection_line.svg['stroke'],
+        'measure': fill(compiled.gate('measurement')),
+        'block': fill(compiled.shapes.get('block')),
+    }
+    if metric == 'mix':
+        names = CATEGORIES
+    else:
+        names = ({'gates': 'single', 'two_qubit': 'multi', 'measurements': 'measure'}[metric],)
+
+    # Cell totals set the opacity, the dominant category the color
+    peak = max((sum(g[r][c] for g in grids) for r in range(rows) for c in range(columns)), default=0) or 1
+    paths = {}
+    for r in range(rows):
+        # Runs of equal cells in a row become one rectangle
+        run_start, run_style = 0, None
+        for c in range(columns + 1):
+            style = None
+            if c < columns:
+                counts = [g[r][c] for g in grids]
+                total = sum(counts)
+                if total:
+                    style = (colors[names[counts.index(max(counts))]], -(-total * LEVELS // peak))
+            if style != run_style:
+                if run_style is not None:
+                    w = (c - run_start) * cell
+                    paths.setdefault(run_style, []).append(f"M{run_start * cell} {r * cell}h{w}v{cell}h-{w}z")
+                run_start, run_style = c, style
+
+    padding = compiled.padding
+    label_font = compiled.label_font
+    font_size = label_font['size']
+    width = columns * cell + 2 * padding
+    height = rows * cell + 2 * padding + font_size
+
+    svg = StreamWriter(out) if out is not None else TreeWriter()
+    svg.start('svg', {
+        'xmlns': 'http://www.w3.org/2000/svg',
+        'width': str(width),
+        'height': str(height),
+        'viewBox': f'0 0 {width} {height}'
+    })
+    svg.element('rect', {'width': '100%', 'height': '100%', 'fill': compiled.background})
+    svg.start('g', {'transform': f'translate({padding},{padding})'})
+    for (color, level), cells in sorted(paths.items(), key=lambda item: item[0][1]):
+        svg.element('path', {'d': "".join(cells), 'fill': color, 'fill-opacity': f"{level / LEVELS:g}"})
+    svg.element('rect', {
+        'width': str(columns * cell), 'height': str(rows * cell),
+        'fill': 'none', 'stroke': compiled.qubit_wire.svg['stroke'], 'stroke-width': '1'
+    })
+    svg.end()
+
+    per_cell = f"{-(-layout.n_moments // columns)}×{-(-layout.n_lines // rows)}"
+    svg.element('text', {
+        'x': str(padding), 'y': str(height - padding / 2),
+        'fill': compiled.text,
+        'font-family': label_font['family'],
+        'font-size': str(font_size),
+        'dominant-baseline': 'middle'
+    }, f"{layout.n_moments} moments × {layout.n_lines} lines, {metric} per {per_cell} cell, max {peak}")
+    svg.end()
+    return svg.getvalue()
+
+
+def draw_overview(program, theme=None, filename=None, metric='gates', columns=None, rows=None, cell=3, fold=False):
+    """Parse and schedule a program and render its density map, see render_overview()."""
+    from .drawer import SVGDrawer, _render_to_file
+    drawer = SVGDrawer(theme, fold=fold)
+    layout = drawer._shared_layout(program)
+    if filename:
+        _render_to_file(filename, lambda f: render_overview(layout, drawer, metric, columns, rows, cell, out=f))
+        return None
+    return render_overview(layout, drawer, metric, columns, rows, cell)
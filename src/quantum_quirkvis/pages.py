@@ -0,0 +1,73 @@
+import html
+import os
+from .drawer import SVGDrawer, _render_to_file
+
+DEFAULT_PAGE_MOMENTS = 100
+
+
+def page_template(filename):
+    # Numbered files need a {page} placeholder
+    if "{page}" not in filename:
+        root, ext = os.path.splitext(filename)
+        filename = root + "_{page}" + (ext or ".svg")
+    return filename
+
+
+def render_page(job):
+    theme, symbols, compact, layout, path = job
+    drawer = SVGDrawer(theme, symbols=symbols, compact=compact)
+    _render_to_file(path, lambda f: drawer.render(layout, out=f))
+    return path
+
+
+def draw_pages(program, theme=None, filename="circuit_{page}.svg", moments_per_page=DEFAULT_PAGE_MOMENTS,
+               jobs=None, fold=False, symbols=False, index=None, compact=None):
+    """Render a wide circuit as numbered pages of moments_per_page moments.
+
+    The program is parsed and scheduled once, then every page is rendered
+    on its own in a process pool, with the wire labels repeated and the cut
+    edges marked. `index` optionally names an HTML file showing the pages
+    in order. Returns the page paths.
+    """
+    if moments_per_page < 1:
+        raise ValueError("moments_per_page must be at least 1")
+    drawer = SVGDrawer(theme, fold=fold, symbols=symbols)
+    layout = drawer._shared_layout(program)
+    pages = layout.pages(moments_per_page)
+
+    template = page_template(filename)
+    digits = len(str(len(pages)))
+    paths = [template.format(page=f"{i:0{digits}d}") for i in range(1, len(pages) + 1)]
+    for directory in {os.path.dirname(path) for path in paths}:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # Each worker only receives the moments of its own page
+    work = [(theme, symbols, compact, page, path) for page, path in zip(pages, paths)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(work) <= 1:
+        list(map(render_page, work))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(jobs, len(work))) as executor:
+            list(executor.map(render_page, work))
+
+    if index:
+        write_index(index, paths)
+    return paths
+
+
+def write_index(index, paths):
+    base = os.path.dirname(os.path.abspath(index))
+    images = "\n".join(
+        f'<img src="{html.escape(os.path.relpath(os.path.abspath(path), base).replace(os.sep, "/"))}" '
+        f'alt="page {i}" loading="lazy">'
+        for i, path in enumerate(paths, 1)
+    )
+    with open(index, "w", encoding="utf-8") as f:
+        f.write(
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+            f"<title>{html.escape(os.path.basename(index))}</title>\n"
+            "<style>body{margin:0}img{display:block;max-width:none}</style>\n"
+            f"</head>\n<body>\n{images}\n</body>\n</html>\n"
+        )
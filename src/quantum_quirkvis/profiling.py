@@ -0,0 +1,132 @@
+import io
+import time
+from contextlib import contextmanager, nullcontext
+
+# Phases of a draw, in pipeline order
+PHASES = (
+    'parse', 'unroll', 'line_assignment', 'resolve', 'scheduling',
+    'canvas', 'lines_pass', 'shapes_pass', 'serialization',
+)
+
+
+class Profile:
+    """Phase timings and counters of the draws it is passed to.
+
+    timings holds the seconds spent in each of PHASES and counters the
+    statements, ops, lines, moments, elements and bytes drawn, both summed
+    over draws. callback(profile) is called after every draw. With
+    cprofile=True the draws also run under cProfile, see stats().
+    """
+
+    def __init__(self, callback=None, cprofile=False):
+        self.timings = {}
+        self.counters = {}
+        self.callback = callback
+        self.profiler = None
+        if cprofile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        self._depth = 0
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def start(self):
+        # Draws can nest (draw_many), only the outermost one is reported
+        self._depth += 1
+        if self._depth == 1 and self.profiler:
+            self.profiler.enable()
+
+    def finish(self):
+        self._depth -= 1
+        if self._depth:
+            return
+        if self.profiler:
+            self.profiler.disable()
+        self.count('draws')
+        if self.callback:
+            self.callback(self)
+
+    def to_dict(self):
+        timings = {name: self.timings[name] for name in PHASES if name in self.timings}
+        return {
+            'timings': timings,
+            'total': sum(timings.values()),
+            'counters': dict(self.counters),
+        }
+
+    def stats(self, sort='cumulative', limit=30):
+        """The cProfile report as text."""
+        if not self.profiler:
+            return ""
+        import pstats
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump_stats(self, path):
+        # For pstats, snakeviz and friends
+        self.profiler.dump_stats(path)
+
+
+class _NoProfile:
+    """Stands in for a Profile when nothing is measured."""
+
+    _context = nullcontext()
+
+    def phase(self, name):
+        return self._context
+
+    def count(self, name, n=1):
+        pass
+
+    def start(self):
+        pass
+
+    def finish(self):
+        pass
+
+
+NO_PROFILE = _NoProfile()
+
+
+class CountingWriter:
+    """Wraps a writer to count the elements drawn into profile."""
+
+    def __init__(self, writer, profile):
+        self.writer = writer
+        self.profile = profile
+
+    def start(self, tag, attrs):
+        self.profile.count('elements')
+        self.writer.start(tag, attrs)
+
+    def element(self, tag, attrs, text=None):
+        self.profile.count('elements')
+        self.writer.element(tag, attrs, text)
+
+    def end(self):
+        self.writer.end()
+
+    def getvalue(self):
+        return self.writer.getvalue()
+
+
+class CountingOut:
+    """Wraps a file-like object to count the bytes written into profile."""
+
+    def __init__(self, out, profile):
+        self.out = out
+        self.profile = profile
+
+    def write(self, text):
+        self.profile.count('bytes', len(text.encode('utf-8')))
+        return self.out.write(text)
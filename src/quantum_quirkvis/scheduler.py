@@ -0,0 +1,73 @@
+class DepthFrontier:
+    """Per-line depth array backed by a max segment tree.
+
+    Scheduling a gate occupies every line in its vertical span, so each update
+    is "raise lines lo..hi to one past their current maximum". Both the range
+    query and the range update touch O(log L) nodes.
+    """
+
+    def __init__(self, n_lines):
+        self.n_lines = n_lines
+        size = 1
+        while size < n_lines:
+            size *= 2
+        self._size = size
+        # _max[node]: deepest line in the subtree (tags included)
+        # _tag[node]: depth applied to the whole subtree, never pushed down
+        self._max = [-1] * (2 * size)
+        self._tag = [-1] * (2 * size)
+
+    def top(self):
+        return self._max[1]
+
+    def query(self, lo, hi):
+        return self._query(1, 0, self._size - 1, lo, hi)
+
+    def raise_to(self, lo, hi, depth):
+        self._raise(1, 0, self._size - 1, lo, hi, depth)
+
+    def occupy(self, lo, hi):
+        if lo == 0 and hi >= self.n_lines - 1:
+            # Full-width statements (measurements, barriers) only need the root
+            depth = self._max[1] + 1
+            self._max[1] = depth
+            self._tag[1] = depth
+            return depth
+        depth = self.query(lo, hi) + 1
+        self.raise_to(lo, hi, depth)
+        return depth
+
+    def depth(self, line):
+        node = line + self._size
+        depth = self._max[node]
+        node >>= 1
+        while node:
+            if self._tag[node] > depth:
+                depth = self._tag[node]
+            node >>= 1
+        return depth
+
+    def _query(self, node, node_lo, node_hi, lo, hi):
+        if hi < node_lo or node_hi < lo:
+            return -1
+        if lo <= node_lo and node_hi <= hi:
+            return self._max[node]
+        mid = (node_lo + node_hi) // 2
+        return max(
+            self._tag[node],
+            self._query(2 * node, node_lo, mid, lo, hi),
+            self._query(2 * node + 1, mid + 1, node_hi, lo, hi),
+        )
+
+    def _raise(self, node, node_lo, node_hi, lo, hi, depth):
+        if hi < node_lo or node_hi < lo:
+            return
+        if depth > self._max[node]:
+            self._max[node] = depth
+        if lo <= node_lo and node_hi <= hi:
+            if depth > self._tag[node]:
+                self._tag[node] = depth
+            return
+        mid = (node_lo + node_hi) // 2
+        self._raise(2 * node, node_lo, mid, lo, hi, depth)
+        self._raise(2 * node + 1, mid + 1, node_hi, lo, hi, depth)
@@ -0,0 +1,254 @@
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from .aio import render_job
+from .cache import DEFAULT_MEMORY_BYTES, MemoryCache, render_key
+from . import __version__
+from .client import CONNECT_TIMEOUT, VERSION_HEADER, check_socket, default_address, is_loopback, parse_address, request
+from .theme import compile_theme
+
+DEFAULT_MAX_QUEUE = 64
+# Options of a /render request and their defaults, as in draw()
+OPTIONS = {"theme": None, "fold": False, "symbols": False, "compact": None}
+
+WARM_UP_PROGRAM = """OPENQASM 3.0;
+include "stdgates.inc";
+qubit[2] q;
+bit[2] c;
+h q[0];
+cx q[0], q[1];
+c = measure q;
+"""
+
+
+class Busy(Exception):
+    pass
+
+
+def warm_up():
+    # Run once in each worker: the imports, built-in themes and first draw a cold CLI pays for
+    from pyqasm.entrypoint import loads
+    from .builtin_themes import THEMES
+    from .drawer import draw
+    for name in THEMES:
+        compile_theme(name)
+    loads(WARM_UP_PROGRAM).unroll()
+    draw(WARM_UP_PROGRAM)
+
+
+def render_svg(job):
+    return render_job(job).encode("utf-8")
+
+
+class RenderServer:
+    """Long-running renderer on a Unix socket or a localhost HTTP port.
+
+    Renders run on worker processes started and warmed up once, so a
+    request doesn't pay for the imports and theme loading of a fresh CLI.
+    Recent SVGs are kept in an in-memory LRU of max_bytes, identical
+    requests in flight share one render, and at most max_queue requests
+    wait for a busy worker, later ones are turned away (503).
+
+    POST /render takes a JSON object with the QASM source as "program" and
+    the draw() options theme, fold, symbols and compact, and answers with
+    the SVG, or 400 and the error. GET /stats answers with stats() as JSON.
+    Every answer names the package version in an X-Quirkvis-Version header.
+
+    A Unix socket is only usable by the user running the server. Themes are
+    read from the paths clients send, so a TCP address has to be a loopback
+    one unless allow_remote is set.
+    """
+
+    def __init__(self, address=None, workers=None, max_bytes=DEFAULT_MEMORY_BYTES, max_queue=DEFAULT_MAX_QUEUE,
+                 allow_remote=False):
+        self.address = parse_address(address or default_address())
+        if not isinstance(self.address, str) and not allow_remote and not is_loopback(self.address[0]):
+            raise ValueError(f"{self.address[0]} is not a loopback address, remote clients would reach the server")
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.cache = MemoryCache(max_bytes)
+        self.pool = None
+        self.httpd = None
+        self.started = time.time()
+        self.requests = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.errors = 0
+        self.render_time = 0.0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the workers and bind the address, serve_forever() then answers requests."""
+        from concurrent.futures import ProcessPoolExecutor
+        self.pool = ProcessPoolExecutor(self.workers, initializer=warm_up)
+        # Submitted together, so every worker is started (and warmed up) now rather than on a first request
+        for future in [self.pool.submit(time.sleep, 0.01) for _ in range(self.workers)]:
+            future.result()
+        if isinstance(self.address, str):
+            self._remove_stale_socket()
+            # Only the owner may connect
+            umask = os.umask(0o177)
+            try:
+                self.httpd = _UnixServer(self.address, _Handler)
+            finally:
+                os.umask(umask)
+        else:
+            self.httpd = _TCPServer(self.address, _Handler)
+        self.httpd.renderer = self
+        return self
+
+    def serve_forever(self):
+        if self.httpd is None:
+            self.start()
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self):
+        # From another thread, serve_forever() returns
+        self.httpd.shutdown()
+
+    def close(self):
+        if self.httpd is not None:
+            self.httpd.server_close()
+            self.httpd = None
+            if isinstance(self.address, str):
+                try:
+                    os.remove(self.address)
+                except FileNotFoundError:
+                    pass
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def render(self, request):
+        """SVG (UTF-8) for the options of a /render request."""
+        with self._lock:
+            self.requests += 1
+        program = request.get("program")
+        if not isinstance(program, str):
+            raise ValueError('"program" must be QASM source')
+        theme, fold, symbols, compact = (request.get(name, default) for name, default in OPTIONS.items())
+        key = render_key(program, compile_theme(theme).digest, fold=fold, symbols=symbols, compact=compact)
+        svg = self.cache.get(key)
+        if svg is not None:
+            return svg
+        start = None
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            elif len(self._inflight) >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise Busy()
+            else:
+                start = time.perf_counter()
+                future = self._inflight[key] = self.pool.submit(render_svg, (program, theme, fold, symbols, compact, None))
+        if start is not None:
+            # Outside the lock, a render already done runs the callback right here
+            future.add_done_callback(lambda f: self._finished(key, f, start))
+        return future.result()
+
+    def _finished(self, key, future, start):
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+        with self._lock:
+            del self._inflight[key]
+            self.renders += 1
+            self.render_time += time.perf_counter() - start
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.address):
+            return
+        try:
+            check_socket(self.address)
+        except PermissionError as e:
+            raise RuntimeError(f"Not replacing {self.address}: {e}") from None
+        try:
+            request("GET", "/stats", address=self.address, timeout=CONNECT_TIMEOUT)
+        except OSError:
+            # Left behind by a server that didn't shut down
+            os.remove(self.address)
+        else:
+            raise RuntimeError(f"A render server is already listening on {self.address}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "address": self.address if isinstance(self.address, str) else "%s:%d" % self.address,
+                "version": __version__,
+                "workers": self.workers,
+                "uptime": time.time() - self.started,
+                "requests": self.requests,
+                "renders": self.renders,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "pending": len(self._inflight),
+                "max_queue": self.max_queue,
+                "mean_render_ms": 1000 * self.render_time / self.renders if self.renders else 0.0,
+                "cache": self.cache.stats(),
+            }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "quirkvis"
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send(200, json.dumps(self.server.renderer.stats()).encode("utf-8"), "application/json")
+        else:
+            self._send(404, b"Not found\n", "text/plain")
+
+    def do_POST(self):
+        if self.path != "/render":
+            self._send(404, b"Not found\n", "text/plain")
+            return
+        renderer = self.server.renderer
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            svg = renderer.render(json.loads(self.rfile.read(length)))
+        except Busy:
+            self._send(503, b"Too many requests waiting\n", "text/plain")
+        except Exception as e:
+            with renderer._lock:
+                renderer.errors += 1
+            self._send(400, f"{type(e).__name__}: {e}\n".encode("utf-8"), "text/plain")
+        else:
+            self._send(200, svg, "image/svg+xml")
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header(VERSION_HEADER, __version__)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix sockets have no client address
+        return "local"
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
@@ -1,5 +1,20 @@
+import copy
+import hashlib
 import json
 import os
+from collections.abc import Mapping
+from types import MappingProxyType
+from .builtin_themes import THEMES as BUILTIN_THEMES
+from .cache import MemoryCache
+
+THEMES_DIR = os.path.join(os.path.dirname(__file__), "themes")
+DEFAULT_THEME_PATH = os.path.join(THEMES_DIR, "default.json")
+# themes/*.json as Python literals, written by bundle_themes()
+BUNDLE_PATH = os.path.join(os.path.dirname(__file__), "builtin_themes.py")
+
+# Compiled themes kept for the whole process, see compile_theme()
+MAX_COMPILED_THEMES = 32
+_compiled_themes = MemoryCache(MAX_COMPILED_THEMES, sizeof=lambda entry: 1)
 
 def deep_merge(base, update):
     for key, value in update.items():
@@ -9,42 +24,247 @@ def deep_merge(base, update):
             base[key] = value
     return base
 
+def resolve_theme_path(filepath):
+    if not os.path.exists(filepath):
+        # Try loading from built-in themes directory
+        builtin_path = os.path.join(THEMES_DIR, f"{filepath}.json")
+        if os.path.exists(builtin_path):
+            return builtin_path
+        raise FileNotFoundError(f"Theme file {filepath} not found.")
+    return filepath
+
+def is_builtin_theme(name):
+    """Whether a theme name is taken from the bundled module.
+
+    A file of that name wins, as before the themes were bundled.
+    """
+    return isinstance(name, str) and name in BUILTIN_THEMES and not os.path.isfile(name)
+
+def load_theme(name_or_path):
+    """Theme dict of a built-in theme name or a JSON file.
+
+    Built-in themes come from the bundled module, without reading their
+    JSON file, unless a file of the same name exists.
+    """
+    if is_builtin_theme(name_or_path):
+        return copy.deepcopy(BUILTIN_THEMES[name_or_path])
+    return _read_json(resolve_theme_path(name_or_path))
+
+def compile_theme(theme_data=None):
+    """Return the CompiledTheme for a theme name, JSON path, dict or None.
+
+    The MAX_COMPILED_THEMES themes used last are cached for the whole
+    process, keyed by the theme source. A theme file is compiled again when
+    its modification time changed, replacing the old entry, so repeated
+    calls cost a lookup and an os.stat() for built-in themes and files alike.
+    """
+    version = None
+    if not theme_data:
+        key = ("default",)
+    elif is_builtin_theme(theme_data):
+        key = ("builtin", theme_data)
+    elif isinstance(theme_data, str):
+        path = os.path.abspath(resolve_theme_path(theme_data))
+        key = ("file", path)
+        version = os.stat(path).st_mtime_ns
+    elif isinstance(theme_data, dict):
+        key = ("dict", json.dumps(theme_data, sort_keys=True))
+    else:
+        raise TypeError(f"Unsupported theme: {theme_data!r}")
+
+    entry = _compiled_themes.get(key)
+    if entry is None or entry[0] != version:
+        theme = copy.deepcopy(BUILTIN_THEMES["default"])
+        if key[0] == "builtin":
+            deep_merge(theme, load_theme(key[1]))
+        elif key[0] == "file":
+            deep_merge(theme, _read_json(key[1]))
+        elif key[0] == "dict":
+            deep_merge(theme, copy.deepcopy(theme_data))
+        entry = (version, CompiledTheme(theme))
+        _compiled_themes.put(key, entry)
+    return entry[1]
+
+def _read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class Config(Mapping):
+    """Read-only theme entry with its SVG attribute strings resolved up front."""
+
+    __slots__ = ('_data', 'key', 'svg', 'line')
+
+    def __init__(self, data):
+        self._data = {k: Config(v) if isinstance(v, dict) else v for k, v in data.items()}
+        # Hashable identity, used to share drawn symbols between equal configs
+        self.key = repr(sorted(data.items()))
+        self.svg = {
+            'fill': data.get('fill', 'none'),
+            'stroke': data.get('stroke', 'none'),
+            'stroke-width': str(data.get('stroke_width', 1)),
+            'stroke-dasharray': data.get('dasharray', ''),
+        }
+        # Line style used by the strokes of 'cross' shapes
+        self.line = None
+        if data.get('type') == 'cross':
+            self.line = Config({
+                'style': data.get('style', 'straight'),
+                'stroke': data['stroke'],
+                'stroke_width': data['stroke_width'],
+                'dasharray': data.get('dasharray', ''),
+                'amplitude': data.get('amplitude', 2),
+                'wavelength': data.get('wavelength', 4)
+            })
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"Config({self._data!r})"
+
+
+class CompiledTheme:
+    """Flat, immutable view of a fully merged theme.
+
+    Gate configs are merged with the base 'gate' shape once, and the values
+    the drawer needs for every statement are plain attributes.
+    """
+
+    __slots__ = (
+        'raw', 'name', 'digest', 'dimensions', 'styles', 'shapes', 'gates', 'gate_overrides',
+        'base_gate', 'substitutions',
+        'gate_width', 'gate_height', 'gate_spacing', 'line_spacing', 'padding',
+        'label_offset', 'barrier_padding',
+        'background', 'text', 'label_font', 'qubit_wire', 'connection_line',
+        'measurement_line', 'barrier',
+    )
+
+    def __init__(self, theme):
+        self.raw = theme
+        self.name = theme.get("name")
+        # Content hash of the merged theme, identifies renders in caches
+        self.digest = hashlib.sha256(json.dumps(theme, sort_keys=True, default=str).encode()).hexdigest()
+        self.dimensions = MappingProxyType(dict(theme.get("dimensions", {})))
+        self.styles = Config(theme.get("styles", {}))
+        self.shapes = Config(theme.get("shapes", {}))
+        self.gate_overrides = Config(theme.get("gates", {}))
+        self.substitutions = Config(theme.get("substitutions", {}))
+
+        # Gates use the base 'gate' shape config as their foundation
+        base = theme.get("shapes", {}).get("gate", {})
+        self.base_gate = self.shapes.get("gate")
+        self.gates = MappingProxyType({
+            name: Config({**base, **specific}) for name, specific in theme.get("gates", {}).items()
+        })
+
+        # Missing entries stay None, ThemeManager getters still raise for them
+        for key in ('gate_width', 'gate_height', 'gate_spacing', 'line_spacing', 'padding',
+                    'label_offset', 'barrier_padding'):
+            setattr(self, key, self.dimensions.get(key))
+        for key in ('background', 'text', 'label_font', 'qubit_wire', 'connection_line',
+                    'measurement_line', 'barrier'):
+            setattr(self, key, self.styles.get(key))
+
+    def gate(self, gate_name):
+        config = self.gates.get(gate_name, self.base_gate)
+        if config is None:
+            raise KeyError("Shape 'gate' not found in theme.")
+        return config
+
+
+class _ThemeDict(dict):
+    """Merged theme dict that tells its ThemeManager when it is changed."""
+
+    def __init__(self, data, changed):
+        self._changed = changed
+        super().__init__((key, self._wrap(value)) for key, value in data.items())
+
+    def _wrap(self, value):
+        return _ThemeDict(value, self._changed) if isinstance(value, dict) else value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, self._wrap(value))
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        self._changed()
+        return super().pop(key, *default)
+
+    def popitem(self):
+        self._changed()
+        return super().popitem()
+
+    def clear(self):
+        self._changed()
+        super().clear()
+
+
 class ThemeManager:
     def __init__(self, theme_data=None):
-        self.theme = self._get_default_theme()
-        if theme_data:
-            if isinstance(theme_data, str):
-                self.load_from_file(theme_data)
-            elif isinstance(theme_data, dict):
-                self.update_theme(theme_data)
+        self._compiled = compile_theme(theme_data)
+        self._theme = None
+        self._stale = False
+
+    @property
+    def theme(self):
+        # Private copy of the merged dict, the compiled one is shared.
+        # Changing it compiles the theme again before its next use.
+        if self._theme is None:
+            self._theme = _ThemeDict(self._compiled.raw, self._changed)
+        return self._theme
+
+    @property
+    def compiled(self):
+        if self._stale:
+            self._stale = False
+            self._compiled = CompiledTheme(copy.deepcopy(self._theme))
+        return self._compiled
+
+    def _changed(self):
+        self._stale = True
 
     def _get_default_theme(self):
-        default_path = os.path.join(os.path.dirname(__file__), "themes", "default.json")
-        with open(default_path, 'r') as f:
-            return json.load(f)
+        return copy.deepcopy(BUILTIN_THEMES["default"])
 
     def load_from_file(self, filepath):
-        if not os.path.exists(filepath):
-            # Try loading from built-in themes directory
-            builtin_path = os.path.join(os.path.dirname(__file__), "themes", f"{filepath}.json")
-            if os.path.exists(builtin_path):
-                filepath = builtin_path
-            else:
-                raise FileNotFoundError(f"Theme file {filepath} not found.")
-        
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-            self.update_theme(data)
+        self.update_theme(load_theme(filepath))
 
     def update_theme(self, data):
         deep_merge(self.theme, data)
 
     def get_style(self, category, subkey=None):
-        style = self.theme.get("styles", {}).get(category)
+        style = self.compiled.styles.get(category)
         if style is None:
             raise KeyError(f"Style category '{category}' not found in theme.")
         if subkey:
-            if not isinstance(style, dict):
+            if not isinstance(style, Mapping):
                 raise TypeError(f"Style category '{category}' is not a dictionary.")
             val = style.get(subkey)
             if val is None:
@@ -53,22 +273,62 @@ class ThemeManager:
         return style
 
     def get_dimension(self, key):
-        val = self.theme.get("dimensions", {}).get(key)
+        val = self.compiled.dimensions.get(key)
         if val is None:
             raise KeyError(f"Dimension '{key}' not found in theme.")
         return val
 
     def get_shape_config(self, shape_name):
-        config = self.theme.get("shapes", {}).get(shape_name)
+        config = self.compiled.shapes.get(shape_name)
         if config is None:
             raise KeyError(f"Shape '{shape_name}' not found in theme.")
         return config
 
     def get_gate_config(self, gate_name):
-        # Gates use the base 'gate' shape config as their foundation
-        base_config = self.get_shape_config("gate")
-        gate_specific = self.theme.get("gates", {}).get(gate_name, {})
-        return {**base_config, **gate_specific}
+        return self.compiled.gate(gate_name)
 
     def get_substitution(self, gate_name):
-        return self.theme.get("substitutions", {}).get(gate_name)
+        return self.compiled.substitutions.get(gate_name)
+
+
+def bundle_themes(path=BUNDLE_PATH):
+    """Write themes/*.json as a Python module, run after editing a built-in theme.
+
+    Returns True when the module changed.
+    """
+    source = (
+        '"""Built-in themes, generated from themes/*.json by `python -m quantum_quirkvis.theme`."""\n\n'
+        f"THEMES = {_literal(_read_theme_files())}\n"
+    )
+    old = None
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            old = f.read()
+    if source == old:
+        return False
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    return True
+
+
+def _literal(value, indent=""):
+    # One key per line, in the order of the JSON files
+    if isinstance(value, dict) and value:
+        inner = indent + "    "
+        items = "".join(f"{inner}{k!r}: {_literal(v, inner)},\n" for k, v in value.items())
+        return "{\n" + items + indent + "}"
+    return repr(value)
+
+def _read_theme_files():
+    return {name[:-5]: _read_json(os.path.join(THEMES_DIR, name))
+            for name in sorted(os.listdir(THEMES_DIR)) if name.endswith(".json")}
+
+
+if __name__ == "__main__":
+    import sys
+    if "--check" in sys.argv[1:]:
+        # Leaves the module as it is and fails when it is out of date
+        if _read_theme_files() != BUILTIN_THEMES:
+            sys.exit("builtin_themes.py is out of date, run python -m quantum_quirkvis.theme")
+    else:
+        print("updated" if bundle_themes() else "up to date", BUNDLE_PATH)
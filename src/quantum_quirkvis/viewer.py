@@ -0,0 +1,183 @@
+import html
+import json
+import os
+from .drawer import SVGDrawer
+
+DEFAULT_CHUNK_MOMENTS = 64
+DEFAULT_CHUNK_LINES = 32
+CHUNKS_DIR = "chunks"
+
+
+def export_html(program, directory, theme=None, chunk_moments=DEFAULT_CHUNK_MOMENTS,
+                chunk_lines=DEFAULT_CHUNK_LINES, jobs=None, fold=False):
+    """Write a scrollable, zoomable HTML view of a circuit of any size.
+
+    directory receives index.html, a small shell page, and one script per
+    tile of chunk_moments x chunk_lines under chunks/. The page only loads
+    the tiles around the visible area (as <script> tags, so it works from
+    the local filesystem without a server) and drops the far away ones.
+    Returns the path of index.html.
+    """
+    if chunk_moments < 1 or chunk_lines < 1:
+        raise ValueError("chunks need at least one moment and one line")
+    drawer = SVGDrawer(theme, fold=fold)
+    layout = drawer._shared_layout(program)
+    compiled = drawer.theme_manager.compiled
+
+    os.makedirs(os.path.join(directory, CHUNKS_DIR), exist_ok=True)
+    pages = layout.pages(chunk_moments)
+    rows = max(1, -(-layout.n_lines // chunk_lines))
+
+    # One job per column of tiles, each worker only receives its own moments
+    work = [(theme, page, col, chunk_lines, rows, directory)
+            for col, page in enumerate(pages)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(work) <= 1:
+        list(map(render_column, work))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(jobs, len(work))) as executor:
+            list(executor.map(render_column, work, chunksize=max(1, len(work) // (jobs * 8))))
+
+    padding = compiled.padding
+    line_spacing = compiled.line_spacing
+    stride = compiled.gate_width + compiled.gate_spacing
+    meta = {
+        "cols": len(pages),
+        "rows": rows,
+        "left": padding + compiled.label_offset,
+        "top": padding - line_spacing / 2,
+        "tileWidth": chunk_moments * stride,
+        "tileHeight": chunk_lines * line_spacing,
+        "width": (padding * 2) + (layout.n_moments * stride) + (compiled.label_offset * 1.5),
+        "height": (0.5 * padding) + (layout.n_lines * line_spacing),
+        "chunks": CHUNKS_DIR,
+    }
+    index = os.path.join(directory, "index.html")
+    with open(index, "w", encoding="utf-8") as f:
+        f.write(SHELL.replace("__TITLE__", html.escape(compiled.name or "circuit"))
+                     .replace("__BACKGROUND__", compiled.background)
+                     .replace("__LABELS__", drawer.render_labels(layout))
+                     .replace("__META__", json.dumps(meta)))
+    return index
+
+
+def render_column(job):
+    theme, page, col, chunk_lines, rows, directory = job
+    drawer = SVGDrawer(theme)
+    for row in range(rows):
+        lo = row * chunk_lines
+        hi = min(lo + chunk_lines, page.n_lines) - 1
+        svg = drawer.render_tile(page, lo, hi)
+        path = os.path.join(directory, CHUNKS_DIR, f"c{col}_r{row}.js")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"qvTile({col},{row},{json.dumps(svg)});\n")
+
+
+SHELL = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+html, body { margin: 0; height: 100%; overflow: hidden; background: __BACKGROUND__; }
+#view { position: absolute; inset: 0; overflow: auto; }
+#spacer { position: relative; }
+#content { position: absolute; left: 0; top: 0; transform-origin: 0 0; }
+#content > div { position: absolute; }
+#content svg { display: block; }
+#labels { position: absolute; left: 0; top: 0; bottom: 0; overflow: hidden; pointer-events: none; background: __BACKGROUND__; }
+#labels > div { transform-origin: 0 0; }
+#zoom { position: absolute; right: 16px; bottom: 16px; font: 14px sans-serif; }
+#zoom button { width: 32px; height: 32px; }
+</style>
+</head>
+<body>
+<div id="view"><div id="spacer"><div id="content"></div></div></div>
+<div id="labels"><div>__LABELS__</div></div>
+<div id="zoom"><button data-f="0.8">&minus;</button><button data-f="1.25">+</button></div>
+<script>
+const meta = __META__;
+const view = document.getElementById("view");
+const spacer = document.getElementById("spacer");
+const content = document.getElementById("content");
+const labels = document.getElementById("labels");
+const tiles = new Map(), pending = new Set();
+const MARGIN = 1, KEEP = 3;
+let zoom = 1;
+
+function visibleRange(margin) {
+  const x0 = view.scrollLeft / zoom, x1 = (view.scrollLeft + view.clientWidth) / zoom;
+  const y0 = view.scrollTop / zoom, y1 = (view.scrollTop + view.clientHeight) / zoom;
+  const clamp = (v, n) => Math.max(0, Math.min(n - 1, v));
+  return [
+    clamp(Math.floor((x0 - meta.left) / meta.tileWidth) - margin, meta.cols),
+    clamp(Math.floor((x1 - meta.left) / meta.tileWidth) + margin, meta.cols),
+    clamp(Math.floor((y0 - meta.top) / meta.tileHeight) - margin, meta.rows),
+    clamp(Math.floor((y1 - meta.top) / meta.tileHeight) + margin, meta.rows),
+  ];
+}
+
+// Called by every chunk script
+window.qvTile = function (col, row, svg) {
+  const key = col + "_" + row;
+  pending.delete(key);
+  const [c0, c1, r0, r1] = visibleRange(KEEP);
+  if (tiles.has(key) || col < c0 || col > c1 || row < r0 || row > r1) return;
+  const tile = document.createElement("div");
+  tile.style.left = (meta.left + col * meta.tileWidth) + "px";
+  tile.style.top = (meta.top + row * meta.tileHeight) + "px";
+  tile.innerHTML = svg;
+  content.appendChild(tile);
+  tiles.set(key, tile);
+};
+
+function update() {
+  const [c0, c1, r0, r1] = visibleRange(MARGIN);
+  for (let col = c0; col <= c1; col++) {
+    for (let row = r0; row <= r1; row++) {
+      const key = col + "_" + row;
+      if (tiles.has(key) || pending.has(key)) continue;
+      pending.add(key);
+      const script = document.createElement("script");
+      script.src = meta.chunks + "/c" + col + "_r" + row + ".js";
+      script.onload = script.onerror = () => { script.remove(); pending.delete(key); };
+      document.head.appendChild(script);
+    }
+  }
+  const [k0, k1, q0, q1] = visibleRange(KEEP);
+  for (const [key, tile] of tiles) {
+    const [col, row] = key.split("_").map(Number);
+    if (col < k0 || col > k1 || row < q0 || row > q1) { tile.remove(); tiles.delete(key); }
+  }
+  labels.style.width = (meta.left * zoom) + "px";
+  labels.firstChild.style.transform = "translateY(" + (-view.scrollTop) + "px) scale(" + zoom + ")";
+}
+
+function setZoom(factor, cx, cy) {
+  const next = Math.max(0.02, Math.min(4, zoom * factor));
+  const x = (view.scrollLeft + cx) / zoom, y = (view.scrollTop + cy) / zoom;
+  zoom = next;
+  spacer.style.width = (meta.width * zoom) + "px";
+  spacer.style.height = (meta.height * zoom) + "px";
+  content.style.transform = "scale(" + zoom + ")";
+  view.scrollLeft = x * zoom - cx;
+  view.scrollTop = y * zoom - cy;
+  update();
+}
+
+view.addEventListener("scroll", () => requestAnimationFrame(update));
+window.addEventListener("resize", update);
+view.addEventListener("wheel", (e) => {
+  if (!e.ctrlKey) return;
+  e.preventDefault();
+  setZoom(e.deltaY < 0 ? 1.1 : 1 / 1.1, e.clientX, e.clientY);
+}, { passive: false });
+for (const button of document.querySelectorAll("#zoom button")) {
+  button.onclick = () => setZoom(Number(button.dataset.f), view.clientWidth / 2, view.clientHeight / 2);
+}
+setZoom(1, 0, 0);
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,217 @@
+import hashlib
+import os
+import re
+import sys
+import time
+from .batch import expand_inputs, output_paths, output_template
+from .drawer import SVGDrawer, _render_to_file, unroll_program
+from .theme import is_builtin_theme, resolve_theme_path
+
+# Seconds between two scans, and of quiet after a change before drawing
+POLL_INTERVAL = 0.2
+DEBOUNCE = 0.3
+# Custom includes, pyqasm resolves them relative to the including file
+_INCLUDE = re.compile(r'^\s*include\s+"(?!stdgates\.inc"|qelib1\.inc")([^"]+)"\s*;', re.MULTILINE)
+
+
+def find_includes(path, found=None):
+    """Files a QASM file includes, directly or through other includes, missing ones too."""
+    found = [] if found is None else found
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+    except OSError:
+        return found
+    for name in _INCLUDE.findall(source):
+        include = os.path.join(os.path.dirname(path), name)
+        if include not in found:
+            found.append(include)
+            find_includes(include, found)
+    return found
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _digest(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class Program:
+    """A parsed input and its layouts, one per line ordering of the themes."""
+
+    __slots__ = ('parsed', 'includes', 'layouts')
+
+    def __init__(self, parsed, includes):
+        self.parsed = parsed
+        self.includes = includes
+        self.layouts = {}
+
+
+class Watcher:
+    """Keeps the SVGs of QASM files up to date while they and their themes are edited.
+
+    inputs, themes and output are those of render_batch(). Inputs, the files
+    they include and theme JSON files are polled every interval seconds by
+    mtime and size, and count as changed when their content hash changed
+    too. Changes are drawn once debounce seconds pass without another one,
+    so a burst of saves is drawn once. Only the outputs a change affects are
+    drawn again: an input in every theme, a theme for every input. Parsed
+    programs and their layouts are kept between changes, a theme change
+    parses nothing.
+    """
+
+    def __init__(self, inputs, themes=None, output=None, fold=False, symbols=False, compact=None,
+                 interval=POLL_INTERVAL, debounce=DEBOUNCE, progress=sys.stderr):
+        self.inputs = inputs
+        self.themes = themes or [None]
+        self.template = output_template(output, self.themes)
+        self.fold = fold
+        self.symbols = symbols
+        self.compact = compact
+        self.interval = interval
+        self.debounce = debounce
+        self.progress = progress
+        # Built-in themes never change, only files are watched
+        self.theme_paths = [self._theme_path(theme) for theme in self.themes]
+        self.parses = 0
+        self.renders = 0
+        self._programs = {}
+        # path -> (mtime and size, content hash) when last drawn, and mtime and size when last polled
+        self._drawn = {}
+        self._polled = {}
+
+    def _theme_path(self, theme):
+        if not isinstance(theme, str) or is_builtin_theme(theme):
+            return None
+        try:
+            return os.path.abspath(resolve_theme_path(theme))
+        except FileNotFoundError:
+            # Watched until it appears
+            return os.path.abspath(theme)
+
+    def tracked(self, files=None):
+        """Every file whose changes are drawn: inputs, their includes and theme files."""
+        paths = list(expand_inputs(self.inputs) if files is None else files)
+        for program in self._programs.values():
+            paths.extend(program.includes)
+        paths.extend(path for path in self.theme_paths if path)
+        return list(dict.fromkeys(paths))
+
+    def modified(self):
+        """Whether anything was saved since the last call, by mtime and size only."""
+        stats = {path: _stat(path) for path in self.tracked()}
+        modified = stats != self._polled
+        self._polled = stats
+        return modified
+
+    def _changed(self, path):
+        stat = _stat(path)
+        drawn = self._drawn.get(path)
+        if drawn is not None and drawn[0] == stat:
+            return False
+        digest = _digest(path)
+        self._drawn[path] = stat, digest
+        # Saved again without changes
+        return drawn is None or drawn[1] != digest
+
+    def refresh(self):
+        """Draw what changed since the last call, everything on the first one.
+
+        Returns (input, outputs, error, seconds) tuples, as render_batch(),
+        and raises ValueError as it does when outputs would collide.
+        """
+        files = expand_inputs(self.inputs)
+        outputs = output_paths(files, self.themes, self.template)
+        changed = {path for path in self.tracked(files) if self._changed(path)}
+        for path in list(self._programs):
+            if path not in files:
+                del self._programs[path]
+        themes = [i for i, path in enumerate(self.theme_paths) if path in changed]
+        results = []
+        for path in files:
+            program = self._programs.get(path)
+            if program is None or path in changed or any(p in changed for p in program.includes):
+                results.append(self._draw(path, outputs[path], range(len(self.themes)), reload=True))
+            elif themes and program.parsed is not None:
+                results.append(self._draw(path, outputs[path], themes))
+        if self.progress:
+            for path, outputs, error, seconds in results:
+                status = f"FAILED {error}" if error else ", ".join(outputs)
+                self.progress.write(f"{path} -> {status} ({seconds:.2f}s)\n")
+            self.progress.flush()
+        return results
+
+    def _draw(self, path, paths, themes, reload=False):
+        start = time.perf_counter()
+        outputs = []
+        try:
+            if reload:
+                includes = find_includes(path)
+                for include in includes:
+                    # Known from now on, later changes are compared to this version
+                    if include not in self._drawn:
+                        self._changed(include)
+                try:
+                    parsed = self._parse(path, includes)
+                except Exception:
+                    # The last good parse and its layouts stay, theme changes still draw it
+                    self._programs.setdefault(path, Program(None, includes)).includes = includes
+                    raise
+                self._programs[path] = Program(parsed, includes)
+            program = self._programs[path]
+            for i in themes:
+                theme, out = self.themes[i], paths[i]
+                if os.path.dirname(out):
+                    os.makedirs(os.path.dirname(out), exist_ok=True)
+                drawer = SVGDrawer(theme, fold=self.fold, symbols=self.symbols, compact=self.compact)
+                key = drawer.layout_key()
+                if key not in program.layouts:
+                    program.layouts[key] = drawer.layout(*drawer.parse(program.parsed))
+                layout = program.layouts[key]
+                _render_to_file(out, lambda f: drawer.render(layout, out=f))
+                self.renders += 1
+                outputs.append(out)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return path, outputs, error, time.perf_counter() - start
+
+    def _parse(self, path, includes):
+        if includes:
+            # Inlined, the drawing then follows the included files
+            from pyqasm.preprocess import process_include_statements
+            source = process_include_statements(path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                source = f.read()
+        self.parses += 1
+        return unroll_program(source, fold=self.fold)
+
+    def run(self, stop=None):
+        """Draw everything, then every change until interrupted or stop() returns true."""
+        self.refresh()
+        self.modified()
+        if self.progress:
+            self.progress.write(f"Watching {len(self._polled)} files, Ctrl+C to stop\n")
+            self.progress.flush()
+        quiet_since = None
+        try:
+            while not (stop and stop()):
+                time.sleep(self.interval)
+                if self.modified():
+                    quiet_since = time.monotonic()
+                elif quiet_since is not None and time.monotonic() - quiet_since >= self.debounce:
+                    quiet_since = None
+                    self.refresh()
+        except KeyboardInterrupt:
+            pass
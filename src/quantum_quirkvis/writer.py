@@ -0,0 +1,284 @@
+import re
+from functools import lru_cache
+import xml.etree.ElementTree as ET
+
+# ElementTree's own escaping, so both writers produce the same bytes
+_escape_attrib = ET._escape_attrib
+_escape_cdata = ET._escape_cdata
+
+
+class TreeWriter:
+    """Builds the document as an ElementTree DOM and serializes it at the end."""
+
+    def __init__(self):
+        self.root = None
+        self._stack = []
+
+    def start(self, tag, attrs):
+        if self._stack:
+            elem = ET.SubElement(self._stack[-1], tag, attrs)
+        else:
+            elem = self.root = ET.Element(tag, attrs)
+        self._stack.append(elem)
+
+    def element(self, tag, attrs, text=None):
+        elem = ET.SubElement(self._stack[-1], tag, attrs)
+        if text is not None:
+            elem.text = text
+
+    def end(self):
+        self._stack.pop()
+
+    def getvalue(self):
+        return ET.tostring(self.root, encoding='unicode')
+
+
+class StreamWriter:
+    """Writes elements to a file-like object as soon as they are drawn.
+
+    Nothing but the stack of open tags is kept in memory. The markup matches
+    ET.tostring(encoding='unicode') byte for byte.
+    """
+
+    def __init__(self, out, empty_tag=" />"):
+        self.out = out
+        self.empty_tag = empty_tag
+        self._stack = []
+        # Whether the innermost start tag is still waiting for its '>'
+        self._open = False
+
+    def start(self, tag, attrs):
+        self._close_start_tag()
+        self.out.write(f"<{tag}{self._attrs(attrs)}")
+        self._stack.append(tag)
+        self._open = True
+
+    def element(self, tag, attrs, text=None):
+        self._close_start_tag()
+        if text:
+            self.out.write(f"<{tag}{self._attrs(attrs)}>{_escape_cdata(text)}</{tag}>")
+        else:
+            self.out.write(f"<{tag}{self._attrs(attrs)}{self.empty_tag}")
+
+    def end(self):
+        tag = self._stack.pop()
+        if self._open:
+            self.out.write(self.empty_tag)
+            self._open = False
+        else:
+            self.out.write(f"</{tag}>")
+
+    def getvalue(self):
+        # Everything has already been written to the output
+        return None
+
+    def _close_start_tag(self):
+        if self._open:
+            self.out.write(">")
+            self._open = False
+
+    def _attrs(self, attrs):
+        return "".join(f' {k}="{_escape_attrib(v)}"' for k, v in attrs.items())
+
+
+# Attributes moved from the elements into the <style> block
+PRESENTATION_ATTRS = (
+    'fill', 'stroke', 'stroke-width', 'stroke-dasharray', 'stroke-linecap',
+    'font-family', 'font-size', 'text-anchor', 'dominant-baseline',
+)
+# CSS needs units where SVG attributes don't
+CSS_LENGTHS = ('stroke-width', 'font-size')
+
+
+class SymbolWriter:
+    """Wraps another writer to deduplicate the output.
+
+    Presentation attributes are replaced by a class per distinct combination,
+    and repeated shapes are drawn once into <defs> and referenced with <use>.
+    The <defs> and <style> blocks are emitted at the end of the document so
+    the wrapped writer can keep streaming.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.classes = {}
+        self.symbols = {}
+        self._defs = _Recorder(self)
+        self._depth = 0
+
+    def start(self, tag, attrs):
+        self.writer.start(tag, self.classify(attrs))
+        self._depth += 1
+
+    def element(self, tag, attrs, text=None):
+        self.writer.element(tag, self.classify(attrs), text)
+
+    def use(self, key, x, y, draw):
+        # draw(writer) renders the symbol around the origin, only the first time
+        ref = self.symbols.get(key)
+        if ref is None:
+            ref = self.symbols[key] = f"u{len(self.symbols)}"
+            self._defs.start('g', {'id': ref})
+            draw(self._defs)
+            self._defs.end()
+        self.writer.element('use', {'href': f'#{ref}', 'x': str(x), 'y': str(y)})
+
+    def end(self):
+        self._depth -= 1
+        if self._depth == 0:
+            if self._defs.events:
+                self.writer.start('defs', {})
+                self._defs.replay(self.writer)
+                self.writer.end()
+            if self.classes:
+                self.writer.element('style', {}, self.stylesheet())
+        self.writer.end()
+
+    def getvalue(self):
+        return self.writer.getvalue()
+
+    def classify(self, attrs):
+        geometry = {}
+        style = []
+        for k, v in attrs.items():
+            if k in PRESENTATION_ATTRS:
+                if v != '':
+                    style.append((k, v))
+            else:
+                geometry[k] = v
+        if not style:
+            return geometry
+        key = tuple(sorted(style))
+        name = self.classes.get(key)
+        if name is None:
+            name = self.classes[key] = f"c{len(self.classes)}"
+        geometry['class'] = name
+        return geometry
+
+    def stylesheet(self):
+        rules = []
+        for style, name in self.classes.items():
+            props = ";".join(f"{k}:{_css_value(k, v)}" for k, v in style)
+            rules.append(f".{name}{{{props}}}")
+        return "".join(rules)
+
+
+# Attributes holding coordinates and lengths, rounded by CompactWriter
+NUMERIC_ATTRS = frozenset((
+    'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx', 'cy', 'r', 'rx',
+    'width', 'height', 'd', 'points', 'viewBox',
+))
+# SVG initial values, CompactWriter leaves these attributes out
+DEFAULT_ATTRS = {
+    'x': '0', 'y': '0', 'rx': '0',
+    'stroke': 'none', 'stroke-width': '1', 'stroke-dasharray': 'none', 'stroke-linecap': 'butt',
+    'fill-opacity': '1', 'text-anchor': 'start', 'dominant-baseline': 'auto',
+}
+_DECIMAL = re.compile(r"-?\d*\.\d+(?:e[-+]?\d+)?|-?\d+e[-+]?\d+")
+# Path data separators the grammar allows to drop: before a minus sign, and
+# between a number with a decimal point and one starting with it
+_PATH_SPACE = re.compile(r" (?=-)|(?<=\.\d) (?=\.)|(?<=\.\d\d) (?=\.)|(?<=\.\d{3}) (?=\.)")
+
+
+class CompactWriter:
+    """Wraps another writer to make the output smaller.
+
+    Decimals in coordinate attributes are rounded to `precision` places and
+    written without trailing or leading zeros, empty attributes and those
+    equal to their SVG initial value are dropped. The drawer never sets
+    presentation attributes on groups, so no element relies on overriding
+    an inherited value.
+    """
+
+    def __init__(self, writer, precision):
+        self.writer = writer
+        self.precision = precision
+
+    def start(self, tag, attrs):
+        self.writer.start(tag, self.compact(attrs))
+
+    def element(self, tag, attrs, text=None):
+        self.writer.element(tag, self.compact(attrs), text)
+
+    def end(self):
+        self.writer.end()
+
+    def getvalue(self):
+        return self.writer.getvalue()
+
+    def compact(self, attrs):
+        result = {}
+        precision = self.precision
+        for k, v in attrs.items():
+            if k == 'd':
+                # Relative steps repeat from path to path, only the moveto differs
+                i = v.find('l')
+                if i < 0:
+                    v = _compact_path(v, precision)
+                else:
+                    v = _compact_path(v[:i], precision) + _compact_steps(v[i:], precision)
+            elif k in NUMERIC_ATTRS and ('.' in v or 'e' in v):
+                v = _compact_numbers(v, precision)
+            if v != '' and DEFAULT_ATTRS.get(k) != v:
+                result[k] = v
+        return result
+
+
+@lru_cache(maxsize=65536)
+def _compact_numbers(value, precision):
+    # Coordinates repeat along rows and columns
+    return _DECIMAL.sub(lambda match: _format_number(match.group(), precision), value)
+
+
+def _compact_path(value, precision):
+    return _PATH_SPACE.sub('', _compact_numbers(value, precision))
+
+
+_compact_steps = lru_cache(maxsize=4096)(_compact_path)
+
+
+def _format_number(text, precision):
+    s = f"{float(text):.{precision}f}"
+    if '.' in s:
+        s = s.rstrip('0').rstrip('.')
+    if s.startswith('0.'):
+        return s[1:]
+    if s.startswith('-0.'):
+        return '-' + s[2:]
+    return '0' if s in ('', '-0') else s
+
+
+class _Recorder:
+    """Collects <defs> content until the end of the document."""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.events = []
+
+    def start(self, tag, attrs):
+        self.events.append(('start', tag, self.owner.classify(attrs), None))
+
+    def element(self, tag, attrs, text=None):
+        self.events.append(('element', tag, self.owner.classify(attrs), text))
+
+    def end(self):
+        self.events.append(('end', None, None, None))
+
+    def replay(self, writer):
+        for kind, tag, attrs, text in self.events:
+            if kind == 'start':
+                writer.start(tag, attrs)
+            elif kind == 'element':
+                writer.element(tag, attrs, text)
+            else:
+                writer.end()
+
+
+def _css_value(key, value):
+    if key in CSS_LENGTHS:
+        try:
+            float(value)
+            return f"{value}px"
+        except ValueError:
+            pass
+    return value
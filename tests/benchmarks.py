@@ -0,0 +1,640 @@
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from openqasm3 import ast
+from quantum_quirkvis import draw, draw_many, RenderCache, Layout, Profile, AsyncRenderer, unroll_program
+from quantum_quirkvis.cache import MemoryCache
+from quantum_quirkvis.drawer import LAYOUT_CACHE, SVGDrawer, layout_size
+from quantum_quirkvis.incremental import IncrementalDrawer
+from circuits import FAMILIES, random_circuit
+
+QASM_DIR = "./qasms"
+THEME_DIR = "./themes"
+COMPLEX_QASM_DIR = "./qasms_complex"
+BUILTIN_THEMES = ["default", "night", "emoji", "matrix"]
+
+# Scaling points
+STATEMENT_COUNTS = [1000, 10000, 100000]
+LINE_COUNTS = [10, 100, 1000]
+LOOP_ITERATIONS = [10, 100, 1000, 100000]
+STREAM_GATE_COUNTS = [1000, 2000, 5000]
+
+# Stored results of the suite, and the slowdown reported as a regression
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+THRESHOLD = 0.25
+# Differences below this many seconds or bytes of memory are noise
+MIN_DELTA = 0.02
+MIN_MEMORY_DELTA = 1e6
+# Small cases are timed up to REPEAT times, within about REPEAT_BUDGET seconds
+REPEAT = 5
+REPEAT_BUDGET = 0.5
+# Profile phases making up each stage of the suite
+STAGES = {
+    "parse": ("parse", "unroll"),
+    "layout": ("line_assignment", "resolve", "scheduling"),
+    "render": ("canvas", "lines_pass", "shapes_pass", "serialization"),
+}
+
+def qubit(i):
+    return ast.IndexedIdentifier(ast.Identifier("q"), [[ast.IntegerLiteral(i)]])
+
+def random_statements(n_statements, n_qubits, seed=0):
+    rnd = random.Random(seed)
+    statements = []
+    for _ in range(n_statements):
+        r = rnd.random()
+        if r < 0.5:
+            statements.append(ast.QuantumGate([], ast.Identifier("h"), [], [qubit(rnd.randrange(n_qubits))]))
+        elif r < 0.99:
+            a, b = rnd.sample(range(n_qubits), 2)
+            statements.append(ast.QuantumGate([], ast.Identifier("cx"), [], [qubit(a), qubit(b)]))
+        else:
+            statements.append(ast.QuantumMeasurementStatement(ast.QuantumMeasurement(qubit(0)), None))
+    return statements
+
+def bench_scheduling():
+    drawer = SVGDrawer()
+    print("Scheduling (_compute_moments)")
+    print(f"{'lines':>8} {'statements':>12} {'seconds':>10} {'us/stmt':>10}")
+    for n_lines in LINE_COUNTS:
+        line_nums = {("q", i): i for i in range(n_lines)}
+        line_nums[("c", -1)] = line_nums[("c", 0)] = n_lines
+        for n_statements in STATEMENT_COUNTS:
+            ops = drawer._resolve(random_statements(n_statements, n_lines), line_nums, ["q"])
+            start = time.perf_counter()
+            drawer._compute_moments(ops, line_nums)
+            elapsed = time.perf_counter() - start
+            print(f"{n_lines:>8} {n_statements:>12} {elapsed:>10.3f} {elapsed / n_statements * 1e6:>10.2f}")
+
+def loop_program(iterations):
+    return f"""OPENQASM 3.0;
+include "stdgates.inc";
+qubit[4] q;
+bit[4] c;
+for int i in [0:{iterations - 1}] {{
+    h q[0];
+    cx q[0], q[1];
+    rz(0.5) q[2];
+}}
+c = measure q;
+"""
+
+def time_draw(drawer, program):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        svg = drawer.draw(program)
+    return time.perf_counter() - start, len(svg)
+
+def bench_folding():
+    print("Folded vs unrolled loops (draw)")
+    print(f"{'iterations':>12} {'unrolled s':>12} {'folded s':>10} {'unrolled B':>12} {'folded B':>10}")
+    for iterations in LOOP_ITERATIONS:
+        program = loop_program(iterations)
+        if iterations <= 1000:
+            unrolled, unrolled_size = time_draw(SVGDrawer(), program)
+            unrolled, unrolled_size = f"{unrolled:.3f}", str(unrolled_size)
+        else:
+            unrolled = unrolled_size = "skipped"
+        folded, folded_size = time_draw(SVGDrawer(fold=True), program)
+        print(f"{iterations:>12} {unrolled:>12} {folded:>10.3f} {unrolled_size:>12} {folded_size:>10}")
+
+def reset_peak():
+    """Start a new traced peak, returns the memory to add to it.
+
+    tracemalloc.reset_peak() needs Python 3.9; before that tracing starts
+    over and the memory still held is carried by hand.
+    """
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+        return 0
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    tracemalloc.start()
+    return held
+
+def peak_memory(fn):
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def run_cli(args):
+    from quantum_quirkvis import cli
+    argv = sys.argv
+    sys.argv = ["qasmvis"] + args
+    try:
+        cli.main()
+    finally:
+        sys.argv = argv
+
+def bench_streaming():
+    print("DOM + tostring vs streaming writer (peak traced memory, includes parsing)")
+    print(f"{'gates':>8} {'dom MB':>10} {'stream MB':>10} {'filename MB':>12} {'string MB':>10} {'cli -o MB':>10}")
+    directory = tempfile.mkdtemp()
+    try:
+        for n_gates in STREAM_GATE_COUNTS:
+            program = random_circuit(n_gates, 20)
+            source = os.path.join(directory, "circuit.qasm")
+            with open(source, "w") as f:
+                f.write(program)
+            svg = os.path.join(directory, "circuit.svg")
+            dom = peak_memory(lambda: SVGDrawer().draw(program))
+            with open(os.devnull, "w") as out:
+                stream = peak_memory(lambda: SVGDrawer().draw(program, out=out))
+            # draw(filename=) streams unless the SVG is returned as well
+            to_file = peak_memory(lambda: draw(program, filename=svg, return_svg=False))
+            returned = peak_memory(lambda: draw(program, filename=svg))
+            command = peak_memory(lambda: run_cli([source, "-o", svg, "--no-server"]))
+            print(f"{n_gates:>8} {dom / 1e6:>10.1f} {stream / 1e6:>10.1f} {to_file / 1e6:>12.1f} "
+                  f"{returned / 1e6:>10.1f} {command / 1e6:>10.1f}")
+    finally:
+        shutil.rmtree(directory)
+
+def complex_programs():
+    # Some samples are only accepted by pyqasm with an explicit version header
+    for qasm_path in sorted(glob.glob(os.path.join(COMPLEX_QASM_DIR, "*.qasm"))):
+        with open(qasm_path, "r") as f:
+            program = f.read()
+        if "OPENQASM" not in program:
+            program = "OPENQASM 3.0;\n" + program
+        yield os.path.splitext(os.path.basename(qasm_path))[0], program
+
+def bench_symbols():
+    print("Output size: inline attributes vs <defs>/<use> + CSS classes")
+    print(f"{'circuit':>14} {'theme':>8} {'inline B':>10} {'symbols B':>10} {'saved':>7}")
+    logging.disable(logging.CRITICAL)
+    total_inline = total_symbols = 0
+    for name, program in complex_programs():
+        for theme in BUILTIN_THEMES:
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    inline = len(SVGDrawer(theme).draw(program).encode())
+                    symbols = len(SVGDrawer(theme, symbols=True).draw(program).encode())
+            except Exception:
+                # pyqasm rejects some of the samples
+                continue
+            total_inline += inline
+            total_symbols += symbols
+            print(f"{name:>14} {theme:>8} {inline:>10} {symbols:>10} {1 - symbols / inline:>7.1%}")
+    logging.disable(logging.NOTSET)
+    print(f"{'total':>14} {'':>8} {total_inline:>10} {total_symbols:>10} {1 - total_symbols / total_inline:>7.1%}")
+
+def bench_many_themes():
+    # Same matrix of circuits x themes as tests.py
+    themes = BUILTIN_THEMES + sorted(glob.glob(os.path.join(THEME_DIR, "*.json")))
+    programs = [open(path).read() for path in sorted(glob.glob(os.path.join(QASM_DIR, "*.qasm")))]
+    programs.append(random_circuit(2000, 16))
+    print(f"draw() per theme vs draw_many() over {len(themes)} themes")
+    print(f"{'stmts':>8} {'loop s':>10} {'many s':>10} {'speedup':>8}")
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        rows = []
+        for program in programs:
+            start = time.perf_counter()
+            for theme in themes:
+                draw(program, theme=theme)
+            loop = time.perf_counter() - start
+            start = time.perf_counter()
+            draw_many(program, themes)
+            many = time.perf_counter() - start
+            rows.append((program.count(";"), loop, many))
+    for gates, loop, many in rows:
+        print(f"{gates:>8} {loop:>10.3f} {many:>10.3f} {loop / many:>7.1f}x")
+
+def time_parse(drawer, program, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        drawer.parse(program)
+    return (time.perf_counter() - start) / repeat
+
+def bench_flat_parser():
+    print("pyqasm loads + unroll vs flat fast path (parse only, then whole draw)")
+    print(f"{'circuit':>14} {'pyqasm s':>10} {'fast s':>10} {'speedup':>8} {'draw speedup':>13}")
+    programs = [(os.path.splitext(os.path.basename(path))[0], open(path).read())
+                for path in sorted(glob.glob(os.path.join(QASM_DIR, "*.qasm")))]
+    programs += [(f"random {n}", random_circuit(n, 20)) for n in STATEMENT_COUNTS[:2]]
+    slow, fast = SVGDrawer(fast_parse=False), SVGDrawer()
+    for name, program in programs:
+        repeat = 20 if len(program) < 10000 else 1
+        pyqasm_s = time_parse(slow, program, repeat)
+        fast_s = time_parse(fast, program, repeat)
+        draw_slow, _ = time_draw(slow, program)
+        draw_fast, _ = time_draw(fast, program)
+        print(f"{name:>14} {pyqasm_s:>10.4f} {fast_s:>10.4f} {pyqasm_s / fast_s:>7.1f}x {draw_slow / draw_fast:>12.1f}x")
+
+def bench_cache():
+    themes = BUILTIN_THEMES
+    programs = [open(path).read() for path in sorted(glob.glob(os.path.join(QASM_DIR, "*.qasm")))]
+    programs.append(random_circuit(2000, 16))
+    directory = tempfile.mkdtemp()
+    try:
+        cache = RenderCache(directory)
+        print(f"Render cache, {len(programs)} circuits x {len(themes)} themes")
+        print(f"{'build':>8} {'seconds':>10}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings = []
+            for build in ("none", "cold", "warm"):
+                start = time.perf_counter()
+                for program in programs:
+                    draw_many(program, themes, cache=None if build == "none" else cache)
+                timings.append((build, time.perf_counter() - start))
+        for build, elapsed in timings:
+            print(f"{build:>8} {elapsed:>10.3f}")
+        print(cache.stats())
+    finally:
+        shutil.rmtree(directory)
+
+def bench_layout_io():
+    print("Saved layouts: parse + schedule vs loading them back")
+    print(f"{'gates':>8} {'layout s':>10} {'json s':>10} {'json KB':>9} {'binary s':>10} {'binary KB':>10}")
+    drawer = SVGDrawer()
+    directory = tempfile.mkdtemp()
+    try:
+        for n_gates in STATEMENT_COUNTS:
+            program = random_circuit(n_gates, 50)
+            start = time.perf_counter()
+            layout = drawer.get_layout(program)
+            row = [time.perf_counter() - start]
+            for ext in (".json", ".qvl"):
+                path = os.path.join(directory, "layout" + ext)
+                layout.save(path)
+                start = time.perf_counter()
+                Layout.load(path)
+                row += [time.perf_counter() - start, os.path.getsize(path) / 1024]
+            print(f"{n_gates:>8} {row[0]:>10.3f} {row[1]:>10.3f} {row[2]:>9.0f} {row[3]:>10.3f} {row[4]:>10.0f}")
+    finally:
+        shutil.rmtree(directory)
+
+def bench_incremental():
+    print("Appending one gate and re-rendering: full draw vs IncrementalDrawer.append()")
+    print(f"{'gates':>8} {'draw ms':>10} {'append ms':>10} {'svg() ms':>10} {'speedup':>8}")
+    edits = [f"cx q[{i % 20}], q[{(i + 1) % 20}];" for i in range(100)]
+    for n_gates in STATEMENT_COUNTS[:2]:
+        program = random_circuit(n_gates, 20)
+        drawer = SVGDrawer()
+        full = min(time_draw(drawer, program + "\n" + edit)[0] for edit in edits[:3])
+        with contextlib.redirect_stdout(io.StringIO()):
+            inc = IncrementalDrawer(program)
+        start = time.perf_counter()
+        for edit in edits:
+            inc.append(edit)
+        append = (time.perf_counter() - start) / len(edits)
+        start = time.perf_counter()
+        inc.svg()
+        join = time.perf_counter() - start
+        print(f"{n_gates:>8} {full * 1e3:>10.2f} {append * 1e3:>10.3f} {join * 1e3:>10.2f} {full / append:>7.0f}x")
+
+def bench_compact():
+    print("Output size and render time: plain, compact (2 decimals), symbols, and gzipped to .svgz")
+    print(f"{'circuit':>18} {'output':>16} {'KB':>9} {'ratio':>7} {'seconds':>8}")
+    directory = tempfile.mkdtemp()
+    try:
+        for family in ("ghz", "qft", "random", "surface"):
+            generator, sizes = FAMILIES[family]
+            program = generator(*sizes[1])
+            layout = SVGDrawer().get_layout(program)
+            # Lazy imports and wave caches are warmed up outside the timings
+            draw(layout)
+            plain = None
+            for name, ext, options in (
+                ("plain", ".svg", {}),
+                ("compact", ".svg", {"compact": True}),
+                ("symbols+compact", ".svg", {"symbols": True, "compact": True}),
+                ("plain", ".svgz", {}),
+                ("compact", ".svgz", {"compact": True}),
+            ):
+                path = os.path.join(directory, "out" + ext)
+                start = time.perf_counter()
+                draw(layout, filename=path, **options)
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(path)
+                plain = plain or size
+                print(f"{family + str(sizes[1]):>18} {name + ext:>16} {size / 1024:>9.1f} {size / plain:>6.1%} {elapsed:>8.3f}")
+    finally:
+        shutil.rmtree(directory)
+
+def bench_unrolled():
+    print("Rendering a looped program 10 times: from source vs from one unroll_program() snapshot")
+    print(f"{'iterations':>10} {'source s':>10} {'snapshot s':>11} {'speedup':>8}")
+    for iterations in LOOP_ITERATIONS[:3]:
+        program = loop_program(iterations)
+        start = time.perf_counter()
+        for _ in range(10):
+            draw(program)
+        source = time.perf_counter() - start
+        start = time.perf_counter()
+        snapshot = unroll_program(program)
+        for _ in range(10):
+            draw(snapshot)
+        reused = time.perf_counter() - start
+        print(f"{iterations:>10} {source:>10.3f} {reused:>11.3f} {source / reused:>7.1f}x")
+
+async def serve(renderer, programs):
+    # Renders a burst of requests, returns the seconds and the longest event loop stall
+    stalls = [0.0]
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls.append(now - last - 0.001)
+            last = now
+    tick = asyncio.ensure_future(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(renderer.draw(program) for program in programs))
+    elapsed = time.perf_counter() - start
+    tick.cancel()
+    return elapsed, max(stalls)
+
+def bench_async():
+    print("Bursts of requests: draw() in the event loop vs AsyncRenderer")
+    print(f"{'burst':>22} {'mode':>8} {'seconds':>8} {'max stall ms':>13} {'renders':>8}")
+    distinct = [random_circuit(5000, 20, seed=i) for i in range(16)]
+    bursts = [("16 distinct", distinct), ("16 identical", [distinct[0]] * 16)]
+    for name, programs in bursts:
+        # Plain draw() blocks the loop for the whole burst
+        start = time.perf_counter()
+        for program in programs:
+            draw(program)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>22} {'inline':>8} {elapsed:>8.2f} {elapsed * 1e3:>13.0f} {len(programs):>8}")
+        for kind in ("thread", "process"):
+            renderer = AsyncRenderer(kind)
+            # Warm up the pool, process workers start on first use
+            asyncio.run(serve(renderer, [random_circuit(10, 2)]))
+            renderer.renders = 0
+            elapsed, stall = asyncio.run(serve(renderer, programs))
+            renderer.close()
+            print(f"{name:>22} {kind:>8} {elapsed:>8.2f} {stall * 1e3:>13.0f} {renderer.renders:>8}")
+
+def time_command(args, repeat=REPEAT):
+    # Fastest of a few runs, each in a fresh interpreter
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def bench_startup():
+    """Cold-start cost of the package and the CLI, each run in a new process.
+
+    'eager' imports everything the package used to load on import, for
+    comparison with the lazy imports.
+    """
+    qasm = os.path.abspath(os.path.join(QASM_DIR, "all_gates.qasm"))
+    directory = tempfile.mkdtemp()
+    cli = ["-m", "quantum_quirkvis.cli"]
+    layout = os.path.join(directory, "layout.qvl")
+    cache = ["--cache", os.path.join(directory, "cache")]
+    commands = [
+        ("python", ["-c", "pass"]),
+        ("import eager", ["-c", "import quantum_quirkvis as q, pyqasm.entrypoint, numpy; "
+                                "[getattr(q, name) for name in q.__all__]"]),
+        ("import", ["-c", "import quantum_quirkvis"]),
+        ("cli --help", cli + ["--help"]),
+        ("cli draw", cli + [qasm, "--no-server"]),
+        ("cli cache hit", cli + [qasm] + cache),
+        ("cli layout", cli + [layout, "--no-server"]),
+    ]
+    try:
+        subprocess.run([sys.executable] + cli + [qasm, "--save-layout", layout], check=True)
+        subprocess.run([sys.executable] + cli + [qasm] + cache, check=True, stdout=subprocess.DEVNULL)
+        print("Startup, fastest of 5 runs in a new interpreter")
+        print(f"{'command':>14} {'ms':>8}")
+        for name, args in commands:
+            print(f"{name:>14} {time_command(args) * 1e3:>8.1f}")
+    finally:
+        shutil.rmtree(directory)
+
+def bench_layout_cache():
+    """Re-skinning: one program drawn in each built-in theme, with and without a layout cache."""
+    print("Built-in themes in turn, 20000 gates on 20 qubits")
+    print(f"{'theme':>10} {'no cache s':>11} {'cached s':>9} {'scheduled':>10}")
+    program = random_circuit(20000, 20)
+    cache = MemoryCache(64 * 1024 * 1024, sizeof=layout_size)
+    for theme in BUILTIN_THEMES:
+        start = time.perf_counter()
+        SVGDrawer(theme, layout_cache=None).draw(program)
+        uncached = time.perf_counter() - start
+        profile = Profile()
+        start = time.perf_counter()
+        SVGDrawer(theme, layout_cache=cache, profile=profile).draw(program)
+        cached = time.perf_counter() - start
+        scheduled = "yes" if profile.counters.get("layout_cache_misses") else "no"
+        print(f"{theme:>10} {uncached:>11.3f} {cached:>9.3f} {scheduled:>10}")
+    print(json.dumps(cache.stats()))
+
+def bench_server():
+    """The CLI alone vs through a running render server (cli --serve).
+
+    The fastest of 5 runs through the server is an LRU hit, misses are
+    timed with a new program each run.
+    """
+    from quantum_quirkvis import client
+    qasm = os.path.abspath(os.path.join(QASM_DIR, "all_gates.qasm"))
+    directory = tempfile.mkdtemp()
+    address = os.path.join(directory, "server.sock")
+    cli = ["-m", "quantum_quirkvis.cli"]
+    server = subprocess.Popen([sys.executable] + cli + ["--serve", "--server", address, "-j", "1"],
+                              stderr=subprocess.DEVNULL)
+    try:
+        while not os.path.exists(address):
+            time.sleep(0.05)
+        print("Rendering all_gates.qasm, fastest of 5 runs")
+        print(f"{'command':>22} {'ms':>8}")
+        print(f"{'cli':>22} {time_command(cli + [qasm, '--no-server']) * 1e3:>8.1f}")
+        print(f"{'cli via server':>22} {time_command(cli + [qasm, '--server', address]) * 1e3:>8.1f}")
+        with open(qasm, encoding="utf-8") as f:
+            program = f.read()
+        for name, programs in (("client.render miss", [program + f"\n// {i}" for i in range(REPEAT)]),
+                               ("client.render hit", [program] * REPEAT)):
+            best = float("inf")
+            for source in programs:
+                start = time.perf_counter()
+                client.render(source, address=address)
+                best = min(best, time.perf_counter() - start)
+            print(f"{name:>22} {best * 1e3:>8.1f}")
+        print(json.dumps(client.server_stats(address)["cache"]))
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory)
+
+def bench_watch():
+    """Redraw time of --watch after editing a theme vs a circuit, 8 circuits in 2 themes."""
+    from quantum_quirkvis.watch import Watcher
+    directory = tempfile.mkdtemp()
+    theme = os.path.join(directory, "theme.json")
+    try:
+        for i in range(8):
+            with open(os.path.join(directory, f"c{i}.qasm"), "w") as f:
+                f.write(random_circuit(5000, 20, seed=i))
+        with open(theme, "w") as f:
+            json.dump({"styles": {"background": "#ffffff"}}, f)
+        watcher = Watcher([directory], ["night", theme], progress=None)
+        print(f"{'change':>14} {'seconds':>8} {'parses':>7} {'renders':>8}")
+        edits = [
+            ("first draw", None, None),
+            ("theme", theme, json.dumps({"styles": {"background": "#000000"}})),
+            ("one circuit", os.path.join(directory, "c0.qasm"), random_circuit(5000, 20, seed=100)),
+            ("touch only", theme, json.dumps({"styles": {"background": "#000000"}})),
+        ]
+        for name, path, content in edits:
+            if path:
+                with open(path, "w") as f:
+                    f.write(content)
+            parses, renders = watcher.parses, watcher.renders
+            start = time.perf_counter()
+            watcher.refresh()
+            print(f"{name:>14} {time.perf_counter() - start:>8.3f} {watcher.parses - parses:>7} "
+                  f"{watcher.renders - renders:>8}")
+    finally:
+        shutil.rmtree(directory)
+
+def measure(program, theme):
+    # Timings come from the fastest of a few profiled draws, memory from a traced run
+    seconds = None
+    for run in range(REPEAT):
+        profile = Profile()
+        svg = SVGDrawer(theme, profile=profile).draw(program)
+        timings = {stage: sum(profile.timings.get(phase, 0.0) for phase in phases)
+                   for stage, phases in STAGES.items()}
+        if seconds is None or sum(timings.values()) < sum(seconds.values()):
+            seconds = timings
+        if sum(timings.values()) * (run + 2) > REPEAT_BUDGET:
+            break
+
+    drawer = SVGDrawer(theme)
+    peak = {}
+    tracemalloc.start()
+    parsed = drawer.parse(program)
+    peak["parse"] = tracemalloc.get_traced_memory()[1]
+    held = reset_peak()
+    layout = drawer.layout(*parsed)
+    peak["layout"] = held + tracemalloc.get_traced_memory()[1]
+    held = reset_peak()
+    drawer.render(layout)
+    peak["render"] = held + tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "ops": profile.counters["ops"],
+        "seconds": seconds,
+        "total": sum(seconds.values()),
+        "peak": peak,
+        "bytes": len(svg.encode()),
+    }
+
+def suite_cases(quick=False):
+    for name, program in complex_programs():
+        for theme in BUILTIN_THEMES:
+            yield f"{name}/{theme}", program, theme
+    for family, (generator, sizes) in FAMILIES.items():
+        for args in sizes[:2] if quick else sizes:
+            yield f"{family}{args}", generator(*args), "default"
+
+def regressions(result, base, threshold):
+    found = []
+    if result["total"] > base["total"] * (1 + threshold) and result["total"] - base["total"] > MIN_DELTA:
+        found.append(f"time {result['total'] / base['total'] - 1:+.0%}")
+    peak, base_peak = max(result["peak"].values()), max(base["peak"].values())
+    if peak > base_peak * (1 + threshold) and peak - base_peak > MIN_MEMORY_DELTA:
+        found.append(f"memory {peak / base_peak - 1:+.0%}")
+    if result["bytes"] > base["bytes"] * (1 + threshold):
+        found.append(f"size {result['bytes'] / base['bytes'] - 1:+.0%}")
+    return found
+
+def bench_suite(baseline=BASELINE, save=False, threshold=THRESHOLD, quick=False):
+    """Every complex sample in every theme plus the generated circuits.
+
+    Compares against the stored baseline and returns the regressing cases,
+    save=True replaces the baseline instead.
+    """
+    stored = {}
+    if os.path.exists(baseline) and not save:
+        with open(baseline) as f:
+            stored = json.load(f)["cases"]
+    print(f"Benchmark suite, regressions beyond {threshold:.0%} of {os.path.basename(baseline)}")
+    print(f"{'case':>24} {'ops':>7} {'parse ms':>9} {'layout ms':>10} {'render ms':>10} {'ops/s':>9} "
+          f"{'peak MB':>8} {'out KB':>8} {'vs base':>8}")
+    logging.disable(logging.CRITICAL)
+    results, failed = {}, []
+    for key, program, theme in suite_cases(quick):
+        try:
+            result = measure(program, theme)
+        except Exception:
+            # pyqasm rejects some of the samples
+            continue
+        results[key] = result
+        seconds = result["seconds"]
+        base = stored.get(key)
+        change = f"{result['total'] / base['total'] - 1:+.0%}" if base and base["total"] else "new"
+        print(f"{key:>24} {result['ops']:>7} {seconds['parse'] * 1e3:>9.1f} {seconds['layout'] * 1e3:>10.1f} "
+              f"{seconds['render'] * 1e3:>10.1f} {result['ops'] / result['total']:>9.0f} "
+              f"{max(result['peak'].values()) / 1e6:>8.1f} {result['bytes'] / 1e3:>8.1f} {change:>8}")
+        found = regressions(result, base, threshold) if base else []
+        if found:
+            failed.append((key, found))
+    logging.disable(logging.NOTSET)
+
+    if save:
+        with open(baseline, "w") as f:
+            json.dump({"threshold": threshold, "cases": results}, f, indent=1, sort_keys=True)
+        print(f"Saved {len(results)} cases to {baseline}")
+    for key, found in failed:
+        print(f"REGRESSION {key}: {', '.join(found)}")
+    return failed
+
+BENCHMARKS = {
+    "scheduling": bench_scheduling,
+    "folding": bench_folding,
+    "streaming": bench_streaming,
+    "symbols": bench_symbols,
+    "many_themes": bench_many_themes,
+    "cache": bench_cache,
+    "flat_parser": bench_flat_parser,
+    "layout_io": bench_layout_io,
+    "incremental": bench_incremental,
+    "unrolled": bench_unrolled,
+    "compact": bench_compact,
+    "layout_cache": bench_layout_cache,
+    "startup": bench_startup,
+    "async": bench_async,
+    "server": bench_server,
+    "watch": bench_watch,
+    "suite": bench_suite,
+}
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="quantum_quirkvis benchmarks, run from the tests directory")
+    p.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    p.add_argument("--baseline", default=BASELINE, help="Stored suite results to compare with")
+    p.add_argument("--save-baseline", action="store_true", help="Store the suite results as the new baseline")
+    p.add_argument("--threshold", type=float, default=THRESHOLD, help="Relative slowdown, memory or size growth reported as a regression")
+    p.add_argument("--quick", action="store_true", help="Suite without the largest generated circuits")
+    args = p.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        p.error(f"unknown benchmark {', '.join(unknown)}")
+    failed = False
+    # Every benchmark parses and schedules each draw, but layout_cache
+    LAYOUT_CACHE.max_bytes = 0
+    for name in args.names or BENCHMARKS:
+        if name == "suite":
+            failed = bool(bench_suite(args.baseline, args.save_baseline, args.threshold, args.quick))
+        else:
+            BENCHMARKS[name]()
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,117 @@
+"""QASM generators for the benchmark suite, from a handful of gates to ~10^5."""
+import math
+import random
+
+HEADER = ["OPENQASM 3.0;", 'include "stdgates.inc";']
+
+
+def ghz(n_qubits):
+    lines = HEADER + [f"qubit[{n_qubits}] q;", f"bit[{n_qubits}] c;", "h q[0];"]
+    lines += [f"cx q[{i}], q[{i + 1}];" for i in range(n_qubits - 1)]
+    lines.append("c = measure q;")
+    return "\n".join(lines)
+
+
+def qft(n_qubits):
+    # Controlled phases as rz/cx, so the flat parser takes it like unrolled QASM
+    lines = HEADER + [f"qubit[{n_qubits}] q;", f"bit[{n_qubits}] c;"]
+    for j in range(n_qubits):
+        lines.append(f"h q[{j}];")
+        for k in range(j + 1, n_qubits):
+            angle = math.pi / 2 ** (k - j)
+            lines += [
+                f"rz({angle / 2}) q[{k}];",
+                f"cx q[{k}], q[{j}];",
+                f"rz({-angle / 2}) q[{j}];",
+                f"cx q[{k}], q[{j}];",
+                f"rz({angle / 2}) q[{j}];",
+            ]
+    for j in range(n_qubits // 2):
+        lines.append(f"swap q[{j}], q[{n_qubits - 1 - j}];")
+    lines.append("c = measure q;")
+    return "\n".join(lines)
+
+
+def random_circuit(n_gates, n_qubits, seed=0):
+    rnd = random.Random(seed)
+    lines = HEADER + [f"qubit[{n_qubits}] q;", f"bit[{n_qubits}] c;"]
+    for _ in range(n_gates):
+        r = rnd.random()
+        a, b = rnd.sample(range(n_qubits), 2)
+        if r < 0.4:
+            lines.append(f"h q[{a}];")
+        elif r < 0.6:
+            lines.append(f"rz({rnd.uniform(-3, 3):.4f}) q[{a}];")
+        else:
+            lines.append(f"cx q[{a}], q[{b}];")
+    lines.append("c = measure q;")
+    return "\n".join(lines)
+
+
+def brickwork(n_qubits, layers, seed=0):
+    # Random single-qubit rotations, then cz on alternating neighbour pairs
+    rnd = random.Random(seed)
+    lines = HEADER + [f"qubit[{n_qubits}] q;", f"bit[{n_qubits}] c;"]
+    for layer in range(layers):
+        for i in range(n_qubits):
+            lines.append(f"{rnd.choice(('rx', 'ry', 'rz'))}({rnd.uniform(-3, 3):.4f}) q[{i}];")
+        lines += [f"cz q[{i}], q[{i + 1}];" for i in range(layer % 2, n_qubits - 1, 2)]
+    lines.append("c = measure q;")
+    return "\n".join(lines)
+
+
+def surface_code(distance, rounds):
+    """Syndrome extraction rounds of a rotated surface code.
+
+    distance^2 data qubits and distance^2 - 1 ancillas in one register, each
+    row of checks placed between the data rows it reads, as on a device.
+    X ancillas are wrapped in h, every ancilla is measured each round.
+    """
+    d = distance
+    checks = []
+    for i in range(d + 1):
+        for j in range(d + 1):
+            x_type = (i + j) % 2 == 0
+            # Weight-2 checks only on the boundaries of their own type
+            if i in (0, d) and (not x_type or j in (0, d)):
+                continue
+            if j in (0, d) and (x_type or i in (0, d)):
+                continue
+            checks.append((i, j, x_type))
+
+    # Row by row: the checks of row i, then data row i
+    index, data = {}, {}
+    for i in range(d + 1):
+        for check in checks:
+            if check[0] == i:
+                index[check] = len(index)
+        if i < d:
+            for j in range(d):
+                data[(i, j)] = index[(i, j)] = len(index)
+
+    ancillas = []
+    for i, j, x_type in checks:
+        neighbours = [data[p] for p in ((i - 1, j - 1), (i - 1, j), (i, j - 1), (i, j)) if p in data]
+        ancillas.append((index[(i, j, x_type)], x_type, neighbours))
+
+    lines = HEADER + [f"qubit[{len(index)}] q;", f"bit[{len(ancillas)}] syndrome;"]
+    for _ in range(rounds):
+        lines += [f"h q[{a}];" for a, x_type, _ in ancillas if x_type]
+        for step in range(4):
+            for a, x_type, neighbours in ancillas:
+                if step < len(neighbours):
+                    n = neighbours[step]
+                    lines.append(f"cx q[{a}], q[{n}];" if x_type else f"cx q[{n}], q[{a}];")
+        lines += [f"h q[{a}];" for a, x_type, _ in ancillas if x_type]
+        lines += [f"syndrome[{k}] = measure q[{a}];" for k, (a, _, _) in enumerate(ancillas)]
+    return "\n".join(lines)
+
+
+# name -> (generator, argument tuples from small to large)
+FAMILIES = {
+    "ghz": (ghz, [(2,), (100,), (2000,)]),
+    "qft": (qft, [(4,), (16,), (64,)]),
+    "random": (random_circuit, [(10, 2), (1000, 20), (100000, 8)]),
+    "brickwork": (brickwork, [(10, 4), (100, 20), (1000, 50)]),
+    "surface": (surface_code, [(3, 2), (9, 5), (15, 10)]),
+}
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+import pytest
+from quantum_quirkvis import AsyncRenderer, aio, draw
+
+PROGRAM = 'OPENQASM 3.0;\ninclude "stdgates.inc";\nqubit[2] q;\nh q[0];\ncx q[0], q[1];\n'
+
+
+class Worker:
+    """Stands in for render_job, renders block until release()."""
+
+    def __init__(self, seconds=None):
+        self.seconds = seconds
+        self.started = []
+        self.running = 0
+        self.most = 0
+        self._gate = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, job):
+        with self._lock:
+            self.started.append(job[0])
+            self.running += 1
+            self.most = max(self.most, self.running)
+        if self.seconds is None:
+            self._gate.wait(5)
+        else:
+            time.sleep(self.seconds)
+        with self._lock:
+            self.running -= 1
+        return "svg of " + job[0]
+
+    def release(self):
+        self._gate.set()
+
+
+async def _until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("timed out waiting")
+
+
+def test_renders_on_threads():
+    async def main():
+        async with AsyncRenderer("thread", max_workers=2) as renderer:
+            return await renderer.draw(PROGRAM, theme="night")
+    assert asyncio.run(main()) == draw(PROGRAM, theme="night")
+
+
+def test_identical_requests_share_a_render(monkeypatch):
+    worker = Worker()
+    monkeypatch.setattr(aio, "render_job", worker)
+
+    async def main():
+        renderer = AsyncRenderer("thread", max_workers=4)
+        requests = [PROGRAM, PROGRAM + "\n\n", PROGRAM.replace("\n", "  \n"), PROGRAM + "x q[1];"]
+        tasks = [asyncio.ensure_future(renderer.draw(p)) for p in requests]
+        await _until(lambda: len(worker.started) == 2)
+        worker.release()
+        results = await asyncio.gather(*tasks)
+        renderer.close()
+        return results, renderer.stats()
+    results, stats = asyncio.run(main())
+    assert results == ["svg of " + PROGRAM] * 3 + ["svg of " + PROGRAM + "x q[1];"]
+    assert sorted(worker.started) == [PROGRAM, PROGRAM + "x q[1];"]
+    assert stats == {"renders": 2, "coalesced": 2, "timeouts": 0, "cancelled": 0, "in_flight": 0}
+
+
+def test_limit_bounds_the_renders_running_at_once(monkeypatch):
+    worker = Worker(seconds=0.05)
+    monkeypatch.setattr(aio, "render_job", worker)
+
+    async def main():
+        renderer = AsyncRenderer("thread", max_workers=8, limit=2)
+        results = await asyncio.gather(*(renderer.draw(f"{PROGRAM}// {i}") for i in range(6)))
+        renderer.close()
+        return results
+    assert len(set(asyncio.run(main()))) == 6
+    assert worker.most == 2 and len(worker.started) == 6
+
+
+def test_timeout(monkeypatch):
+    worker = Worker()
+    monkeypatch.setattr(aio, "render_job", worker)
+
+    async def main():
+        renderer = AsyncRenderer("thread", max_workers=2, timeout=5)
+        with pytest.raises(asyncio.TimeoutError):
+            await renderer.draw(PROGRAM, timeout=0.05)
+        assert renderer.stats()["timeouts"] == 1 and renderer.stats()["in_flight"] == 0
+        # The started render isn't coalesced with anymore, a new request renders again
+        task = asyncio.ensure_future(renderer.draw(PROGRAM))
+        await _until(lambda: len(worker.started) == 2)
+        worker.release()
+        assert await task == "svg of " + PROGRAM
+        renderer.close()
+    asyncio.run(main())
+
+
+def test_cancelled_request_waiting_for_a_slot_is_never_rendered(monkeypatch):
+    worker = Worker()
+    monkeypatch.setattr(aio, "render_job", worker)
+
+    async def main():
+        renderer = AsyncRenderer("thread", max_workers=2, limit=1)
+        first = asyncio.ensure_future(renderer.draw(PROGRAM))
+        await _until(lambda: worker.started)
+        waiting = asyncio.ensure_future(renderer.draw(PROGRAM + "x q[1];"))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        worker.release()
+        assert await first == "svg of " + PROGRAM
+        # The freed slot goes to the next request
+        assert await renderer.draw(PROGRAM + "z q[0];") == "svg of " + PROGRAM + "z q[0];"
+        renderer.close()
+        return renderer.stats()
+    stats = asyncio.run(main())
+    assert worker.started == [PROGRAM, PROGRAM + "z q[0];"]
+    assert stats["cancelled"] == 1 and stats["renders"] == 2 and stats["in_flight"] == 0
+
+
+def test_themes_are_compiled_off_the_event_loop(monkeypatch):
+    threads = []
+    compile_theme = aio.compile_theme
+
+    def compile_and_record(theme):
+        threads.append(threading.current_thread())
+        return compile_theme(theme)
+    monkeypatch.setattr(aio, "compile_theme", compile_and_record)
+    monkeypatch.setattr(aio, "render_job", Worker(seconds=0))
+
+    async def main():
+        renderer = AsyncRenderer("thread", max_workers=1)
+        await renderer.draw(PROGRAM, theme="night")
+        renderer.close()
+    asyncio.run(main())
+    assert threads and threading.main_thread() not in threads
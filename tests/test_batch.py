@@ -0,0 +1,46 @@
+import os
+import pytest
+from quantum_quirkvis.batch import expand_inputs, output_paths, output_template, render_batch
+
+PROGRAM = 'OPENQASM 3.0;\ninclude "stdgates.inc";\nqubit[2] q;\nh q[0];\ncx q[0], q[1];\n'
+
+
+def _inputs(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(PROGRAM)
+        paths.append(str(path))
+    return paths
+
+
+def test_same_names_in_one_output_directory_collide(tmp_path):
+    inputs = _inputs(tmp_path, "x/bell.qasm", "y/bell.qasm")
+    out = str(tmp_path / "svg") + os.sep
+    with pytest.raises(ValueError, match="both be drawn"):
+        render_batch(inputs, output=out, jobs=1, progress=None)
+    assert not (tmp_path / "svg").exists()
+
+
+def test_single_file_output_takes_a_single_input(tmp_path):
+    inputs = _inputs(tmp_path, "a.qasm", "b.qasm")
+    with pytest.raises(ValueError, match="single file"):
+        render_batch(inputs, output=str(tmp_path / "out.svg"), jobs=1, progress=None)
+    results = render_batch(inputs[:1], output=str(tmp_path / "out.svg"), jobs=1, progress=None)
+    assert results[0][1:3] == ([str(tmp_path / "out.svg")], None)
+
+
+def test_themes_and_inputs_get_their_own_outputs(tmp_path):
+    inputs = _inputs(tmp_path, "x/bell.qasm", "y/bell.qasm", "x/ghz.qasm")
+    themes = ["default", "night"]
+    outputs = output_paths(inputs, themes, output_template(None, themes))
+    assert outputs[inputs[0]] == [str(tmp_path / "x" / "bell_default.svg"), str(tmp_path / "x" / "bell_night.svg")]
+    assert len({out for paths in outputs.values() for out in paths}) == 6
+
+
+def test_existing_file_named_like_a_glob(tmp_path):
+    [path] = _inputs(tmp_path, "ghz[3].qasm")
+    _inputs(tmp_path, "ghz3.qasm")
+    assert expand_inputs([path]) == [path]
+    assert expand_inputs([str(tmp_path / "ghz[3].qasm").replace("[3]", "[0-9]")]) == [str(tmp_path / "ghz3.qasm")]
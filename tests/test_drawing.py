@@ -0,0 +1,42 @@
+import glob
+import os
+import pytest
+from quantum_quirkvis import draw, draw_many
+from quantum_quirkvis.drawer import SVGDrawer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+QASMS = sorted(glob.glob(os.path.join(HERE, "qasms", "*.qasm")))
+THEMES = ["default", "night", "emoji", "matrix"]
+
+
+def _read(path):
+    with open(path) as f:
+        source = f.read()
+    return source if "OPENQASM" in source else "OPENQASM 3.0;\n" + source
+
+
+@pytest.mark.parametrize("theme", THEMES)
+@pytest.mark.parametrize("path", QASMS, ids=os.path.basename)
+def test_output_matches_the_goldens(path, theme):
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(os.path.join(HERE, "outputs", f"{name}_{theme}.svg")) as f:
+        golden = f.read()
+    assert draw(_read(path), theme=theme) == golden
+    assert SVGDrawer(theme, fast_parse=False, layout_cache=None).draw(_read(path)) == golden
+    assert draw_many(_read(path), ["default", theme])[1] == golden
+
+
+def test_unevaluated_arguments_of_controlled_gates_raise():
+    from openqasm3 import ast
+    drawer = SVGDrawer(layout_cache=None)
+    qubits = [ast.IndexedIdentifier(ast.Identifier("q"), [[ast.IntegerLiteral(i)]]) for i in range(2)]
+    line_nums = {("q", 0): 0, ("q", 1): 1}
+
+    def resolve(name, *qubits):
+        gate = ast.QuantumGate([], ast.Identifier(name), [ast.FloatLiteral(0.5), ast.Identifier("theta")], list(qubits))
+        return drawer._resolve([gate], line_nums, ["q"])
+    # As before parameters were evaluated up front: dropped for gates, raised for controlled targets
+    assert resolve("rz", qubits[0])[0].params == [0.5]
+    assert resolve("rzz", *qubits)[0].params == [0.5]
+    with pytest.raises(Exception):
+        resolve("crz", *qubits)
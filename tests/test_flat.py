@@ -0,0 +1,74 @@
+import glob
+import os
+import pytest
+from quantum_quirkvis.drawer import SVGDrawer
+from quantum_quirkvis.flat import parse_flat
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = sorted(glob.glob(os.path.join(HERE, "qasms*", "*.qasm")))
+
+HEADER = """OPENQASM 3.0;
+include "stdgates.inc";
+qubit[3] a;
+qubit[3] b;
+qubit[2] c;
+qubit d;
+bit[3] m;
+"""
+# Register operands, which pyqasm doesn't broadcast element by element for multi-qubit gates
+BROADCASTS = [
+    "h a;",
+    "rz(pi / 4) b;",
+    "cx a, b;",
+    "cx a[0], b;",
+    "cx a, b[1];",
+    "swap a, b;",
+    "cz d, c[1];",
+    "ccx a, b, c[0];",
+    "cx a, a[0];",
+    "m = measure a;",
+    "measure b -> m;",
+    "barrier a, d;",
+]
+# Valid for the flat parser's patterns, rejected by pyqasm
+INVALID = [
+    "qubit[2] pi;",
+    "qubit[2] tau;",
+    "qubit[2] measure;",
+    "qubit[2] euler;",
+    "bit[2] pi;",
+    "qreg reset[2];",
+    "creg true[1];",
+    'include "stdgates.inc";',
+]
+
+
+def _read(path):
+    with open(path) as f:
+        source = f.read()
+    return source if "OPENQASM" in source else "OPENQASM 3.0;\n" + source
+
+
+def _draw(source, fast_parse):
+    try:
+        return SVGDrawer(fast_parse=fast_parse, layout_cache=None).draw(source)
+    except Exception as e:
+        return type(e).__name__
+
+
+@pytest.mark.parametrize("source", [_read(path) for path in CORPUS] + [HEADER + b + "\n" for b in BROADCASTS + INVALID],
+                         ids=[os.path.basename(path) for path in CORPUS] + BROADCASTS + INVALID)
+def test_flat_parser_draws_as_pyqasm(source):
+    assert _draw(source, True) == _draw(source, False)
+
+
+def test_multi_qubit_broadcasts_go_to_pyqasm():
+    assert parse_flat(HEADER + "h a;\ncx d, c[0];\n") is not None
+    for body in ("cx a, b;", "cx a[0], b;", "swap d, c;"):
+        assert parse_flat(HEADER + body + "\n") is None
+
+
+@pytest.mark.parametrize("body", INVALID)
+def test_programs_pyqasm_rejects_go_to_pyqasm(body):
+    assert parse_flat(HEADER) is not None
+    assert parse_flat(HEADER + body + "\n") is None
@@ -0,0 +1,61 @@
+import glob
+import os
+import pytest
+from quantum_quirkvis import compute_layout, draw
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEADER = 'OPENQASM 3.0;\ninclude "stdgates.inc";\n'
+CASES = {
+    "undeclared gate operand": "gate g a { h a; }\ng r[0];\n",
+    "undeclared loop operand": "qubit[2] q;\nfor int i in [0:1] { h r[i]; }\n",
+    "classical loop": "qubit[1] q;\nint x = 0;\nfor int i in [0:3] { x += i; }\nh q[0];\n",
+    "alias": "qubit[2] q;\nlet a = q[0];\ngate g b { h b; }\ng a;\n",
+    "loop and gate": "qubit[3] q;\ngate g a, b { h a; cx a, b; }\nfor int i in [0:9] { g q[0], q[1]; }\ng q[1], q[2];\n",
+}
+
+
+def _outcome(source, fold):
+    try:
+        draw(source, fold=fold)
+    except Exception as e:
+        return type(e).__name__
+    return "ok"
+
+
+def _read(path):
+    with open(path) as f:
+        source = f.read()
+    return source if "OPENQASM" in source else "OPENQASM 3.0;\n" + source
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_fold_accepts_the_programs_unfolded_drawing_accepts(name):
+    source = HEADER + CASES[name]
+    assert _outcome(source, True) == _outcome(source, False)
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(HERE, "qasms*", "*.qasm"))), ids=os.path.basename)
+def test_fold_never_fails_where_unfolded_drawing_works(path):
+    source = _read(path)
+    if _outcome(source, False) == "ok":
+        assert _outcome(source, True) == "ok"
+
+
+def test_loops_and_gate_calls_are_drawn_once():
+    source = HEADER + CASES["loop and gate"]
+    layout = compute_layout(source, fold=True)
+    assert layout.blocks == {"__fold0": ("for", "×10"), "__fold1": ("g", None)}
+    assert [[(op.kind, op.name, op.lines) for op in moment] for moment in layout.moments] == [
+        [("block", "__fold0", (0, 1))], [("block", "__fold1", (1, 2))]]
+    # Unfolded: 10 iterations and one call of two gates each
+    assert sum(len(moment) for moment in compute_layout(source).moments) == 22
+
+
+def test_loops_pyqasm_cant_unroll_are_folded():
+    source = HEADER + ("qubit[2] q;\nbit[2] c;\nwhile (c[0] == 0) { h q[0]; c[0] = measure q[0]; }\n"
+                       "for int i in [0:99999] { x q[1]; }\n")
+    layout = compute_layout(source, fold=True)
+    assert sorted(layout.blocks.values()) == [("for", "×100000"), ("while", "c[0] == 0")]
+    assert layout.n_moments == 1
+    svg = draw(source, fold=True)
+    assert "×100000" in svg and "while" in svg
@@ -0,0 +1,31 @@
+import pytest
+from quantum_quirkvis import IncrementalDrawer
+from quantum_quirkvis.drawer import SVGDrawer
+
+THEMES = ["default", "night", "emoji", "matrix"]
+HEADER = 'OPENQASM 3.0;\ninclude "stdgates.inc";\nqubit[4] q;\nbit[4] c;\n'
+# Chunk, drawn again from scratch
+CHUNKS = [("h q[0];", False), ("cx q[0], q[1];", False), ("rz(pi / 3) q[2]; barrier q;", False),
+          ("c[1] = measure q[1];", False), ("swap q[2], q[3]; h q;", False), ("qubit r;", True),
+          ("cz q[3], r;", False), ("for int i in [0:1] { x q[i]; }", True),
+          ("ccx q[0], q[1], q[2];", False), ("measure q[3] -> c[3];", False)]
+
+
+@pytest.mark.parametrize("theme", THEMES)
+def test_incremental_matches_full_draw(theme):
+    incremental = IncrementalDrawer(HEADER, theme=theme)
+    for chunk, full in CHUNKS:
+        assert incremental.append(chunk).full == full
+        assert incremental.svg() == SVGDrawer(theme, layout_cache=None).draw(incremental.source)
+
+
+def test_update_markup_extends_the_document():
+    incremental = IncrementalDrawer(HEADER)
+    svg = incremental.svg()
+    update = incremental.append("h q[0]; cx q[1], q[2];")
+    assert not update.full and update.wires is not None and update.lines
+    assert update.shapes in incremental.svg() and update.shapes not in svg
+    # Fits in the first moment, the canvas doesn't grow
+    width = update.width
+    update = incremental.append("h q[3];")
+    assert update.wires is None and update.width == width and update.shapes
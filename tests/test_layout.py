@@ -0,0 +1,45 @@
+import glob
+import json
+import os
+import pytest
+from quantum_quirkvis import Layout, compute_layout, draw
+from quantum_quirkvis.drawer import SVGDrawer
+from circuits import random_circuit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS = sorted(glob.glob(os.path.join(HERE, "qasms", "*.qasm")) + glob.glob(os.path.join(HERE, "qasms_complex", "*.qasm")))
+
+
+def _read(path):
+    with open(path) as f:
+        source = f.read()
+    return source if "OPENQASM" in source else "OPENQASM 3.0;\n" + source
+
+
+def _drawable(paths, fold=False):
+    # Complex programs pyqasm or the drawer can't handle are left out
+    sources = []
+    for path in paths:
+        try:
+            draw(_read(path), fold=fold)
+        except Exception:
+            continue
+        sources.append(_read(path))
+    return sources
+
+
+@pytest.mark.parametrize("fold", [False, True])
+@pytest.mark.parametrize("theme", ["default", "emoji"])
+def test_layout_round_trips(theme, fold, tmp_path):
+    for source in _drawable(CORPUS, fold) + [random_circuit(500, 10)]:
+        drawer = SVGDrawer(theme, fold=fold, layout_cache=None)
+        layout = compute_layout(source, theme=theme, fold=fold)
+        svg = drawer.render(layout)
+        assert svg == draw(source, theme=theme, fold=fold)
+        assert drawer.render(Layout.from_bytes(layout.to_bytes())) == svg
+        assert drawer.render(Layout.from_dict(json.loads(json.dumps(layout.to_dict())))) == svg
+        for name in ("layout.json", "layout.qvl"):
+            layout.save(str(tmp_path / name))
+            assert drawer.render(Layout.load(str(tmp_path / name))) == svg
+        page = layout.page(1, 3)
+        assert drawer.render(Layout.from_bytes(page.to_bytes())) == drawer.render(page)
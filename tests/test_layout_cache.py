@@ -0,0 +1,38 @@
+from quantum_quirkvis import compute_layout, draw
+from quantum_quirkvis.cache import MemoryCache
+from quantum_quirkvis.drawer import SVGDrawer, layout_size
+
+PROGRAM = """OPENQASM 3.0;
+include "stdgates.inc";
+qubit[3] q;
+bit[3] c;
+h q[0];
+cx q[0], q[1];
+rz(0.5) q[2];
+c = measure q;
+"""
+
+
+def test_returned_layouts_dont_change_the_cache():
+    svg = draw(PROGRAM)
+    layout = compute_layout(PROGRAM)
+    layout.moments[0][0].lines = (2,)
+    layout.moments[1][0].params.append(1.0)
+    layout.moments.pop()
+    layout.line_nums.clear()
+    assert draw(PROGRAM) == svg
+    assert compute_layout(PROGRAM).to_dict() != layout.to_dict()
+
+
+def test_layout_cache_is_shared_across_themes():
+    cache = MemoryCache(1 << 20, sizeof=layout_size)
+    for theme in ("default", "night", "matrix"):
+        assert SVGDrawer(theme, layout_cache=cache).draw(PROGRAM) == draw(PROGRAM, theme=theme)
+    assert (cache.misses, cache.hits) == (1, 2)
+
+
+def test_layout_cache_can_be_turned_off():
+    cache = MemoryCache(0, sizeof=layout_size)
+    SVGDrawer(layout_cache=cache).draw(PROGRAM)
+    SVGDrawer(layout_cache=cache).draw(PROGRAM)
+    assert len(cache) == 0 and cache.hits == 0
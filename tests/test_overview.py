@@ -0,0 +1,56 @@
+import bisect
+import re
+import pytest
+from quantum_quirkvis import compute_layout, draw_overview
+from quantum_quirkvis.layout import Op
+from quantum_quirkvis.overview import CATEGORIES, density_grid
+from circuits import random_circuit
+
+PROGRAM = random_circuit(400, 12, seed=3)
+
+
+def _cells(layout):
+    # (moment, line, category) of every counted operation, one per line it touches
+    for m, moment in enumerate(layout.moments):
+        for op in moment:
+            if op.kind == Op.BARRIER:
+                continue
+            category = {Op.MEASURE: 'measure', Op.BLOCK: 'block'}.get(
+                op.kind, 'multi' if len(op.lines) > 1 else 'single')
+            for line in op.lines:
+                yield m, line, category
+
+
+@pytest.mark.parametrize("columns, rows", [(1, 1), (7, 5), (50, 12), (1000, 100)])
+def test_cells_count_the_operations_they_cover(columns, rows):
+    layout = compute_layout(PROGRAM)
+    cells = list(_cells(layout))
+    # Cells cover equal shares of the moments and lines
+    col_edges = [c * layout.n_moments / columns for c in range(columns + 1)]
+    row_edges = [r * layout.n_lines / rows for r in range(rows + 1)]
+
+    def expected(categories):
+        grid = [[0] * columns for _ in range(rows)]
+        for m, line, category in cells:
+            if category in categories:
+                c = bisect.bisect_right(col_edges, m) - 1
+                r = bisect.bisect_right(row_edges, line) - 1
+                grid[r][c] += 1
+        return grid
+
+    assert density_grid(layout, columns, rows) == (expected(CATEGORIES),)
+    assert density_grid(layout, columns, rows, 'two_qubit') == (expected({'multi'}),)
+    assert density_grid(layout, columns, rows, 'measurements') == (expected({'measure'}),)
+    assert density_grid(layout, columns, rows, 'mix') == tuple(expected({c}) for c in CATEGORIES)
+
+
+def test_overview_caption_and_size():
+    layout = compute_layout(PROGRAM)
+    svg = draw_overview(PROGRAM, columns=40, rows=6, cell=2)
+    peak = max(max(row) for row in density_grid(layout, 40, 6)[0])
+    caption = re.search(r"<text[^>]*>([^<]*)</text>", svg).group(1)
+    assert caption == (f"{layout.n_moments} moments × {layout.n_lines} lines, gates per "
+                       f"{-(-layout.n_moments // 40)}×{-(-layout.n_lines // 6)} cell, max {peak}")
+    assert f'width="{40 * 2}" height="{6 * 2}"' in svg
+    with pytest.raises(ValueError):
+        draw_overview(PROGRAM, metric="depth")
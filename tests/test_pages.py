@@ -0,0 +1,45 @@
+import os
+import re
+import pytest
+from quantum_quirkvis import draw, draw_pages
+
+PROGRAM = 'OPENQASM 3.0;\ninclude "stdgates.inc";\nqubit[2] q;\n' + "h q[0];\n" * 25
+
+
+def _markers(svg):
+    # x of the dashed continuation lines, default theme
+    return [float(x) for x in re.findall(r'<line x1="([\d.]+)"[^>]*stroke-dasharray="8,6"', svg)]
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_pages_split_the_moments_and_mark_the_cuts(tmp_path, jobs):
+    paths = draw_pages(PROGRAM, filename=str(tmp_path / "bell.svg"), moments_per_page=10, jobs=jobs)
+    assert paths == [str(tmp_path / f"bell_{i}.svg") for i in (1, 2, 3)]
+    pages = [_read(path) for path in paths]
+    assert [page.count(">H<") for page in pages] == [10, 10, 5]
+    assert _markers(draw(PROGRAM)) == []
+
+    left = min(_markers(pages[1]))
+    right = max(_markers(pages[1]))
+    assert _markers(pages[0]) == [right]
+    assert _markers(pages[1]) == [left, right]
+    assert _markers(pages[2]) == [left]
+    # The wire labels are repeated on every page
+    label = re.search(r"<text[^>]*>([^<]*)</text>", pages[0]).group(1)
+    assert all(label in page for page in pages)
+
+
+def test_page_numbers_and_index(tmp_path):
+    paths = draw_pages(PROGRAM, filename=str(tmp_path / "out" / "p{page}.svg"), moments_per_page=2, jobs=1,
+                       index=str(tmp_path / "index.html"))
+    assert [os.path.basename(path) for path in paths] == [f"p{i:02d}.svg" for i in range(1, 14)]
+    index = _read(tmp_path / "index.html")
+    assert re.findall(r'<img src="([^"]+)"', index) == [f"out/p{i:02d}.svg" for i in range(1, 14)]
+
+    with pytest.raises(ValueError):
+        draw_pages(PROGRAM, filename=str(tmp_path / "x.svg"), moments_per_page=0)
@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+from quantum_quirkvis import Profile, compute_layout, draw, draw_many
+from quantum_quirkvis.drawer import SVGDrawer
+from quantum_quirkvis.profiling import PHASES
+
+PROGRAM = """OPENQASM 3.0;
+include "stdgates.inc";
+qubit[3] q;
+bit[3] c;
+h q[0];
+cx q[0], q[1];
+barrier q;
+c = measure q;
+"""
+
+
+def test_phases_and_counters_of_a_draw():
+    profile = Profile()
+    svg = SVGDrawer(profile=profile, layout_cache=None).draw(PROGRAM)
+    report = profile.to_dict()
+    # Every phase ran, reported in pipeline order; unroll is part of parse for flat programs
+    assert list(report["timings"]) == [phase for phase in PHASES if phase != "unroll"]
+    assert all(t >= 0 for t in report["timings"].values())
+    assert report["total"] == sum(report["timings"].values())
+
+    layout = compute_layout(PROGRAM)
+    counters = report["counters"]
+    assert counters["statements"] == 8 and counters["ops"] == 6 and counters["lines"] == layout.n_lines
+    assert counters["moments"] == layout.n_moments and counters["draws"] == 1
+    assert counters["elements"] == svg.count("<") - svg.count("</")
+    assert counters["bytes"] == len(svg.encode("utf-8"))
+
+
+def test_counters_add_up_over_draws():
+    reports = []
+    profile = Profile(callback=lambda p: reports.append(dict(p.counters)))
+    svg = draw(PROGRAM, profile=profile)
+    draw(PROGRAM, profile=profile)
+    assert [r["draws"] for r in reports] == [1, 2]
+    assert reports[1]["bytes"] == 2 * len(svg.encode("utf-8"))
+
+    # draw_many is one draw of every theme
+    profile = Profile()
+    svgs = draw_many(PROGRAM, ["default", "night"], profile=profile)
+    assert profile.counters["draws"] == 1
+    assert profile.counters["bytes"] == sum(len(s.encode("utf-8")) for s in svgs)
+
+
+def test_cprofile_stats():
+    profile = Profile(cprofile=True)
+    draw(PROGRAM, profile=profile)
+    assert "function calls" in profile.stats()
+    assert Profile().stats() == ""
+
+
+def test_cli_profile_report(tmp_path):
+    (tmp_path / "c.qasm").write_text(PROGRAM)
+    result = subprocess.run([sys.executable, "-m", "quantum_quirkvis.cli", str(tmp_path / "c.qasm"), "--profile"],
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.startswith("<svg")
+    report = json.loads(result.stderr)
+    assert set(report) == {"timings", "total", "counters"}
+    assert set(report["timings"]) <= set(PHASES) and report["timings"]
+    assert report["counters"]["draws"] == 1 and report["counters"]["ops"] == 6
@@ -0,0 +1,70 @@
+import os
+import pytest
+from quantum_quirkvis import draw
+from quantum_quirkvis.cache import RenderCache
+
+SVG = "<svg>" + "x" * 95 + "</svg>"
+
+
+def _age(cache, key, seconds):
+    # mtime decides the eviction order, don't depend on the clock's resolution
+    os.utime(cache._path(key), ns=(seconds * 10**9, seconds * 10**9))
+
+
+def _files(cache):
+    return sorted(os.path.basename(path) for _, path, _ in cache._entries())
+
+
+def test_overwriting_an_entry_counts_it_once(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=1000)
+    for _ in range(20):
+        cache.put("aa1", SVG)
+    assert cache.size == len(SVG) and cache.evictions == 0
+    cache.put("aa1", SVG[:50])
+    assert cache.size == 50
+    assert RenderCache(str(tmp_path)).size == cache.size
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path):
+    cache = RenderCache(str(tmp_path), max_bytes=3 * len(SVG))
+    for i, key in enumerate(("aa1", "bb2", "cc3")):
+        cache.put(key, SVG)
+        _age(cache, key, 1000 + i)
+    # A hit makes the oldest entry the most recently used
+    assert cache.get("aa1") == SVG
+    cache.put("dd4", SVG)
+    assert _files(cache) == ["aa1.svg", "cc3.svg", "dd4.svg"]
+    assert cache.evictions == 1 and cache.size <= cache.max_bytes
+
+    cache.max_bytes = len(SVG)
+    _age(cache, "dd4", 4 * 10**9)
+    cache.evict()
+    assert _files(cache) == ["dd4.svg"] and cache.size == len(SVG)
+
+
+def test_writes_are_atomic(tmp_path, monkeypatch):
+    cache = RenderCache(str(tmp_path))
+    cache.put("aa1", SVG)
+
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        cache.put("aa1", "<svg/>")
+    monkeypatch.undo()
+    assert cache.get("aa1") == SVG
+    assert os.listdir(tmp_path / "aa") == ["aa1.svg"]
+
+
+def test_stats(tmp_path):
+    program = 'OPENQASM 3.0;\ninclude "stdgates.inc";\nqubit[2] q;\nh q[0];\ncx q[0], q[1];\n'
+    cache = RenderCache(str(tmp_path))
+    svg = draw(program, cache=cache)
+    assert draw(program, cache=cache) == svg
+    assert draw(program + "\n\n", cache=cache) == svg
+    draw(program, theme="night", cache=cache)
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2 and stats["writes"] == 2
+    assert stats["hit_rate"] == 0.5 and stats["evictions"] == 0
+    assert stats["bytes"] == sum(size for _, _, size in cache._entries())
+    assert stats["directory"] == str(tmp_path) and stats["max_bytes"] == cache.max_bytes
@@ -0,0 +1,43 @@
+import random
+import pytest
+from quantum_quirkvis.scheduler import DepthFrontier
+
+
+def _occupy(depths, lo, hi):
+    # What the scheduler replaced: scan every line of the span
+    depth = max(depths[lo:hi + 1]) + 1
+    depths[lo:hi + 1] = [depth] * (hi - lo + 1)
+    return depth
+
+
+@pytest.mark.parametrize("n_lines", [1, 2, 3, 7, 8, 9, 64, 100])
+def test_frontier_matches_brute_force_depths(n_lines):
+    rnd = random.Random(n_lines)
+    frontier = DepthFrontier(n_lines)
+    depths = [-1] * n_lines
+    for _ in range(2000):
+        r = rnd.random()
+        lo = rnd.randrange(n_lines)
+        hi = rnd.randrange(lo, n_lines)
+        if r > 0.85 or r < 0.05:
+            # Full width, as measurements and barriers
+            lo, hi = 0, n_lines - 1
+        if r < 0.2:
+            assert frontier.query(lo, hi) == max(depths[lo:hi + 1])
+        elif r < 0.25:
+            depth = max(depths[lo:hi + 1]) + rnd.randint(1, 3)
+            frontier.raise_to(lo, hi, depth)
+            depths[lo:hi + 1] = [max(d, depth) for d in depths[lo:hi + 1]]
+        else:
+            assert frontier.occupy(lo, hi) == _occupy(depths, lo, hi)
+        assert frontier.top() == max(depths)
+    assert [frontier.depth(line) for line in range(n_lines)] == depths
+
+
+def test_empty_frontier():
+    frontier = DepthFrontier(5)
+    assert frontier.top() == -1
+    assert [frontier.depth(line) for line in range(5)] == [-1] * 5
+    assert frontier.occupy(1, 3) == 0
+    assert frontier.occupy(2, 2) == 1
+    assert frontier.occupy(0, 4) == 2
@@ -0,0 +1,137 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+import pytest
+from quantum_quirkvis import client, draw, server as server_module
+from quantum_quirkvis.cli import main
+from quantum_quirkvis.server import RenderServer
+
+PROGRAM = 'OPENQASM 3.0;\ninclude "stdgates.inc";\nqubit[2] q;\nh q[0];\ncx q[0], q[1];\n'
+
+
+@pytest.fixture
+def server(tmp_path):
+    renderer = RenderServer(str(tmp_path / "s.sock"), workers=1).start()
+    thread = threading.Thread(target=renderer.serve_forever, daemon=True)
+    thread.start()
+    yield renderer
+    renderer.shutdown()
+    thread.join()
+
+
+class Pool:
+    """Stands in for the worker pool, renders finish when finish() says so."""
+
+    def __init__(self):
+        self.jobs = []
+        self.submitted = threading.Semaphore(0)
+
+    def submit(self, fn, job):
+        future = Future()
+        self.jobs.append((job, future))
+        self.submitted.release()
+        return future
+
+    def finish(self):
+        for job, future in self.jobs:
+            if not future.done():
+                future.set_result(f"svg of {job[0]}".encode("utf-8"))
+
+    def shutdown(self):
+        self.finish()
+
+
+def test_renders_through_the_socket(server):
+    address = server.address
+    assert client.render(PROGRAM, theme="night", address=address) == draw(PROGRAM, theme="night")
+    assert client.render(PROGRAM, theme="night", address=address) == draw(PROGRAM, theme="night")
+    with pytest.raises(client.ServerError) as e:
+        client.render(PROGRAM + "h r[0];\n", address=address)
+    assert e.value.status == 400
+    stats = client.server_stats(address)
+    assert stats["requests"] == 3 and stats["renders"] == 2 and stats["errors"] == 1
+    assert stats["cache"]["hits"] == 1
+    assert os.stat(address).st_mode & 0o777 == 0o600
+
+
+def test_socket_of_another_user_is_refused(server, monkeypatch):
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    with pytest.raises(PermissionError):
+        client.render(PROGRAM, address=server.address)
+    with pytest.raises(RuntimeError, match="Not replacing"):
+        RenderServer(server.address, workers=1)._remove_stale_socket()
+    assert os.path.exists(server.address)
+
+
+def test_socket_others_can_use_is_refused(server):
+    os.chmod(server.address, 0o666)
+    with pytest.raises(PermissionError):
+        client.render(PROGRAM, address=server.address)
+    with pytest.raises(RuntimeError, match="Not replacing"):
+        RenderServer(server.address, workers=1)._remove_stale_socket()
+    os.chmod(server.address, 0o600)
+    assert client.render(PROGRAM, address=server.address) == draw(PROGRAM)
+
+
+def test_remote_tcp_addresses_need_allow_remote():
+    for address in ("0.0.0.0:8765", "192.168.1.10:8765", "example.com:8765"):
+        with pytest.raises(ValueError):
+            RenderServer(address)
+        assert RenderServer(address, allow_remote=True).address[1] == 8765
+    for address in ("127.0.0.1:8765", "localhost:8765", "[::1]:8765"):
+        RenderServer(address)
+
+
+def test_server_of_another_version_is_not_used(server, monkeypatch, capsys):
+    monkeypatch.setattr(server_module, "__version__", "0.0.0")
+    monkeypatch.setattr(server, "render", lambda request: b"<svg>stale</svg>")
+    with pytest.raises(client.ServerError, match="version 0.0.0"):
+        client.render(PROGRAM, address=server.address)
+
+    path = os.path.join(os.path.dirname(server.address), "c.qasm")
+    with open(path, "w") as f:
+        f.write(PROGRAM)
+    monkeypatch.setattr(sys, "argv", ["qasmvis", path, "--server", server.address])
+    main()
+    assert capsys.readouterr().out == draw(PROGRAM)
+
+
+def test_identical_requests_share_a_render_and_a_full_queue_answers_503(server):
+    pool = server.pool
+    server.pool = Pool()
+    pool.shutdown()
+    server.max_queue = 1
+    results = {}
+
+    def ask(name, program):
+        try:
+            results[name] = client.render(program, address=server.address, timeout=10)
+        except client.ServerError as e:
+            results[name] = e.status
+    threads = [threading.Thread(target=ask, args=("a", PROGRAM))]
+    threads[0].start()
+    assert server.pool.submitted.acquire(timeout=10)
+    threads.append(threading.Thread(target=ask, args=("b", PROGRAM + "\n")))
+    threads.append(threading.Thread(target=ask, args=("c", PROGRAM + "x q[0];\n")))
+    for thread in threads[1:]:
+        thread.start()
+    assert server.pool.submitted.acquire(timeout=10)
+    for _ in range(1000):
+        if server.stats()["coalesced"]:
+            break
+        time.sleep(0.01)
+
+    # One render running and one waiting fill workers + max_queue
+    ask("d", PROGRAM + "y q[0];\n")
+    assert results == {"d": 503}
+    server.pool.finish()
+    for thread in threads:
+        thread.join()
+    assert results["a"] == results["b"] == f"svg of {PROGRAM}"
+    assert results["c"] == f"svg of {PROGRAM}x q[0];\n"
+    assert [job[0] for job, _ in server.pool.jobs] == [PROGRAM, PROGRAM + "x q[0];\n"]
+    stats = server.stats()
+    assert stats["coalesced"] == 1 and stats["rejected"] == 1 and stats["pending"] == 0
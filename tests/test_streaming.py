@@ -0,0 +1,72 @@
+import glob
+import gzip
+import io
+import os
+import subprocess
+import sys
+import pytest
+from quantum_quirkvis import draw
+from quantum_quirkvis.drawer import SVGDrawer
+from circuits import random_circuit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Programs of every size the optimized paths take, from the goldens to thousands of gates
+PROGRAMS = sorted(glob.glob(os.path.join(HERE, "qasms", "*.qasm"))) + [
+    random_circuit(n, q, seed=n) for n, q in ((50, 3), (400, 8), (3000, 20))]
+
+
+def _source(program):
+    if not program.endswith(".qasm"):
+        return program
+    with open(program) as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("options", [{}, {"symbols": True}, {"compact": True}, {"fold": True}],
+                         ids=["plain", "symbols", "compact", "fold"])
+@pytest.mark.parametrize("program", range(len(PROGRAMS)))
+def test_streaming_matches_string_output(program, options, tmp_path):
+    source = _source(PROGRAMS[program])
+    svg = draw(source, theme="night", **options)
+    out = io.StringIO()
+    SVGDrawer("night", layout_cache=None, **options).draw(source, out=out)
+    assert out.getvalue() == svg
+    assert draw(source, theme="night", filename=str(tmp_path / "a.svg"), **options) == svg
+    assert (tmp_path / "a.svg").read_text() == svg
+    assert draw(source, theme="night", filename=str(tmp_path / "b.svg"), return_svg=False, **options) is None
+    assert (tmp_path / "b.svg").read_text() == svg
+
+
+def test_failed_draw_keeps_the_previous_file(tmp_path):
+    path = tmp_path / "a.svg"
+    svg = draw(_source(PROGRAMS[0]), filename=str(path), return_svg=False)
+    before = path.read_text()
+    with pytest.raises(Exception):
+        draw(_source(PROGRAMS[0]) + "\nh undeclared[0];\n", filename=str(path), return_svg=False)
+    assert svg is None and path.read_text() == before
+    assert os.listdir(tmp_path) == ["a.svg"]
+
+
+def test_cli_output_file_matches_draw(tmp_path):
+    source = random_circuit(200, 5)
+    (tmp_path / "c.qasm").write_text(source)
+    subprocess.run([sys.executable, "-m", "quantum_quirkvis.cli", str(tmp_path / "c.qasm"), "-o",
+                    str(tmp_path / "c.svg"), "-t", "matrix", "--no-server"], check=True)
+    assert (tmp_path / "c.svg").read_text() == draw(source, theme="matrix")
+
+
+def test_svgz_files(tmp_path):
+    source = random_circuit(300, 6)
+    (tmp_path / "c.qasm").write_text(source)
+    svg = draw(source, compact=True)
+    assert draw(source, compact=True, filename=str(tmp_path / "a.svgz")) == svg
+    assert draw(source, compact=True, filename=str(tmp_path / "b.svgz"), return_svg=False) is None
+    subprocess.run([sys.executable, "-m", "quantum_quirkvis.cli", str(tmp_path / "c.qasm"), "--compact",
+                    "-o", str(tmp_path / "c.svgz"), "--no-server"], check=True)
+    for name in ("a.svgz", "b.svgz", "c.svgz"):
+        assert gzip.decompress((tmp_path / name).read_bytes()).decode() == svg
+    # No timestamp in the header: the same drawing gives the same bytes
+    data = (tmp_path / "b.svgz").read_bytes()
+    draw(source, compact=True, filename=str(tmp_path / "b.svgz"))
+    assert (tmp_path / "b.svgz").read_bytes() == data
+    assert sorted(os.listdir(tmp_path)) == ["a.svgz", "b.svgz", "c.qasm", "c.svgz"]
@@ -0,0 +1,89 @@
+import glob
+import os
+import re
+import xml.etree.ElementTree as ET
+from collections import Counter
+import pytest
+from quantum_quirkvis import draw
+from circuits import random_circuit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SVG = "{http://www.w3.org/2000/svg}"
+PROGRAM = """OPENQASM 3.0;
+include "stdgates.inc";
+qubit[3] q;
+h q[0];
+h q[1];
+h q[2];
+cx q[0], q[1];
+cx q[1], q[2];
+"""
+_MOVE = re.compile(r"M\s*(-?[\d.]+)[ ,](-?[\d.]+)")
+
+
+def _shape(element, dx=0.0, dy=0.0):
+    # Tag, position-independent attributes made absolute, and text
+    attrs = []
+    for name in ("x", "x1", "x2", "cx", "y", "y1", "y2", "cy", "r", "width", "height"):
+        value = element.get(name)
+        if value is None or value.endswith("%"):
+            attrs.append((name, value))
+        elif name.startswith(("x", "cx")):
+            attrs.append((name, round(float(value) + dx, 2)))
+        elif name.startswith(("y", "cy")):
+            attrs.append((name, round(float(value) + dy, 2)))
+        else:
+            attrs.append((name, value))
+    points = element.get("points")
+    if points is not None:
+        pairs = [p.split(",") for p in points.split()]
+        attrs.append(("points", tuple((round(float(x) + dx, 2), round(float(y) + dy, 2)) for x, y in pairs)))
+    d = element.get("d")
+    if d is not None:
+        m = _MOVE.match(d)
+        d = (round(float(m.group(1)) + dx, 2), round(float(m.group(2)) + dy, 2), d[m.end():])
+    return element.tag, tuple(attrs), d, element.text
+
+
+def _plain_shapes(svg):
+    return Counter(_shape(e) for e in ET.fromstring(svg).iter() if e.tag not in (SVG + "svg", SVG + "g"))
+
+
+def _symbol_shapes(svg):
+    root = ET.fromstring(svg)
+    defs = {g.get("id"): list(g) for g in root.iter(SVG + "g")}
+    shapes = Counter()
+    for e in root:
+        if e.tag == SVG + "use":
+            for child in defs[e.get("href")[1:]]:
+                shapes[_shape(child, float(e.get("x", 0)), float(e.get("y", 0)))] += 1
+        elif e.tag not in (SVG + "defs", SVG + "style"):
+            shapes[_shape(e)] += 1
+    return shapes
+
+
+def test_repeated_gates_share_one_definition():
+    svg = draw(PROGRAM, symbols=True)
+    root = ET.fromstring(svg)
+    uses = Counter(use.get("href") for use in root.iter(SVG + "use"))
+    defs = root.find(SVG + "defs")
+    ids = [g.get("id") for g in defs]
+    assert len(ids) == len(set(ids)) == len(uses)
+    assert sorted(uses.values()) == [2, 2, 2, 3]
+    # The three h gates: one circle and label, drawn through the same definition
+    [h] = [g for g in defs if g.find(SVG + "text") is not None]
+    assert uses["#" + h.get("id")] == 3 and h.find(SVG + "text").text == "H"
+    assert len(root.findall(SVG + "circle")) == 0
+    # Colors, strokes and fonts are CSS classes
+    assert root.find(SVG + "style") is not None
+    assert not any(e.get("fill") or e.get("stroke") for e in root.iter())
+
+
+@pytest.mark.parametrize("theme", ["default", "night", "emoji", "matrix"])
+@pytest.mark.parametrize("program", sorted(glob.glob(os.path.join(HERE, "qasms", "*.qasm"))) + [PROGRAM, random_circuit(300, 6)],
+                         ids=lambda p: os.path.basename(p) if p.endswith(".qasm") else f"generated{len(p)}")
+def test_symbols_draw_the_same_geometry(program, theme):
+    if program.endswith(".qasm"):
+        with open(program) as f:
+            program = f.read()
+    assert _symbol_shapes(draw(program, theme=theme, symbols=True)) == _plain_shapes(draw(program, theme=theme))
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+from quantum_quirkvis.builtin_themes import THEMES
+from quantum_quirkvis.drawer import SVGDrawer
+from quantum_quirkvis.theme import compile_theme, load_theme
+
+
+def test_bundled_themes_match_the_json_files():
+    # Fails when themes/*.json were edited without regenerating builtin_themes.py
+    result = subprocess.run([sys.executable, "-m", "quantum_quirkvis.theme", "--check"],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_file_named_like_a_builtin_theme_wins(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert load_theme("night") == THEMES["night"]
+    theme = dict(THEMES["night"], name="local night")
+    with open("night", "w") as f:
+        json.dump(theme, f)
+    assert load_theme("night") == theme
+    assert compile_theme("night").raw["name"] == "local night"
+    os.remove("night")
+    assert compile_theme("night").raw["name"] == THEMES["night"]["name"]
+
+
+def test_changing_the_theme_dict_changes_the_drawing():
+    program = 'OPENQASM 3.0;\ninclude "stdgates.inc";\nqubit[2] q;\nh q[0];\ncx q[0], q[1];\n'
+    drawer = SVGDrawer("night")
+    svg, digest = drawer.draw(program), drawer.theme_manager.compiled.digest
+    drawer.theme_manager.theme["dimensions"]["gate_width"] = 80
+    drawer.theme_manager.theme["styles"]["background"] = "#123456"
+    assert drawer.draw(program) == SVGDrawer(drawer.theme_manager.theme).draw(program) != svg
+    assert "#123456" in drawer.draw(program) and drawer.theme_manager.compiled.digest != digest
+    # The shared compiled theme is left as it was
+    assert SVGDrawer("night").draw(program) == svg
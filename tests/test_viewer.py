@@ -0,0 +1,47 @@
+import json
+import os
+import re
+from quantum_quirkvis import export_html
+
+PROGRAM = 'OPENQASM 3.0;\ninclude "stdgates.inc";\nqubit[5] q;\n' + "h q;\n" * 25
+
+
+def _tile(path):
+    with open(path) as f:
+        m = re.fullmatch(r"qvTile\((\d+),(\d+),(.*)\);\n", f.read(), re.S)
+    return int(m.group(1)), int(m.group(2)), json.loads(m.group(3))
+
+
+def test_tiles_and_index(tmp_path):
+    index = export_html(PROGRAM, str(tmp_path), chunk_moments=10, chunk_lines=2, jobs=1)
+    assert index == str(tmp_path / "index.html")
+    assert sorted(os.listdir(tmp_path)) == ["chunks", "index.html"]
+    assert sorted(os.listdir(tmp_path / "chunks")) == sorted(f"c{c}_r{r}.js" for c in range(3) for r in range(3))
+
+    with open(index) as f:
+        page = f.read()
+    meta = json.loads(re.search(r"const meta = (\{.*\});", page).group(1))
+    assert (meta["cols"], meta["rows"], meta["chunks"]) == (3, 3, "chunks")
+    assert all(f"q[{i}]" in page for i in range(5))
+
+    gates = {}
+    for c in range(3):
+        for r in range(3):
+            col, row, svg = _tile(tmp_path / "chunks" / f"c{c}_r{r}.js")
+            assert (col, row) == (c, r)
+            width, height = (float(v) for v in re.search(r'width="([\d.]+)" height="([\d.]+)"', svg).groups())
+            assert height == (2 if r < 2 else 1) * meta["tileHeight"] / 2
+            assert width == (10 if c < 2 else 5) * meta["tileWidth"] / 10
+            gates[c, r] = svg.count(">H<")
+    # Every gate is drawn in exactly one tile
+    assert gates == {(c, r): (10 if c < 2 else 5) * (2 if r < 2 else 1) for c in range(3) for r in range(3)}
+
+
+def test_tiles_dont_depend_on_the_number_of_jobs(tmp_path):
+    export_html(PROGRAM, str(tmp_path / "one"), chunk_moments=4, chunk_lines=3, jobs=1)
+    export_html(PROGRAM, str(tmp_path / "two"), chunk_moments=4, chunk_lines=3, jobs=2)
+    names = sorted(os.listdir(tmp_path / "one" / "chunks"))
+    assert len(names) == 7 * 2 and names == sorted(os.listdir(tmp_path / "two" / "chunks"))
+    for name in names + ["../index.html"]:
+        with open(tmp_path / "one" / "chunks" / name) as a, open(tmp_path / "two" / "chunks" / name) as b:
+            assert a.read() == b.read()
@@ -0,0 +1,59 @@
+import json
+import os
+from quantum_quirkvis.builtin_themes import THEMES
+from quantum_quirkvis.watch import Watcher
+
+PROGRAM = """OPENQASM 3.0;
+include "stdgates.inc";
+qubit[2] q;
+h q[0];
+cx q[0], q[1];
+"""
+
+
+def _write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+    # Polling compares mtime and size, make sure an edit is seen
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def _watcher(tmp_path):
+    theme = dict(THEMES["default"], name="mine")
+    _write(tmp_path / "mine.json", json.dumps(theme))
+    _write(tmp_path / "bell.qasm", PROGRAM)
+    return theme, Watcher([str(tmp_path / "bell.qasm")], [str(tmp_path / "mine.json")],
+                          output=str(tmp_path / "{name}.svg"), progress=None)
+
+
+def test_failed_redraw_keeps_the_previous_svg(tmp_path):
+    _, watcher = _watcher(tmp_path)
+    [(_, outputs, error, _)] = watcher.refresh()
+    assert error is None and outputs == [str(tmp_path / "bell.svg")]
+    svg = (tmp_path / "bell.svg").read_text()
+
+    _write(tmp_path / "bell.qasm", PROGRAM + "cx q[0], r[1];\n")
+    [(_, outputs, error, _)] = watcher.refresh()
+    assert error and outputs == []
+    assert (tmp_path / "bell.svg").read_text() == svg
+    assert sorted(os.listdir(tmp_path)) == ["bell.qasm", "bell.svg", "mine.json"]
+
+
+def test_theme_change_after_parse_error_draws_the_last_good_program(tmp_path):
+    theme, watcher = _watcher(tmp_path)
+    watcher.refresh()
+    _write(tmp_path / "bell.qasm", PROGRAM + "cx q[0], r[1];\n")
+    watcher.refresh()
+    parses = watcher.parses
+
+    theme["styles"] = dict(theme["styles"], background="#123456")
+    _write(tmp_path / "mine.json", json.dumps(theme))
+    [(_, outputs, error, _)] = watcher.refresh()
+    assert error is None and outputs == [str(tmp_path / "bell.svg")]
+    assert "#123456" in (tmp_path / "bell.svg").read_text()
+    assert watcher.parses == parses
+
+    _write(tmp_path / "bell.qasm", PROGRAM)
+    [(_, _, error, _)] = watcher.refresh()
+    assert error is None and watcher.parses == parses + 1